@@ -0,0 +1,91 @@
+from fastapi import Request, Response
+from starlette.exceptions import HTTPException
+from uuid import uuid4
+import threading
+import sqlite3
+import logging
+
+from app.core.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+class CollectionVersions:
+    """
+    Contadores de versão por coleção (ex: "rnc"), incrementados a cada escrita
+
+    Com o cache de respostas no backend sqlite (vários workers na máquina) os contadores e a
+    época do ETag ficam no arquivo compartilhado, então um worker nunca responde 304 para uma
+    escrita feita por outro. Nos demais backends os contadores vivem no processo, assim como o
+    ConnectionManager do WebSocket, e pressupõem um único worker; o identificador de boot entra
+    no ETag para que um reinício nunca reaproveite um ETag antigo.
+    """
+    def __init__(self, shared=None):
+        self.shared = shared
+        self.epoch = shared.epoch if shared is not None else uuid4().hex[:12]
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, collection: str) -> None:
+        if self.shared is not None:
+            try:
+                self.shared.bump_tags([_tag(collection)])
+            except sqlite3.Error as e:
+                logger.error("Falha ao incrementar a versão compartilhada de '%s': %s", collection, e)
+            return
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def get(self, *collections: str) -> dict[str, int]:
+        if self.shared is not None:
+            versions = self.shared.tag_versions(_tag(name) for name in collections)
+            return {name: versions[_tag(name)] for name in collections}
+        return {name: self._versions.get(name, 0) for name in collections}
+
+    def etag(self, *collections: str) -> str:
+        versions = ".".join(f"{name}{version}" for name, version in self.get(*collections).items())
+        return f'W/"{self.epoch}.{versions}"'
+
+def _tag(collection: str) -> str:
+    return f"collection:{collection}"
+
+collection_versions = CollectionVersions(response_cache.backend if response_cache.enabled and response_cache.backend.name == "sqlite" else None)
+
+class NotModified(HTTPException):
+    """Interrompe a requisição condicional; convertida em 304 pelo handler registrado no server"""
+    def __init__(self, headers: dict):
+        super().__init__(status_code=304, headers=headers)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    #Comparação fraca (RFC 9110): ignora o prefixo W/
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def conditional_get(*collections: str):
+    """
+    Dependência de GET condicional baseada nas versões das coleções informadas
+
+    Emite o ETag na resposta e, se o If-None-Match do cliente bater, levanta NotModified
+    antes que a rota execute qualquer consulta ou serialização.
+
+    A requisição é fixada no primário (request.state.primary_only, lido pela RoutingSession):
+    uma réplica atrasada geraria um corpo mais antigo que o ETag anunciado, que seria servido
+    com 304 e guardado no cache de respostas até a próxima escrita. Os 304 e os acertos do
+    cache não consultam o banco, então só a montagem das respostas vai ao primário.
+    """
+    def dependency(request: Request, response: Response) -> None:
+        #Também sem ETag: a rota ainda pode guardar o corpo no cache de respostas
+        request.state.primary_only = True
+        try:
+            etag = collection_versions.etag(*collections)
+        except sqlite3.Error as e:
+            #Sem as versões compartilhadas não há como garantir um 304 correto: responde sem ETag
+            logger.warning("Versões compartilhadas indisponíveis, respondendo sem ETag: %s", e)
+            return
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise NotModified(headers)
+        response.headers.update(headers)
+    return dependency
@@ -5,22 +5,124 @@ import logging
 
 logger = logging.getLogger()
 
+def _parse_rate_limit_rules(value: str) -> dict[str, tuple[int, float]]:
+    rules = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, budget = item.rpartition("=")
+        requests, _, seconds = budget.partition("/")
+        try:
+            requests, seconds = int(requests), float(seconds)
+        except ValueError:
+            requests, seconds = 0, 0.0
+        if not route.strip() or requests < 1 or seconds <= 0:
+            raise ValueError(f"Regra de rate limit inválida: '{item}' (use 'MÉTODO caminho=requisições/segundos')")
+        rules[" ".join(route.split())] = (requests, seconds)
+    return rules
+
 class Settings(BaseSettings):
     SECRET_KEY: str = Field(..., description="Chave secreta usada para geração de token JWT")
     ALGORITHM: str = Field(default="HS256", description="Algoritmo JWT padrão")
     ACCESS_TOKEN_EXPIRE_IN_MINUTES: int = Field(default=60, description="Tempo de expiração do token")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7, description="Tempo de expiração do refresh_token")
     REFRESH_SECRET_KEY: str = Field(..., description="Chave secreta para geração de refresh_token")
+    REFRESH_TOKEN_CACHE_SIZE: int = Field(default=10000, ge=1, description="Refresh tokens consumidos e famílias revogadas mantidos em memória")
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: float = Field(default=10.0, ge=0.0, description="Reapresentar um refresh token consumido há menos que isto (abas ou retentativas simultâneas) só recebe 401, sem revogar a família")
 
     DATABASE_URL: str = Field(..., description="URL de conexão com o banco de dados")
+    DATABASE_REPLICA_URLS: str = Field(default="", description="URLs das réplicas de leitura, separadas por vírgula")
+    REPLICA_SELECTION: str = Field(default="round_robin", description="Escolha da réplica: round_robin ou least_connections")
+    READ_YOUR_WRITES_SECONDS: float = Field(default=5.0, ge=0.0, description="Após escrever, o usuário lê do primário por este tempo")
+    ENVIRONMENT: str = Field(default="development", description="Ambiente de execução (development/production)")
+    AUTO_MIGRATE: bool = Field(default=False, description="Aplica migrações pendentes na inicialização (apenas desenvolvimento)")
+
+    LOG_LEVEL: str = Field(default="INFO", description="Nível de log da aplicação (DEBUG, INFO, WARNING...)")
+    LOG_JSON: bool = Field(default=False, description="Emite os logs como JSON, uma linha por registro")
+    LOG_SQL: bool = Field(default=False, description="Loga cada comando SQL executado (apenas para depuração)")
+    LOG_DEBUG_SAMPLE_RATE: float = Field(default=1.0, ge=0.0, le=1.0, description="Fração dos logs DEBUG mantida")
+
+    METRICS_ENABLED: bool = Field(default=True, description="Coleta métricas por rota e expõe /metrics (Prometheus)")
+    SQL_PROFILING: bool = Field(default=False, description="Etiqueta cada SQL com o método de repositório e agrega tempo/linhas por formato")
+    SLOW_QUERY_THRESHOLD_MS: float = Field(default=200.0, description="Consultas acima deste tempo são logadas com o plano de execução")
+
+    PART_CACHE_ENABLED: bool = Field(default=True, description="Mantém o catálogo de peças em cache no processo")
+    PART_CACHE_MAX_SIZE: int = Field(default=10000, ge=0, description="Quantidade máxima de peças no cache")
+    PART_CACHE_TTL_SECONDS: float = Field(default=300.0, gt=0, description="Tempo de vida de cada peça no cache")
+    PART_CACHE_WARM: bool = Field(default=False, description="Pré-carrega as peças ativas no cache ao subir o servidor")
+
+    OPEN_RNC_INDEX_MODE: str = Field(default="trust", description="Índice em memória peça -> RNC aberto: trust (responde ausências sem consultar o banco), verify (sempre consulta e confere o índice; para vários workers) ou off")
+    OPEN_RNC_INDEX_MAX_AGE_SECONDS: float = Field(default=300.0, gt=0, description="Intervalo de recarga do índice de RNCs abertos a partir do banco")
+    RESPONSE_CACHE_BACKEND: str = Field(default="memory", description="Cache das listagens de RNC e versões dos ETags: memory (no processo; um único worker), sqlite (compartilhado entre os workers da máquina) ou none (ETags no processo; um único worker)")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=1000, ge=1, description="Quantidade máxima de respostas em cache")
+    RESPONSE_CACHE_PATH: str = Field(default="/tmp/rnc_response_cache.sqlite3", description="Arquivo do cache compartilhado (backend sqlite)")
+
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="Limita requisições por usuário (ou IP, sem token) com token bucket")
+    RATE_LIMIT_RULES: str = Field(
+        default="POST /api/auth/login=10/60,POST /api/auth/*=30/60,POST /api/rnc/create_rnc=60/60,PATCH /api/rnc/*=120/60,*=600/60",
+        description="Orçamentos por rota: 'MÉTODO caminho=requisições/segundos', separados por vírgula; '*' no fim do caminho casa prefixo e '*' sozinho é o padrão"
+    )
+    RATE_LIMIT_MAX_KEYS: int = Field(default=10000, ge=1, description="Quantidade máxima de buckets (usuário/IP por regra) mantidos em memória")
+    LOAD_SHED_LOOP_LAG_MS: float = Field(default=250.0, ge=0.0, description="Atraso médio do event loop a partir do qual novas requisições recebem 429 (0 desativa)")
+    LOAD_SHED_POOL_WAIT_MS: float = Field(default=500.0, ge=0.0, description="Espera média por conexão do pool a partir da qual novas requisições recebem 429 (0 desativa)")
+    LOAD_SHED_MAX_IN_FLIGHT: int = Field(default=0, ge=0, description="Máximo de requisições simultâneas; as que chegarem com o limite ocupado recebem 429 (0 desativa)")
+    LOAD_SHED_WINDOW_SECONDS: float = Field(default=2.0, gt=0, description="Janela das médias de atraso do loop e espera do pool")
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = Field(default=2, ge=1, description="Retry-After enviado quando a carga é descartada")
+
+    IDEMPOTENCY_MAX_KEYS: int = Field(default=10000, ge=1, description="Quantidade máxima de respostas guardadas por Idempotency-Key. As chaves ficam na memória do processo: exige um único worker, senão uma repetição que caia em outro worker executa a transição de novo")
+    IDEMPOTENCY_TTL_SECONDS: float = Field(default=86400.0, gt=0, description="Por quanto tempo uma Idempotency-Key devolve a resposta original (no worker que a atendeu; ver IDEMPOTENCY_MAX_KEYS)")
+
+    WS_TICKET_TTL_SECONDS: float = Field(default=30.0, gt=0, description="Validade dos tickets de conexão do WebSocket. Os tickets ficam na memória do processo: exige um único worker (ou afinidade de sessão), senão o ticket emitido por um worker é recusado por outro")
+    WS_TICKET_MAX_PENDING: int = Field(default=50000, ge=1, description="Quantidade máxima de tickets emitidos e ainda não usados")
+    WS_QUERY_TOKEN_ENABLED: bool = Field(default=True, description="Aceita também o JWT completo em ?token= no WebSocket (legado, para clientes antigos)")
+    WS_MAX_CONCURRENT_HANDSHAKES: int = Field(default=16, ge=1, description="Handshakes de WebSocket processados ao mesmo tempo")
+    WS_HANDSHAKE_QUEUE_SIZE: int = Field(default=256, ge=0, description="Handshakes que podem aguardar uma vaga; além disso são recusados na hora")
+    WS_HANDSHAKE_MAX_WAIT_SECONDS: float = Field(default=2.0, gt=0, description="Espera máxima por uma vaga de handshake")
+    WS_RECONNECT_BACKOFF_SECONDS: float = Field(default=2.0, gt=0, description="Base do backoff sugerido aos clientes recusados (cresce com a fila, com jitter)")
+    WS_SNAPSHOT_ENABLED: bool = Field(default=True, description="Envia a cada WebSocket recém-conectado o snapshot dos RNCs abertos do seu papel")
+    WS_SNAPSHOT_LIMIT: int = Field(default=1000, ge=1, description="Quantidade máxima de RNCs na mensagem de snapshot")
+    WS_SNAPSHOT_MAX_AGE_SECONDS: float = Field(default=300.0, gt=0, description="Intervalo de recarga do snapshot a partir do banco")
+    SSE_REPLAY_SIZE: int = Field(default=1000, ge=0, description="Últimos eventos guardados para a retomada de streams SSE pelo Last-Event-ID")
+    SSE_QUEUE_SIZE: int = Field(default=256, ge=1, description="Eventos pendentes por assinante SSE antes de ele ser desligado")
+    SSE_KEEPALIVE_SECONDS: float = Field(default=15.0, gt=0, description="Intervalo dos comentários de keepalive (também detecta clientes que caíram)")
+    SSE_RETRY_MS: int = Field(default=3000, ge=0, description="Espera sugerida ao EventSource antes de reconectar")
 
     class Config:
         env_file = ".env"
         case_sensitive = True
 
+    @property
+    def is_production(self) -> bool:
+        """Em produção a inicialização pula autotestes e logs de depuração"""
+        return self.ENVIRONMENT.lower() == "production"
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def rate_limit_rules(self) -> dict[str, tuple[int, float]]:
+        """Regras de RATE_LIMIT_RULES: 'MÉTODO caminho' (ou '*') -> (requisições, segundos)"""
+        return _parse_rate_limit_rules(self.RATE_LIMIT_RULES)
+
+    @field_validator("RATE_LIMIT_RULES")
+    def validate_rate_limit_rules(cls, v: str):
+        _parse_rate_limit_rules(v)
+        return v
+
+    @field_validator("REPLICA_SELECTION")
+    def validate_replica_selection(cls, v: str):
+        if v not in ("round_robin", "least_connections"):
+            raise ValueError("REPLICA_SELECTION deve ser round_robin ou least_connections")
+        return v
+
+    @field_validator("OPEN_RNC_INDEX_MODE")
+    def validate_open_rnc_index_mode(cls, v: str):
+        if v.lower() not in ("off", "trust", "verify"):
+            raise ValueError("OPEN_RNC_INDEX_MODE deve ser trust, verify ou off")
+        return v
+
     @field_validator("SECRET_KEY")
     def validate_secret_key(cls, v: str):
-        if not v or len(v):
+        if not v or len(v) < 32:
             logger.warning("SECRET_KEY muito curta! Gerando nova chave secreta temporária...")
             return secrets.token_urlsafe(32)
         return v
@@ -29,6 +131,6 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-logger.info(f"🔧 Configurações carregadas:")
-logger.debug(f"   ALGORITHM: {settings.ALGORITHM}")
-logger.debug(f"   TOKEN_EXPIRE: {settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES}")
\ No newline at end of file
+logger.info("🔧 Configurações carregadas:")
+logger.debug("   ALGORITHM: %s", settings.ALGORITHM)
+logger.debug("   TOKEN_EXPIRE: %s", settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES)
\ No newline at end of file
@@ -28,6 +28,9 @@ async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials,
     if not user.active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user!")
 
+    #Identifica o usuário na sessão para o read-your-writes das réplicas
+    db.info["user_id"] = user.id
+
     return user
 
 def require_role(*allowed_roles: model.UserRole):
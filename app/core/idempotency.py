@@ -0,0 +1,135 @@
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+import hashlib
+import logging
+
+from app.core.config import settings
+from app.core.ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+#Tamanho máximo aceito para o cabeçalho Idempotency-Key
+MAX_KEY_LENGTH = 255
+#Cabeçalho que indica ao cliente que a resposta é a repetição de uma já enviada
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    """Resposta já serializada de uma requisição concluída com sucesso"""
+    fingerprint: str
+    status_code: int
+    body: bytes
+
+class IdempotencyStore:
+    """
+    Respostas recentes indexadas por (usuário, rota, Idempotency-Key), em um TTLMap
+
+    Chaves em processamento ficam em um conjunto à parte, para que uma repetição que chegue
+    antes da resposta original não execute a transição de novo.
+
+    As respostas e as chaves em processamento vivem no processo: com vários workers uma
+    repetição que caia em outro worker não as encontra e executa a transição de novo, então
+    as rotas idempotentes exigem um único worker (ou afinidade de sessão no balanceador).
+    """
+    def __init__(self, max_keys: int, ttl_seconds: float):
+        self.max_keys = max_keys
+        self.ttl = ttl_seconds
+        self.replays = 0
+        self.conflicts = 0
+        self._entries: TTLMap[StoredResponse] = TTLMap(ttl_seconds, max_keys)
+        self._pending: set[tuple] = set()
+
+    def get(self, key: tuple) -> Optional[StoredResponse]:
+        return self._entries.get(key)
+
+    def put(self, key: tuple, fingerprint: str, status_code: int, body: bytes) -> None:
+        self._entries.put(key, StoredResponse(fingerprint, status_code, body))
+
+    def begin(self, key: tuple) -> bool:
+        """Marca a chave como em processamento; False se já houver uma requisição com ela em andamento"""
+        if key in self._pending:
+            return False
+        self._pending.add(key)
+        return True
+
+    def finish(self, key: tuple) -> None:
+        self._pending.discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_keys": self.max_keys,
+            "ttl_seconds": self.ttl,
+            "pending": len(self._pending),
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "evictions": self._entries.evictions,
+        }
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_MAX_KEYS, settings.IDEMPOTENCY_TTL_SECONDS)
+
+def _fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+async def idempotent_json_response(
+    idempotency_key: Optional[str],
+    route: str,
+    user_id: int,
+    payload: BaseModel,
+    status_code: int,
+    execute: Callable[[], Awaitable[BaseModel]]
+) -> Response:
+    """
+    Executa a operação uma única vez por Idempotency-Key
+
+    Sem chave a operação roda normalmente. Com chave:
+    1. Se já houver resposta guardada para o mesmo usuário, rota e corpo, ela é devolvida
+       sem executar nada (cabeçalho Idempotency-Replayed: true).
+    2. A mesma chave com outro corpo é rejeitada (422), assim como uma repetição que chega
+       enquanto a original ainda está em processamento (409, com Retry-After).
+    3. Senão a operação roda e, se concluir com sucesso, a resposta é guardada. Erros não
+       são guardados: a repetição de uma requisição que falhou é executada de novo.
+
+    Args:
+        idempotency_key: Valor do cabeçalho Idempotency-Key
+        route: Identificação da rota, incluindo parâmetros de caminho (ex: "PATCH /analysis/12")
+        user_id: Usuário autenticado; as chaves de usuários diferentes nunca colidem
+        payload: Corpo da requisição, comparado entre a original e as repetições
+        status_code: Status da resposta de sucesso
+        execute: Operação a executar; retorna o schema da resposta
+    """
+    if idempotency_key is None:
+        body = (await execute()).model_dump_json().encode()
+        return Response(content=body, status_code=status_code, media_type="application/json")
+
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Idempotency-Key deve ter entre 1 e {MAX_KEY_LENGTH} caracteres")
+
+    key = (user_id, route, idempotency_key)
+    fingerprint = _fingerprint(payload)
+    stored = idempotency_store.get(key)
+    if stored is not None:
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Idempotency-Key já utilizada com outro corpo de requisição")
+        idempotency_store.replays += 1
+        logger.info("Repetição atendida pela Idempotency-Key de %s em %s", user_id, route)
+        return Response(content=stored.body, status_code=stored.status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+    if not idempotency_store.begin(key):
+        idempotency_store.conflicts += 1
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Requisição com esta Idempotency-Key ainda em processamento",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        body = (await execute()).model_dump_json().encode()
+        idempotency_store.put(key, fingerprint, status_code, body)
+    finally:
+        idempotency_store.finish(key)
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -1,14 +1,91 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 import logging
+import random
+import atexit
+import queue
+import json
 import sys
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    logging.getLogger("uvicorn").setLevel(logging.INFO)
-    logging.getLogger("fastapi").setLevel(logging.DEBUG)
-    logging.getLogger("app.websocket").setLevel(logging.DEBUG)
\ No newline at end of file
+_listener: Optional[QueueListener] = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON (para agregadores de log)"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Mantém apenas uma fração dos registros DEBUG (linhas de alto volume)
+
+    Registros INFO ou mais severos sempre passam.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+def setup_logging(config) -> None:
+    """
+    Configura o logging da aplicação a partir de Settings
+
+    Os registros são enfileirados por um QueueHandler e escritos no stdout por um
+    QueueListener em thread própria, então o event loop nunca bloqueia em I/O de log.
+
+    Args:
+        config: Settings com LOG_LEVEL, LOG_JSON, LOG_SQL e LOG_DEBUG_SAMPLE_RATE
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    level = logging.getLevelName(config.LOG_LEVEL.upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if config.LOG_JSON else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(config.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    #O uvicorn instala handlers próprios (escrita síncrona); redireciona para a fila
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn").setLevel(max(level, logging.INFO))
+
+    #SQL só é logado quando explicitamente habilitado
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if config.LOG_SQL else logging.WARNING)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e encerra a thread de escrita dos logs"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
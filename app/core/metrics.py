@@ -0,0 +1,210 @@
+from sqlalchemy import Engine, event
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+from bisect import bisect_left
+import threading
+
+#Buckets padrão do Prometheus para latência (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+#Quantidade de comandos SQL por requisição: valores altos denunciam N+1
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus (buckets fixos, soma e contagem)"""
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((_format_number(bound), running))
+        result.append(("+Inf", self.count))
+        return result
+
+class RequestSQLStats:
+    """Comandos SQL emitidos durante uma requisição"""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+#Estatísticas SQL da requisição em andamento; None fora de uma requisição HTTP
+current_sql_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("current_sql_stats", default=None)
+
+class MetricsRegistry:
+    """
+    Métricas HTTP e SQL do processo, expostas em /metrics no formato texto do Prometheus
+
+    As observações de requisição são feitas no event loop; os contadores SQL podem vir
+    de threads do threadpool e por isso usam um lock.
+    """
+    def __init__(self):
+        self.request_latency: dict[tuple[str, str], Histogram] = {}
+        self.request_sql_statements: dict[tuple[str, str], Histogram] = {}
+        self.request_sql_seconds: dict[tuple[str, str], Histogram] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self.in_flight = 0
+        self.sql_statements_total = 0
+        self.sql_seconds_total = 0.0
+        self.ws_handshakes: dict[str, int] = {}
+        self.ws_handshake_wait = Histogram(LATENCY_BUCKETS)
+        self.ws_handshakes_in_progress = 0
+        self.ws_handshakes_queued = 0
+        self.ws_connections = 0
+        self.sse_connections = 0
+        self._sql_lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, sql: RequestSQLStats) -> None:
+        key = (method, route)
+        histogram = self.request_latency.get(key)
+        if histogram is None:
+            histogram = self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+            self.request_sql_statements[key] = Histogram(SQL_COUNT_BUCKETS)
+            self.request_sql_seconds[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+        self.request_sql_statements[key].observe(sql.statements)
+        self.request_sql_seconds[key].observe(sql.seconds)
+        status_key = (method, route, status_code)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def observe_ws_handshake(self, outcome: str, wait_seconds: float) -> None:
+        """Handshake de WebSocket admitido ou recusado (outcome) e quanto esperou na fila"""
+        self.ws_handshakes[outcome] = self.ws_handshakes.get(outcome, 0) + 1
+        self.ws_handshake_wait.observe(wait_seconds)
+
+    def observe_sql(self, seconds: float) -> None:
+        with self._sql_lock:
+            self.sql_statements_total += 1
+            self.sql_seconds_total += seconds
+
+    def render(self) -> str:
+        """Gera o corpo da resposta de /metrics (text/plain; version=0.0.4)"""
+        lines = []
+        _render_histograms(lines, "http_request_duration_seconds", "Latência das requisições HTTP por rota", self.request_latency)
+        _render_histograms(lines, "http_request_sql_statements", "Comandos SQL executados por requisição", self.request_sql_statements)
+        _render_histograms(lines, "http_request_sql_duration_seconds", "Tempo gasto em SQL por requisição", self.request_sql_seconds)
+
+        lines.append("# HELP http_responses_total Respostas HTTP por rota e status")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status_code), total in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {total}')
+
+        lines.append("# HELP http_requests_in_flight Requisições HTTP em andamento")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        lines.append("# HELP ws_handshakes_total Handshakes de WebSocket por resultado da admissão")
+        lines.append("# TYPE ws_handshakes_total counter")
+        for outcome, total in sorted(self.ws_handshakes.items()):
+            lines.append(f'ws_handshakes_total{{outcome="{outcome}"}} {total}')
+        lines.append("# HELP ws_handshake_wait_seconds Espera na fila de admissão antes do handshake")
+        lines.append("# TYPE ws_handshake_wait_seconds histogram")
+        for bound, count in self.ws_handshake_wait.cumulative():
+            lines.append(f'ws_handshake_wait_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"ws_handshake_wait_seconds_sum {_format_number(self.ws_handshake_wait.total)}")
+        lines.append(f"ws_handshake_wait_seconds_count {self.ws_handshake_wait.count}")
+        for name, help_text, value in (
+            ("ws_handshakes_in_progress", "Handshakes de WebSocket em andamento", self.ws_handshakes_in_progress),
+            ("ws_handshakes_queued", "Handshakes de WebSocket aguardando admissão", self.ws_handshakes_queued),
+            ("ws_connections", "Conexões WebSocket abertas", self.ws_connections),
+            ("sse_connections", "Streams de Server-Sent Events abertos", self.sse_connections),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        lines.append("# HELP db_sql_statements_total Comandos SQL executados pelo processo")
+        lines.append("# TYPE db_sql_statements_total counter")
+        lines.append(f"db_sql_statements_total {self.sql_statements_total}")
+        lines.append("# HELP db_sql_duration_seconds_total Tempo total gasto em SQL pelo processo")
+        lines.append("# TYPE db_sql_duration_seconds_total counter")
+        lines.append(f"db_sql_duration_seconds_total {_format_number(self.sql_seconds_total)}")
+        return "\n".join(lines) + "\n"
+
+def _format_number(value: float) -> str:
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _render_histograms(lines: list[str], name: str, help_text: str, histograms: dict[tuple[str, str], Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = f'method="{method}",route="{_escape(route)}"'
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {_format_number(histogram.total)}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+registry = MetricsRegistry()
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra eventos no engine para contar comandos SQL e o tempo gasto em cada um"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["metrics_query_start"].pop()
+        registry.observe_sql(elapsed)
+        stats = current_sql_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede latência, status e SQL de cada requisição HTTP
+
+    A rota é identificada pelo template (ex: /api/rnc/analysis/{num_rnc}) que o FastAPI
+    grava em scope["route"], mantendo a cardinalidade dos labels limitada.
+    """
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        sql = RequestSQLStats()
+        token = current_sql_stats.set(sql)
+        self.registry.in_flight += 1
+        start = perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            self.registry.in_flight -= 1
+            current_sql_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            self.registry.observe_request(scope["method"], route_path, status_code, elapsed, sql)
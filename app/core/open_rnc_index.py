@@ -0,0 +1,140 @@
+from time import monotonic
+from typing import Callable, Iterable, Optional
+import threading
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class OpenRNCIndex:
+    """
+    Mapa em processo part_code -> num_rnc dos RNCs abertos
+
+    Consultado na leitura de código de barras e antes de cada abertura de RNC. É carregado
+    do banco na subida (e recarregado a cada max_age segundos) e mantido pelas transições
+    commitadas neste processo: abertura inclui, fechamento remove.
+
+    Modos:
+    - trust: um código ausente do mapa responde "sem RNC aberto" sem ir ao banco, que é o
+      caso comum na leitura de peças. Com um único worker o mapa vê todas as transições.
+    - verify: o banco é sempre consultado e o resultado comparado com o mapa; divergências
+      são contadas, registradas no log e corrigidas. Para vários workers (que não veem as
+      transições uns dos outros até a próxima recarga), ou para validar o índice antes de
+      confiar nele.
+    - off: sem índice.
+    """
+    def __init__(self, mode: str, max_age: float):
+        self.mode = mode
+        self.max_age = max_age
+        self.skipped = 0
+        self.checks = 0
+        self.divergences = 0
+        self.loads = 0
+        #Incrementado a cada alteração; check ignora leituras que correram junto com uma transição
+        self.version = 0
+        self._by_code: dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._loading: Optional[list[tuple[str, Optional[int]]]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def stale(self) -> bool:
+        return self.enabled and (self._loaded_at is None or monotonic() - self._loaded_at > self.max_age)
+
+    def load(self, fetch: Callable[[], Iterable[tuple[str, int]]]) -> int:
+        """
+        Recarrega o mapa com os pares (part_code, num_rnc) dos RNCs abertos devolvidos por fetch
+
+        Transições aplicadas enquanto a consulta roda são reaplicadas sobre o resultado dela.
+        """
+        with self._lock:
+            if self._loading is not None:
+                return len(self._by_code)
+            self._loading = []
+        try:
+            rows = fetch()
+            by_code = {part_code: num_rnc for part_code, num_rnc in rows}
+            with self._lock:
+                for part_code, num_rnc in self._loading:
+                    _store(by_code, part_code, num_rnc)
+                self._by_code = by_code
+                self.version += 1
+                self._loaded_at = monotonic()
+                self.loads += 1
+        finally:
+            with self._lock:
+                self._loading = None
+        logger.info("Índice de RNCs abertos por peça carregado: %s peças", len(by_code))
+        return len(by_code)
+
+    def apply(self, part_code: str, num_rnc: int, is_open: bool) -> None:
+        """Registra uma transição já commitada: RNC aberto entra no mapa, fechado sai"""
+        if not self.enabled:
+            return
+        value = num_rnc if is_open else None
+        with self._lock:
+            if self._loading is not None:
+                self._loading.append((part_code, value))
+            _store(self._by_code, part_code, value)
+            self.version += 1
+
+    def known_absent(self, part_code: str) -> bool:
+        """True se, no modo trust, o mapa garante que não há RNC aberto para a peça"""
+        if self.mode != "trust" or self.stale():
+            return False
+        with self._lock:
+            absent = part_code not in self._by_code
+        if absent:
+            self.skipped += 1
+        return absent
+
+    def check(self, part_code: str, num_rnc: Optional[int], version: int) -> None:
+        """
+        Compara o resultado lido do banco (num_rnc, ou None se não há aberto) com o mapa e corrige
+
+        version é o valor de self.version antes da consulta: se o mapa mudou enquanto ela
+        rodava, o resultado pode ser anterior à transição e a comparação é descartada.
+        """
+        if not self.enabled or self._loaded_at is None:
+            return
+        with self._lock:
+            if self.version != version:
+                return
+            self.checks += 1
+            indexed = self._by_code.get(part_code)
+            if indexed == num_rnc:
+                return
+            self.divergences += 1
+            _store(self._by_code, part_code, num_rnc)
+            self.version += 1
+        logger.warning("Índice de RNCs abertos divergente para a peça %s: índice %s, banco %s", part_code, indexed, num_rnc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_code.clear()
+            self._loaded_at = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._by_code)
+        return {
+            "mode": self.mode,
+            "size": size,
+            "age_seconds": round(monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "loads": self.loads,
+            "skipped_queries": self.skipped,
+            "checks": self.checks,
+            "divergences": self.divergences,
+        }
+
+def _store(by_code: dict[str, int], part_code: str, num_rnc: Optional[int]) -> None:
+    if num_rnc is None:
+        by_code.pop(part_code, None)
+    else:
+        by_code[part_code] = num_rnc
+
+open_rnc_index = OpenRNCIndex(settings.OPEN_RNC_INDEX_MODE.lower(), settings.OPEN_RNC_INDEX_MAX_AGE_SECONDS)
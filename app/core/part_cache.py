@@ -0,0 +1,131 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Optional
+import threading
+
+from app.core.config import settings
+from app import model, schema
+
+class PartCache:
+    """
+    Cache em processo do catálogo de peças, indexado por part_code
+
+    Guarda snapshots imutáveis (PartRead), nunca instâncias ligadas a uma sessão.
+    É limitado por tamanho (o menos usado recentemente sai primeiro) e por TTL, para que
+    alterações feitas por outros processos sejam vistas em no máximo TTL segundos.
+    Alterações feitas via ORM neste processo invalidam a entrada no commit (ver install_part_cache_hooks).
+    """
+    def __init__(self, max_size: int, ttl_seconds: float, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.enabled = enabled and max_size > 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, schema.PartRead]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, part_code: str) -> Optional[schema.PartRead]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(part_code)
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self._entries[part_code]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(part_code)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, part: schema.PartRead) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[part.part_code] = (monotonic() + self.ttl, part)
+            self._entries.move_to_end(part.part_code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, part_code: str, loader: Callable[[str], Optional[model.Part]]) -> Optional[schema.PartRead]:
+        """
+        Leitura com preenchimento: busca no cache e, se ausente ou expirado, usa o loader
+
+        Códigos inexistentes não são guardados, para que uma peça recém-cadastrada seja vista de imediato.
+        """
+        cached = self.get(part_code)
+        if cached is not None:
+            return cached
+        part = loader(part_code)
+        if part is None:
+            return None
+        snapshot = schema.PartRead.model_validate(part)
+        self.put(snapshot)
+        return snapshot
+
+    def invalidate(self, part_code: str) -> None:
+        with self._lock:
+            self._entries.pop(part_code, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def warm(self, parts: list[model.Part]) -> int:
+        """Pré-carrega as peças informadas (até o limite de tamanho) e retorna quantas foram carregadas"""
+        loaded = 0
+        for part in parts[:self.max_size]:
+            self.put(schema.PartRead.model_validate(part))
+            loaded += 1
+        return loaded
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {"enabled": self.enabled, "size": size, "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+part_cache = PartCache(settings.PART_CACHE_MAX_SIZE, settings.PART_CACHE_TTL_SECONDS, settings.PART_CACHE_ENABLED)
+
+#Códigos de peça alterados na transação corrente, guardados em session.info até o commit
+_DIRTY_KEY = "part_cache_dirty"
+
+def _collect_part(mapper, connection, target: model.Part) -> None:
+    session = object_session(target)
+    if session is None:
+        part_cache.invalidate(target.part_code)
+        return
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    dirty.add(target.part_code)
+    #Se o próprio código mudou, a entrada antiga também precisa sair
+    history = inspect(target).attrs.part_code.history
+    dirty.update(history.deleted or ())
+
+def _invalidate_committed(session: Session) -> None:
+    #after_commit também é emitido ao liberar um SAVEPOINT; só o commit da transação externa vale
+    if session.in_nested_transaction():
+        return
+    for part_code in session.info.pop(_DIRTY_KEY, ()):
+        part_cache.invalidate(part_code)
+
+def _discard_rolled_back(session: Session, transaction) -> None:
+    #Depois do commit a lista já foi consumida; aqui só sobra a de uma transação desfeita
+    if transaction.parent is None:
+        session.info.pop(_DIRTY_KEY, None)
+
+def install_part_cache_hooks() -> None:
+    """
+    Invalida o cache a cada insert/update/delete de Part feito via ORM neste processo
+
+    Os códigos são coletados no flush e invalidados só depois do commit: invalidar no
+    flush deixaria uma leitura concorrente recolocar no cache a linha ainda não commitada
+    (ex: uma peça desativada continuaria aceitando RNCs até o TTL).
+    """
+    hooks = [(model.Part, event_name, _collect_part) for event_name in ("after_insert", "after_update", "after_delete")]
+    hooks += [(Session, "after_commit", _invalidate_committed), (Session, "after_transaction_end", _discard_rolled_back)]
+    for target, event_name, hook in hooks:
+        if not event.contains(target, event_name, hook):
+            event.listen(target, event_name, hook)
+
+install_part_cache_hooks()
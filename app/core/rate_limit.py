@@ -0,0 +1,253 @@
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import Optional
+import asyncio
+import logging
+import math
+import json
+
+from sqlalchemy import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+#Rotas que nunca são limitadas nem descartadas (sondas e coleta de métricas)
+EXEMPT_PATHS = ("/health", "/metrics")
+#Streams de longa duração: passam pelo limite na abertura, mas não contam como requisições em andamento
+STREAM_PATHS = ("/ws/rncs/events",)
+
+class TokenBucket:
+    """Bucket com capacidade `capacity` reabastecido a `rate` fichas por segundo"""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: int, now: float):
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, capacity: int, rate: float, now: float) -> float:
+        """
+        Consome uma ficha
+
+        Returns:
+            0 se a requisição pode seguir; senão, segundos até haver uma ficha disponível
+        """
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+class RateLimiter:
+    """
+    Token buckets por regra de rota e cliente (usuário autenticado ou IP)
+
+    Os buckets ficam em um OrderedDict limitado a max_keys (descarte LRU); um bucket
+    descartado volta cheio, o que só afrouxa o limite para clientes inativos há tempo.
+    Usado apenas no event loop, por isso não precisa de lock.
+    """
+    def __init__(self, rules: dict[str, tuple[int, float]], max_keys: int):
+        self.default = rules.get("*")
+        self.exact = {route: budget for route, budget in rules.items() if route != "*" and not route.endswith("*")}
+        #Prefixos mais longos primeiro, para a regra mais específica vencer
+        self.prefixes = sorted(
+            ((route[:-1], budget) for route, budget in rules.items() if route != "*" and route.endswith("*")),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self.max_keys = max_keys
+        self.limited = 0
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+
+    def rule_for(self, method: str, path: str) -> Optional[tuple[str, tuple[int, float]]]:
+        route = f"{method} {path}"
+        if route in self.exact:
+            return route, self.exact[route]
+        for prefix, budget in self.prefixes:
+            if route.startswith(prefix):
+                return prefix + "*", budget
+        return ("*", self.default) if self.default else None
+
+    def check(self, method: str, path: str, client_key: str) -> float:
+        """Retorna 0 se a requisição cabe no orçamento; senão, os segundos de espera sugeridos"""
+        rule = self.rule_for(method, path)
+        if rule is None:
+            return 0.0
+        name, (capacity, seconds) = rule
+        now = monotonic()
+        key = (name, client_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(capacity, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.take(capacity, capacity / seconds, now)
+        if wait:
+            self.limited += 1
+        return wait
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "max_keys": self.max_keys, "limited": self.limited}
+
+class WindowAverage:
+    """
+    Média das amostras dos últimos `window` segundos; sem amostras recentes a média é 0
+
+    Com min_samples a soma é dividida por pelo menos esse número, para que uma única
+    amostra alta (ex: logo após subir o processo) não dispare o descarte sozinha.
+    """
+    def __init__(self, window: float, min_samples: int = 1):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: deque[tuple[float, float]] = deque()
+        self._total = 0.0
+
+    def add(self, value: float) -> None:
+        self._samples.append((monotonic(), value))
+        self._total += value
+
+    def value(self) -> float:
+        limit = monotonic() - self.window
+        while self._samples and self._samples[0][0] < limit:
+            self._total -= self._samples.popleft()[1]
+        return self._total / max(len(self._samples), self.min_samples) if self._samples else 0.0
+
+class LoadMonitor:
+    """
+    Sinais de sobrecarga do processo: atraso do event loop, espera por conexão do pool e
+    requisições em andamento
+
+    O atraso do loop é medido por uma tarefa que dorme `interval` segundos e anota quanto
+    acordou atrasada. A espera do pool é medida em Engine.raw_connection, por onde passam
+    todas as sessões; a espera bloqueia o próprio event loop, então os dois sinais se reforçam.
+    """
+    def __init__(self, window: float, interval: float = 0.1):
+        self.interval = interval
+        self.loop_lag = WindowAverage(window, min_samples=max(1, int(window / interval)))
+        self.pool_wait = WindowAverage(window)
+        self.in_flight = 0
+        self.shed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._measure_loop_lag())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _measure_loop_lag(self) -> None:
+        while True:
+            started = monotonic()
+            await asyncio.sleep(self.interval)
+            self.loop_lag.add(max(0.0, monotonic() - started - self.interval))
+
+    def instrument_engine(self, engine: Engine) -> None:
+        """Mede o tempo de obtenção de cada conexão do pool do engine"""
+        raw_connection = engine.raw_connection
+
+        def timed_raw_connection(*args, **kwargs):
+            started = monotonic()
+            try:
+                return raw_connection(*args, **kwargs)
+            finally:
+                self.pool_wait.add(monotonic() - started)
+
+        engine.raw_connection = timed_raw_connection
+
+    def overload_reason(self) -> Optional[str]:
+        """Motivo para descartar a requisição, ou None se o processo aguenta mais carga"""
+        if settings.LOAD_SHED_MAX_IN_FLIGHT and self.in_flight >= settings.LOAD_SHED_MAX_IN_FLIGHT:
+            return "in_flight"
+        if settings.LOAD_SHED_LOOP_LAG_MS and self.loop_lag.value() * 1000 > settings.LOAD_SHED_LOOP_LAG_MS:
+            return "loop_lag"
+        if settings.LOAD_SHED_POOL_WAIT_MS and self.pool_wait.value() * 1000 > settings.LOAD_SHED_POOL_WAIT_MS:
+            return "pool_wait"
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "loop_lag_ms": round(self.loop_lag.value() * 1000, 2),
+            "pool_wait_ms": round(self.pool_wait.value() * 1000, 2),
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+        }
+
+rate_limiter = RateLimiter(settings.rate_limit_rules, settings.RATE_LIMIT_MAX_KEYS)
+load_monitor = LoadMonitor(settings.LOAD_SHED_WINDOW_SECONDS)
+
+def _client_key(scope) -> str:
+    """Usuário do access token quando válido; senão o IP do cliente"""
+    from app.core.security import verify_token
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                payload = verify_token(token)
+                if payload and payload.get("user_id") is not None:
+                    return f"user:{payload['user_id']}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+async def _reject(send, retry_after: float, detail: str) -> None:
+    body = json.dumps({"error": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de rate limit e descarte de carga
+
+    1. Com o processo sobrecarregado (atraso do loop, espera do pool ou requisições em
+       andamento acima dos limites) a requisição recebe 429 na hora, sem entrar na fila.
+    2. Senão, consome uma ficha do bucket da rota para o usuário (ou IP); sem ficha, 429
+       com o Retry-After até a próxima ficha.
+    """
+    def __init__(self, app, limiter: RateLimiter = rate_limiter, monitor: LoadMonitor = load_monitor):
+        self.app = app
+        self.limiter = limiter
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        reason = self.monitor.overload_reason()
+        if reason:
+            self.monitor.shed += 1
+            logger.warning("Carga descartada (%s): %s %s", reason, scope["method"], scope["path"])
+            await _reject(send, settings.LOAD_SHED_RETRY_AFTER_SECONDS, "Servidor sobrecarregado, tente novamente em instantes")
+            return
+
+        if settings.RATE_LIMIT_ENABLED:
+            client_key = _client_key(scope)
+            wait = self.limiter.check(scope["method"], scope["path"], client_key)
+            if wait:
+                logger.info("Rate limit atingido por %s em %s %s", client_key, scope["method"], scope["path"])
+                await _reject(send, wait, "Muitas requisições, tente novamente mais tarde")
+                return
+
+        if scope["path"] in STREAM_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        self.monitor.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight -= 1
@@ -0,0 +1,216 @@
+from fastapi import Response
+from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+from time import time
+import threading
+import secrets
+import sqlite3
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    """Armazenamento no próprio processo: OrderedDict com descarte LRU"""
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._tag_versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    def bump_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteBackend:
+    """
+    Armazenamento local compartilhado: um arquivo SQLite (WAL) usado por todos os workers da máquina
+
+    As versões das tags também ficam no arquivo, então uma transição registrada por um worker
+    invalida as entradas para todos; as versões das coleções usadas nos ETags (conditional.py)
+    e a época desses ETags também. Cada thread usa sua própria conexão.
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, body BLOB NOT NULL, last_access REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_last_access ON response_cache (last_access)")
+            connection.execute("CREATE TABLE IF NOT EXISTS response_cache_tag (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            #Época comum a todos os workers, sorteada pelo primeiro que cria o arquivo (entra nos ETags)
+            connection.execute("INSERT OR IGNORE INTO response_cache_tag (tag, version) VALUES ('epoch', ?)", (secrets.randbits(48),))
+            self.epoch = format(connection.execute("SELECT version FROM response_cache_tag WHERE tag = 'epoch'").fetchone()[0], "012x")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        tags = list(tags)
+        placeholders = ",".join("?" * len(tags))
+        rows = self._connection().execute(f"SELECT tag, version FROM response_cache_tag WHERE tag IN ({placeholders})", tags).fetchall()
+        versions = dict(rows)
+        return {tag: versions.get(tag, 0) for tag in tags}
+
+    def bump_tags(self, tags: Iterable[str]) -> None:
+        self._connection().executemany(
+            "INSERT INTO response_cache_tag (tag, version) VALUES (?, 1) ON CONFLICT(tag) DO UPDATE SET version = version + 1",
+            [(tag,) for tag in tags]
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self._connection()
+        row = connection.execute("SELECT body FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (time(), key))
+        return row[0]
+
+    def set(self, key: str, body: bytes) -> None:
+        connection = self._connection()
+        connection.execute("INSERT OR REPLACE INTO response_cache (key, body, last_access) VALUES (?, ?, ?)", (key, body, time()))
+        excess = connection.execute("SELECT count(*) FROM response_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM response_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM response_cache")
+
+class ResponseCache:
+    """
+    Cache de respostas já serializadas (bytes JSON), por rota, filtros e papel do usuário
+
+    Cada entrada depende de tags (ex: "rnc:pending_rework"). As versões atuais das tags
+    fazem parte da chave, então invalidar é só incrementar a versão: as entradas antigas
+    ficam inalcançáveis e saem pelo LRU. As versões são lidas antes de montar a resposta,
+    assim uma transição que ocorra durante a montagem nunca deixa uma entrada velha visível.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _key(self, route: str, role: str, params: dict, tag_versions: dict[str, int]) -> str:
+        filters = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+        versions = ",".join(f"{tag}:{version}" for tag, version in sorted(tag_versions.items()))
+        return f"{route}|{role}|{filters}|{versions}"
+
+    def get_or_build(self, route: str, role: str, params: dict, tags: Iterable[str], build: Callable[[], BaseModel]) -> bytes:
+        """Retorna o corpo em cache ou monta, serializa e guarda a resposta"""
+        if not self.enabled:
+            return build().model_dump_json().encode()
+        key = self._key(route, role, params, self.backend.tag_versions(tags))
+        body = self.backend.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+        self.misses += 1
+        body = build().model_dump_json().encode()
+        self.backend.set(key, body)
+        return body
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_tags(tags)
+            self.invalidations += 1
+        except sqlite3.Error as e:
+            #Sem conseguir invalidar, o cache inteiro deixa de ser confiável
+            logger.error("Falha ao invalidar o cache de respostas, limpando: %s", e)
+            self.backend.clear()
+
+    def clear(self) -> None:
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "backend": self.backend.name,
+            "size": self.backend.size(),
+            "max_entries": self.backend.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "evictions": self.backend.evictions,
+        }
+
+def _create_backend():
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    if backend == "sqlite":
+        return SQLiteBackend(settings.RESPONSE_CACHE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES)
+    if backend != "none":
+        raise ValueError(f"RESPONSE_CACHE_BACKEND inválido: '{settings.RESPONSE_CACHE_BACKEND}' (use memory, sqlite ou none)")
+    return None
+
+response_cache = ResponseCache(_create_backend())
+
+def cached_json_response(route: str, role: str, params: dict, tags: Iterable[str], build: Callable[[], BaseModel], sub_response: Response) -> Response:
+    """
+    Resposta JSON servida pelo cache de respostas
+
+    Ao devolver um Response pronto o FastAPI não aplica os cabeçalhos definidos por dependências
+    (ex: ETag), por isso eles são copiados de sub_response.
+    """
+    body = response_cache.get_or_build(route, role, params, tags, build)
+    return Response(content=body, media_type="application/json", headers=dict(sub_response.headers))
@@ -1,34 +1,34 @@
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
-from jose import JWTError, jwt
 import logging
 
+#python-jose (e o backend cryptography) é importado sob demanda para não pesar na inicialização
+
 logger = logging.getLogger(__name__)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    """Cria token JWT com debug detalhado"""
+    """Cria token JWT de acesso"""
     
     if not data or not isinstance(data, dict):
         logger.error("Dados inválidos!")
         raise ValueError("Invalid payload data for token generation")
 
+    from jose import jwt
+
     try:
         # Preparar dados e definir expiração
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES))
         to_encode.update({"exp": expire})
         
-        logger.info(f"   ⏰ Data de expiração: {expire}")
-        logger.info(f"   📦 Dados com expiração: {to_encode}")
-        
         # Criar token
         token = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         
-        logger.debug(f"   🎉 Token criado com sucesso para o usuário: {data.get('sub')}")
+        logger.debug("   🎉 Token criado com sucesso para o usuário: %s", data.get("sub"))
         return token
         
     except Exception as e:
-        logger.exception(f"   💥 ERRO em create_access_token: {e}")
+        logger.exception("   💥 ERRO em create_access_token: %s", e)
         raise RuntimeError("Failed to create JWT token") from e
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -37,6 +37,8 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None) ->
     Normalmente contém apenas o ID do usuário (sub)
     """
 
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -54,12 +56,23 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None) ->
 
 def verify_token(token: str) -> dict | None:
     """Verifica token JWT"""
-    
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         logger.debug("Token verificado com sucesso")
         return payload
     except JWTError as e:
-        logger.warning(f"❌ Token inválido: {e}")
+        logger.warning("❌ Token inválido: %s", e)
         return None
     
+
+def verify_refresh_token(token: str) -> dict | None:
+    """Verifica assinatura e expiração de um refresh token JWT"""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, settings.REFRESH_SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError as e:
+        logger.warning("❌ Refresh token inválido: %s", e)
+        return None
@@ -0,0 +1,185 @@
+from sqlalchemy import Engine, event
+from contextvars import ContextVar
+from time import perf_counter
+from functools import wraps
+from typing import Optional
+import threading
+import logging
+import re
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+#Método de repositório em execução; usado para etiquetar cada comando SQL emitido
+current_repository_method: ContextVar[Optional[str]] = ContextVar("current_repository_method", default=None)
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))+\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduz um comando SQL ao seu formato (shape)
+
+    Literais viram "?" e listas IN de tamanho variável (ex: as geradas pelo selectinload)
+    viram "(?...)", para que execuções equivalentes sejam agregadas juntas.
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class StatementStats:
+    """Estatísticas agregadas de um formato de comando SQL"""
+    __slots__ = ("shape", "calls", "total_seconds", "max_seconds", "rows", "methods", "last_plan")
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.methods: set[str] = set()
+        self.last_plan: Optional[list[str]] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "sql": self.shape,
+            "calls": self.calls,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "rows": self.rows,
+            "methods": sorted(self.methods),
+            "last_slow_plan": self.last_plan
+        }
+
+class SQLProfiler:
+    """
+    Agrega duração e linhas por formato de SQL e registra consultas lentas com o plano
+
+    O número de formatos guardados é limitado; ao exceder, o de menor tempo total é descartado.
+    """
+    ORDERINGS = {
+        "total": lambda s: s.total_seconds,
+        "mean": lambda s: s.total_seconds / s.calls if s.calls else 0.0,
+        "max": lambda s: s.max_seconds,
+        "calls": lambda s: s.calls,
+    }
+
+    def __init__(self, slow_threshold_ms: float, max_shapes: int = 500):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.max_shapes = max_shapes
+        self.statements: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, rows: Optional[int], method: Optional[str]) -> StatementStats:
+        shape = normalize_sql(statement)
+        with self._lock:
+            stats = self.statements.get(shape)
+            if stats is None:
+                if len(self.statements) >= self.max_shapes:
+                    cheapest = min(self.statements.values(), key=lambda s: s.total_seconds)
+                    del self.statements[cheapest.shape]
+                stats = self.statements[shape] = StatementStats(shape)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            if rows is not None and rows >= 0:
+                stats.rows += rows
+            stats.methods.add(method or "<fora de repositório>")
+        return stats
+
+    def top(self, limit: int = 20, order_by: str = "total") -> list[dict]:
+        """Retorna os N formatos de SQL mais caros segundo o critério informado"""
+        key = self.ORDERINGS.get(order_by)
+        if key is None:
+            raise ValueError(f"Ordenação inválida. Valores válidos: {', '.join(self.ORDERINGS)}")
+        with self._lock:
+            ranked = sorted(self.statements.values(), key=key, reverse=True)[:limit]
+            return [stats.as_dict() for stats in ranked]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements.clear()
+
+profiler: Optional[SQLProfiler] = SQLProfiler(settings.SLOW_QUERY_THRESHOLD_MS) if settings.SQL_PROFILING else None
+
+def _explain(dbapi_connection, dialect_name: str, statement: str, parameters) -> list[str]:
+    """
+    Obtém o plano do comando usando um cursor novo da mesma conexão DBAPI
+
+    No PostgreSQL um EXPLAIN que falhe abortaria a transação da requisição (as consultas
+    seguintes dariam InFailedSqlTransaction), por isso ele roda dentro de um SAVEPOINT,
+    desfeito em caso de erro. Em autocommit não há transação a proteger.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    savepoint = dialect_name == "postgresql" and not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT sql_profiler_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [str(row[-1] if dialect_name == "sqlite" else row[0]) for row in cursor.fetchall()]
+        except Exception:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+            raise
+        finally:
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+    finally:
+        cursor.close()
+
+def install_sql_profiler(engine: Engine) -> None:
+    """Registra os eventos de profiling no engine (apenas com SQL_PROFILING habilitado)"""
+    if profiler is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_query_start", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["profiler_query_start"].pop()
+        method = current_repository_method.get()
+        stats = profiler.record(statement, elapsed, cursor.rowcount, method)
+
+        if elapsed < profiler.slow_threshold or executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        try:
+            stats.last_plan = _explain(conn.connection.dbapi_connection, conn.dialect.name, statement, parameters)
+        except Exception as e:
+            logger.warning("Não foi possível obter o plano da consulta lenta: %s", e)
+        logger.warning(
+            "🐢 Consulta lenta (%.1f ms) em %s: %s\n   Plano: %s",
+            elapsed * 1000, method or "<fora de repositório>", stats.shape, " | ".join(stats.last_plan or [])
+        )
+
+def _tag_method(name: str, function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        token = current_repository_method.set(name)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            current_repository_method.reset(token)
+    return wrapper
+
+def profiled_repository(cls):
+    """
+    Decorador de classe que etiqueta o SQL emitido por cada método público do repositório
+
+    Com SQL_PROFILING desabilitado a classe é devolvida sem alterações (custo zero).
+    """
+    if profiler is None:
+        return cls
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or not callable(attribute) or isinstance(attribute, (staticmethod, classmethod)):
+            continue
+        setattr(cls, name, _tag_method(f"{cls.__name__}.{name}", attribute))
+    return cls
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from time import perf_counter
+import os
+
+class StartupProfiler:
+    """
+    Mede o tempo gasto em cada import e etapa do lifespan durante a inicialização
+
+    Ativado pela variável de ambiente STARTUP_PROFILE=1. É lida direto do ambiente
+    (e não de Settings) para que o próprio carregamento das configurações seja medido.
+    Desativado, step() não faz nada além de um yield.
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.steps: list[tuple[str, float]] = []
+        self._started = perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, perf_counter() - start))
+
+    def report(self) -> None:
+        """Imprime o tempo de cada etapa e o total desde o início do processo de boot"""
+        if not self.enabled:
+            return
+        total = perf_counter() - self._started
+        lines = ["⏱️ Perfil de inicialização:"]
+        lines += [f"   {elapsed * 1000:8.1f} ms  {name}" for name, elapsed in self.steps]
+        lines.append(f"   {total * 1000:8.1f} ms  total até ficar pronto")
+        print("\n".join(lines), flush=True)
+
+profiler = StartupProfiler(enabled=os.environ.get("STARTUP_PROFILE", "").lower() in ("1", "true"))
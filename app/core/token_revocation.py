@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+import threading
+
+from app.core.config import settings
+
+class RefreshTokenCache:
+    """
+    Estado recente dos refresh tokens mantido no processo, na frente da tabela refresh_token
+
+    Guarda os jti já consumidos (com o instante do consumo) e as famílias revogadas, ambos limitados por
+    LRU. Serve apenas para recusar reusos conhecidos sem ir ao banco: a ausência no cache
+    não prova nada, e a troca de um token continua decidida pelo UPDATE condicional no banco,
+    que também vê consumos feitos por outros processos. Por isso o caminho comum (token
+    válido) não ganha nenhuma consulta extra.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self._consumed: OrderedDict[str, datetime] = OrderedDict()
+        self._revoked: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, entries: OrderedDict, key: str, value) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def mark_consumed(self, jti: str, used_at: datetime) -> None:
+        with self._lock:
+            self._put(self._consumed, jti, used_at)
+
+    def revoke_family(self, family_id: str) -> None:
+        with self._lock:
+            self._put(self._revoked, family_id, None)
+
+    def is_revoked(self, family_id: str) -> bool:
+        with self._lock:
+            revoked = family_id in self._revoked
+        if revoked:
+            self.hits += 1
+        return revoked
+
+    def consumed_at(self, jti: str) -> Optional[datetime]:
+        """Instante em que o token foi trocado neste processo, ou None se o cache não sabe"""
+        with self._lock:
+            used_at = self._consumed.get(jti)
+        if used_at is not None:
+            self.hits += 1
+        return used_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._consumed.clear()
+            self._revoked.clear()
+
+    def stats(self) -> dict:
+        return {
+            "consumed": len(self._consumed),
+            "revoked_families": len(self._revoked),
+            "max_size": self.max_size,
+            "hits": self.hits,
+        }
+
+refresh_token_cache = RefreshTokenCache(settings.REFRESH_TOKEN_CACHE_SIZE)
@@ -0,0 +1,54 @@
+from typing import Generic, Hashable, Optional, TypeVar
+from time import monotonic
+
+V = TypeVar("V")
+
+class TTLMap(Generic[V]):
+    """
+    Mapa limitado em que todas as entradas têm o mesmo TTL
+
+    Com um TTL único a ordem de inserção do dict é também a ordem de expiração: as entradas
+    vencidas são sempre as da frente e saem por lá, sem varrer o mapa, e acima de max_size
+    as mais antigas são descartadas (contadas em evictions). Regravar uma chave a move para
+    o fim com um TTL novo. Usado apenas no event loop, por isso não tem lock.
+    """
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries: dict[Hashable, tuple[float, V]] = {}
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+
+    def put(self, key: Hashable, value: V) -> None:
+        now = monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, value)
+        self._expire(now)
+        while len(self._entries) > self.max_size:
+            del self._entries[next(iter(self._entries))]
+            self.evictions += 1
+
+    def get(self, key: Hashable) -> Optional[V]:
+        self._expire(monotonic())
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove e devolve a entrada; None se não existir ou já tiver vencido"""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= monotonic():
+            return None
+        return entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        self._expire(monotonic())
+        return len(self._entries)
@@ -1,11 +1,20 @@
-from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel import create_engine, Session
+from starlette.exceptions import HTTPException
+from starlette.requests import HTTPConnection
+from sqlalchemy import Engine, Select, event
+from contextvars import ContextVar
+from functools import wraps
+from itertools import count
+from time import monotonic
+from typing import Optional
+import threading
 import logging
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-def get_engine():
-    database_url = settings.DATABASE_URL
+def get_engine(database_url: Optional[str] = None):
+    database_url = database_url or settings.DATABASE_URL
 
     if database_url.startswith("sqlite"):
         connect_args = {"check_same_thread": False}
@@ -13,27 +22,118 @@ def get_engine():
         connect_args = {}
     else:
         connect_args = {}
-    
-    engine = create_engine(database_url, echo=True, connect_args=connect_args)
+
+    #Log de SQL é controlado pelo logger "sqlalchemy.engine" (Settings.LOG_SQL), não por echo
+    engine = create_engine(database_url, connect_args=connect_args)
     return engine
 
 engine = get_engine()
+replica_engines: list[Engine] = [get_engine(url) for url in settings.replica_urls]
 
-#Cria no banco todas as tabelas definidas com o SQLModel
-def create_db_and_tables():
-    try:
-        SQLModel.metadata.create_all(engine)
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Error creating tables: {e}")
-        raise
+#Ligado pelos métodos de repositório marcados com @replica_read
+_replica_read: ContextVar[bool] = ContextVar("replica_read", default=False)
+
+def replica_read(function):
+    """
+    Marca um método de repositório somente leitura como elegível para as réplicas
+
+    Métodos sem a marca (inclusive leituras usadas em fluxos de escrita, como get_by_num)
+    continuam sempre no primário.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _replica_read.set(True)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _replica_read.reset(token)
+    return wrapper
+
+class ReplicaSelector:
+    """Escolhe a réplica de cada leitura: round_robin ou least_connections (menos conexões em uso no pool)"""
+    def __init__(self, engines: list[Engine], strategy: str):
+        self.engines = engines
+        self.strategy = strategy
+        self._counter = count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Engine:
+        if self.strategy == "least_connections":
+            return min(self.engines, key=lambda e: getattr(e.pool, "checkedout", lambda: 0)())
+        with self._lock:
+            return self.engines[next(self._counter) % len(self.engines)]
+
+class RecentWriters:
+    """Usuários que escreveram há menos de READ_YOUR_WRITES_SECONDS e por isso leem do primário"""
+    def __init__(self, window_seconds: float):
+        self.window = window_seconds
+        self._until: dict[int, float] = {}
+        self._lock = threading.Lock()
 
-def get_db():
+    def mark(self, user_id: int) -> None:
+        now = monotonic()
+        with self._lock:
+            self._until[user_id] = now + self.window
+            #Limpeza preguiçosa para o dicionário não crescer indefinidamente
+            if len(self._until) > 10000:
+                self._until = {uid: until for uid, until in self._until.items() if until > now}
+
+    def is_recent(self, user_id: int) -> bool:
+        return self._until.get(user_id, 0.0) > monotonic()
+
+replica_selector = ReplicaSelector(replica_engines, settings.REPLICA_SELECTION) if replica_engines else None
+recent_writers = RecentWriters(settings.READ_YOUR_WRITES_SECONDS)
+
+class RoutingSession(Session):
+    """
+    Sessão que envia leituras marcadas com @replica_read para as réplicas
+
+    Fica no primário quando:
+    - o comando é escrita, SELECT ... FOR UPDATE ou o flush do ORM
+    - a própria sessão já escreveu (info["wrote"])
+    - a requisição foi fixada no primário (request.state.primary_only, ex: respostas com ETag)
+    - o usuário da requisição (info["user_id"]) escreveu há pouco (read-your-writes)
+    """
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._use_replica(clause):
+            return replica_selector.choose()
+        return engine
+
+    def _use_replica(self, clause) -> bool:
+        if not _replica_read.get() or self._flushing:
+            return False
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return False
+        if self.info.get("wrote") or getattr(self.info.get("request_state"), "primary_only", False):
+            return False
+        user_id = self.info.get("user_id")
+        return not (user_id and recent_writers.is_recent(user_id))
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_recent_writer(session):
+    user_id = session.info.get("user_id")
+    if session.info.get("wrote") and user_id:
+        recent_writers.mark(user_id)
+
+def get_db(connection: HTTPConnection):
     try:
-        with Session(engine) as session:
-            yield session
+        if replica_engines:
+            with RoutingSession(engine) as session:
+                #Lido a cada consulta: dependências que rodam depois desta ainda podem fixar o primário
+                session.info["request_state"] = connection.state
+                yield session
+        else:
+            with Session(engine) as session:
+                yield session
+    except HTTPException:
+        #Respostas HTTP (inclusive 304) levantadas pela rota não são erros de banco
+        raise
     except Exception as e:
-        logger.error(f"Database session error: {e}")
+        logger.error("Database session error: %s", e)
         raise
     finally:
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,11 @@
+from .runner import apply_migrations, check_schema_version, get_current_version, get_head_version, get_pending_migrations, stamp, SchemaVersionError
+
+__all__ = [
+    "apply_migrations",
+    "check_schema_version",
+    "get_current_version",
+    "get_head_version",
+    "get_pending_migrations",
+    "stamp",
+    "SchemaVersionError"
+]
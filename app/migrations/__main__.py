@@ -0,0 +1,70 @@
+"""
+Linha de comando das migrações
+
+Uso:
+    python -m app.migrations status         #mostra a versão atual e as migrações pendentes
+    python -m app.migrations upgrade        #aplica as migrações pendentes (cria o schema em banco vazio)
+    python -m app.migrations stamp <versão> #marca o banco em uma versão sem executar migrações
+    python -m app.migrations check-plans    #verifica via EXPLAIN se as consultas do RNCRepository usam índice
+"""
+import argparse
+import sys
+
+from app.database import engine
+from app.migrations import apply_migrations, get_current_version, get_head_version, get_pending_migrations, stamp
+
+def _status() -> int:
+    print(f"📦 Versão atual: {get_current_version(engine)} | versão do código: {get_head_version()}")
+    pending = get_pending_migrations(engine)
+    for migration in pending:
+        print(f"   ⏳ {migration.VERSION:04d} - {migration.DESCRIPTION}")
+    if not pending:
+        print("✅ Schema já está atualizado")
+    return 0
+
+def _upgrade() -> int:
+    applied = apply_migrations(engine)
+    if applied:
+        print(f"✅ Migrações aplicadas: {', '.join(f'{v:04d}' for v in applied)}")
+    else:
+        print("✅ Schema já está atualizado")
+    return 0
+
+def _stamp(version: int) -> int:
+    stamp(engine, version)
+    print(f"✅ Banco marcado na versão {version}")
+    return 0
+
+def _check_plans() -> int:
+    from app.migrations.plan_check import check_index_usage
+
+    failures = 0
+    for result in check_index_usage(engine):
+        mark = "✅" if result.uses_index else "❌"
+        print(f"{mark} {result.query}")
+        for line in result.plan:
+            print(f"      {line}")
+        if not result.uses_index:
+            failures += 1
+    return 1 if failures else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Migrações do schema do RNC Digital System")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Mostra a versão atual e as migrações pendentes")
+    subparsers.add_parser("upgrade", help="Aplica as migrações pendentes")
+    stamp_parser = subparsers.add_parser("stamp", help="Marca o banco em uma versão sem executar migrações")
+    stamp_parser.add_argument("version", type=int)
+    subparsers.add_parser("check-plans", help="Verifica via EXPLAIN se as consultas do RNCRepository usam índice")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        return _status()
+    if args.command == "upgrade":
+        return _upgrade()
+    if args.command == "stamp":
+        return _stamp(args.version)
+    return _check_plans()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+from sqlalchemy import Connection, inspect, text
+from typing import Optional
+
+def create_index(connection: Connection, name: str, table: str, columns: str, where: Optional[str] = None) -> None:
+    """
+    Cria um índice se ele ainda não existir
+
+    No PostgreSQL usa CREATE INDEX CONCURRENTLY para não bloquear escritas na tabela,
+    o que exige que a migração rode fora de transação (TRANSACTIONAL = False).
+    Um índice deixado inválido por uma criação concorrente interrompida é recriado.
+
+    Args:
+        connection: Conexão da migração
+        name: Nome do índice
+        table: Tabela indexada
+        columns: Lista de colunas/expressões entre parênteses, ex: "(status, condition)"
+        where: Predicado do índice parcial
+    """
+    concurrently = ""
+    if connection.dialect.name == "postgresql":
+        concurrently = "CONCURRENTLY "
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    ddl = f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} {columns}"
+    if where:
+        ddl += f" WHERE {where}"
+    connection.execute(text(ddl))
+
+def add_column(connection: Connection, table: str, column: str, ddl_type: str) -> None:
+    """Adiciona uma coluna anulável se ela ainda não existir"""
+    existing = {col["name"] for col in inspect(connection).get_columns(table)}
+    if column in existing:
+        return
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
@@ -0,0 +1,93 @@
+from sqlalchemy import Engine, event
+from sqlmodel import Session
+from dataclasses import dataclass, field
+from typing import Callable
+import re
+
+from app.repository.rnc_repository import RNCRepository
+from app import model
+
+#Consultas do RNCRepository que precisam ser atendidas por índice.
+#list_all sem filtros e list_by_analysis_status(pending=False) (predicado "!=") ficam de fora por natureza.
+CHECKED_QUERIES: dict[str, Callable[[RNCRepository], object]] = {
+    "get_by_num": lambda repo: repo.get_by_num(1),
+    "get_rnc_by_part_code": lambda repo: repo.get_rnc_by_part_code("PLAN-CHECK"),
+    "search_rnc_opened_by_user": lambda repo: repo.search_rnc_opened_by_user(1),
+    "search_rnc_rework_by_user": lambda repo: repo.search_rnc_rework_by_user(1),
+    "search_rnc_by_analysis_user": lambda repo: repo.search_rnc_by_analysis_user(1),
+    "list_all(status=aberto)": lambda repo: repo.list_all(status=model.RNCStatus.ABERTO.value),
+    "list_all(status, condition)": lambda repo: repo.list_all(status=model.RNCStatus.ABERTO.value, condition=model.RNCCondition.EM_ANALISE.value),
+    "list_by_rework_status(pending=True)": lambda repo: repo.list_by_rework_status(pending=True),
+    "list_by_rework_status(pending=False)": lambda repo: repo.list_by_rework_status(pending=False),
+    "list_by_analysis_status(pending=True)": lambda repo: repo.list_by_analysis_status(pending=True),
+}
+
+@dataclass
+class PlanResult:
+    """Resultado do EXPLAIN de uma consulta do repositório"""
+    query: str
+    statement: str
+    plan: list[str] = field(default_factory=list)
+    uses_index: bool = False
+
+def _capture_first_statement(engine: Engine, run: Callable[[RNCRepository], object]) -> tuple[str, object]:
+    """Executa o método do repositório e captura o SQL principal emitido (o primeiro da chamada)"""
+    captured = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        with Session(engine) as session:
+            run(RNCRepository(session))
+            session.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+    #Ignora o BEGIN/FOR UPDATE etc. emitidos pelo driver, mantendo apenas o SELECT sobre rnc
+    for statement, parameters in captured:
+        if statement.lstrip().upper().startswith("SELECT") and "FROM rnc" in statement:
+            return statement, parameters
+    raise RuntimeError("Nenhuma consulta sobre a tabela rnc foi emitida")
+
+def _explain(engine: Engine, statement: str, parameters) -> list[str]:
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            #Em tabelas pequenas o planner prefere seq scan; desabilitar verifica se existe índice utilizável
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+            plan = [row[0] for row in rows]
+        else:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plan = [row[-1] for row in rows]
+        connection.rollback()
+    return plan
+
+def _plan_uses_index(dialect: str, plan: list[str]) -> bool:
+    if dialect == "postgresql":
+        text_plan = "\n".join(plan)
+        return "Seq Scan on rnc" not in text_plan and "Index" in text_plan
+    rnc_steps = [line for line in plan if re.search(r"\brnc\b", line)]
+    return bool(rnc_steps) and all(("USING" in line and "INDEX" in line) or "PRIMARY KEY" in line for line in rnc_steps)
+
+def check_index_usage(engine: Engine) -> list[PlanResult]:
+    """
+    Roda EXPLAIN nas consultas do RNCRepository e verifica se usam índice
+
+    Args:
+        engine: Engine do banco de dados (SQLite ou PostgreSQL)
+    Returns:
+        Lista com o plano de execução de cada consulta verificada
+    """
+    results = []
+    for query, run in CHECKED_QUERIES.items():
+        statement, parameters = _capture_first_statement(engine, run)
+        plan = _explain(engine, statement, parameters)
+        results.append(PlanResult(
+            query=query,
+            statement=statement,
+            plan=plan,
+            uses_index=_plan_uses_index(engine.dialect.name, plan)
+        ))
+    return results
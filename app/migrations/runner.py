@@ -0,0 +1,166 @@
+from sqlalchemy import Engine, Connection, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from datetime import datetime, timezone
+from typing import Optional
+import logging
+
+from .versions import MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+#Chave do advisory lock do PostgreSQL que serializa execuções concorrentes do upgrade
+_MIGRATION_LOCK_KEY = 740_226_027
+
+class SchemaVersionError(RuntimeError):
+    """O schema do banco não está na versão esperada pelo código"""
+
+def _ensure_version_table(connection: Connection) -> None:
+    """Cria a tabela de controle de versão do schema, se ainda não existir"""
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+def _record_version(connection: Connection, version: int, description: str) -> None:
+    connection.execute(
+        text(f"INSERT INTO {VERSION_TABLE} (version, description, applied_at) VALUES (:version, :description, :applied_at)"),
+        {"version": version, "description": description, "applied_at": datetime.now(timezone.utc)}
+    )
+
+def _read_version(connection: Connection) -> Optional[int]:
+    """Lê a versão sem criar nada; retorna None se a tabela de versão não existir"""
+    try:
+        return connection.execute(text(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar() or 0
+    except DBAPIError:
+        connection.rollback()
+        return None
+
+def get_current_version(engine: Engine) -> int:
+    """
+    Retorna a versão atual do schema
+
+    Returns:
+        Maior versão aplicada ou 0 se nenhuma migração foi aplicada
+    """
+    with engine.connect() as connection:
+        return _read_version(connection) or 0
+
+def get_head_version() -> int:
+    """Retorna a versão da migração mais recente disponível no código"""
+    return MIGRATIONS[-1].VERSION if MIGRATIONS else 0
+
+def get_pending_migrations(engine: Engine) -> list:
+    """Retorna os módulos de migração ainda não aplicados"""
+    current = get_current_version(engine)
+    return [migration for migration in MIGRATIONS if migration.VERSION > current]
+
+def check_schema_version(engine: Engine) -> int:
+    """
+    Verificação rápida usada na inicialização: uma única consulta à tabela de versão
+
+    Returns:
+        Versão atual do schema
+    Raises:
+        SchemaVersionError: Se o banco estiver atrás (ou à frente) da versão do código
+    """
+    with engine.connect() as connection:
+        current = _read_version(connection)
+    head = get_head_version()
+
+    if current is None:
+        raise SchemaVersionError("Banco sem controle de versão. Execute: python -m app.migrations upgrade")
+    if current < head:
+        raise SchemaVersionError(f"Schema na versão {current}, código espera {head}. Execute: python -m app.migrations upgrade")
+    if current > head:
+        raise SchemaVersionError(f"Schema na versão {current} é mais novo que o código (versão {head})")
+    return current
+
+def _bootstrap(engine: Engine) -> bool:
+    """
+    Cria as tabelas a partir dos modelos em um banco vazio
+
+    Objetos que não estão nos modelos (índices parciais, busca textual etc.) são criados
+    em seguida pelas próprias migrações, que por isso precisam ser idempotentes.
+
+    Returns:
+        True se o banco estava vazio e foi criado
+    """
+    from app import model  #registra as tabelas no metadata
+
+    if inspect(engine).has_table(model.RNC.__tablename__):
+        return False
+
+    logger.info("Banco vazio: criando tabelas a partir dos modelos")
+    with engine.begin() as connection:
+        SQLModel.metadata.create_all(connection)
+    return True
+
+def _run_migration(engine: Engine, migration) -> None:
+    if getattr(migration, "TRANSACTIONAL", True):
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            _record_version(connection, migration.VERSION, migration.DESCRIPTION)
+        return
+
+    #Operações online (ex: CREATE INDEX CONCURRENTLY) não podem rodar dentro de transação
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        migration.upgrade(connection)
+    with engine.begin() as connection:
+        _record_version(connection, migration.VERSION, migration.DESCRIPTION)
+
+def apply_migrations(engine: Engine) -> list[int]:
+    """
+    Aplica, em ordem, as migrações ainda não registradas no banco
+
+    Em um banco vazio as tabelas são criadas direto dos modelos antes das migrações.
+    Migrações transacionais rodam na mesma transação do registro da versão; as não
+    transacionais são registradas apenas depois de concluídas, e por isso devem ser idempotentes.
+
+    Args:
+        engine: Engine do banco de dados
+    Returns:
+        Lista das versões aplicadas nesta execução
+    """
+    lock_connection = None
+    if engine.dialect.name == "postgresql":
+        lock_connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+
+    try:
+        _bootstrap(engine)
+
+        with engine.begin() as connection:
+            _ensure_version_table(connection)
+
+        applied = []
+        for migration in get_pending_migrations(engine):
+            logger.info("Aplicando migração %04d: %s", migration.VERSION, migration.DESCRIPTION)
+            _run_migration(engine, migration)
+            applied.append(migration.VERSION)
+        return applied
+    finally:
+        if lock_connection is not None:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+            lock_connection.close()
+
+def stamp(engine: Engine, version: int) -> None:
+    """
+    Marca o banco como estando na versão informada sem executar as migrações
+
+    Útil para bancos criados manualmente ou restaurados de backup.
+    """
+    known = {migration.VERSION: migration for migration in MIGRATIONS}
+    if version != 0 and version not in known:
+        raise ValueError(f"Versão desconhecida: {version}")
+
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        connection.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+        for migration in MIGRATIONS:
+            if migration.VERSION <= version:
+                _record_version(connection, migration.VERSION, migration.DESCRIPTION)
@@ -0,0 +1,14 @@
+#Lista ordenada das migrações versionadas; novas migrações devem ser adicionadas ao final
+from . import v0001_rnc_workflow_indexes
+from . import v0002_rnc_closing_notes
+from . import v0003_rnc_full_text_search
+from . import v0004_rnc_rollup
+from . import v0005_refresh_token
+
+MIGRATIONS = [
+    v0001_rnc_workflow_indexes,
+    v0002_rnc_closing_notes,
+    v0003_rnc_full_text_search,
+    v0004_rnc_rollup,
+    v0005_refresh_token,
+]
@@ -0,0 +1,37 @@
+"""
+Índices compostos e parciais para as consultas do fluxo de RNC
+
+Derivados dos predicados e ordenações do RNCRepository:
+- (usuário, data DESC) para as listagens por responsável
+- índices parciais para RNCs abertos e para cada condição pendente (apenas PostgreSQL)
+- índices simples nas chaves estrangeiras que ainda não tinham
+"""
+from sqlalchemy import Connection
+
+from app.migrations.operations import create_index
+
+VERSION = 1
+DESCRIPTION = "Índices compostos e parciais do fluxo de RNC"
+TRANSACTIONAL = False
+
+#(nome, colunas, predicado do índice parcial)
+INDEXES = [
+    ("ix_rnc_part_id", "(part_id)", None),
+    ("ix_rnc_current_responsible_id", "(current_responsible_id)", None),
+    ("ix_rnc_closed_by_id", "(closed_by_id)", None),
+    ("ix_rnc_open_by_id_date_of_occurrence", "(open_by_id, date_of_occurrence DESC)", None),
+    ("ix_rnc_rework_user_id_rework_date", "(rework_user_id, rework_date DESC)", None),
+    ("ix_rnc_analysis_user_id_analysis_date", "(analysis_user_id, analysis_date DESC)", None),
+    ("ix_rnc_status_condition", "(status, condition)", None),
+    ("ix_rnc_open_date_of_occurrence", "(date_of_occurrence)", "status = 'aberto'"),
+    ("ix_rnc_pending_em_analise", "(date_of_occurrence)", "condition = 'em_analise'"),
+    ("ix_rnc_pending_aguardando_retrabalho", "(date_of_occurrence)", "condition = 'aguardando_retrabalho'"),
+    ("ix_rnc_pending_aguardando_verificacao", "(date_of_occurrence)", "condition = 'aguardando_verificacao'"),
+]
+
+def upgrade(connection: Connection) -> None:
+    is_postgres = connection.dialect.name == "postgresql"
+    for name, columns, where in INDEXES:
+        if where and not is_postgres:
+            continue
+        create_index(connection, name, "rnc", columns, where)
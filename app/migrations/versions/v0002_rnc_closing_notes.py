@@ -0,0 +1,17 @@
+"""
+Coluna closing_notes no RNC
+
+Usada pelo fechamento manual (RNCRepository.close_rnc), que também passa a
+gravar a condição "concluido". Como condition é uma coluna texto, a nova
+condição não exige alteração de schema.
+"""
+from sqlalchemy import Connection
+
+from app.migrations.operations import add_column
+
+VERSION = 2
+DESCRIPTION = "Coluna closing_notes no RNC"
+TRANSACTIONAL = True
+
+def upgrade(connection: Connection) -> None:
+    add_column(connection, "rnc", "closing_notes", "TEXT")
@@ -0,0 +1,109 @@
+"""
+Busca textual nos campos livres do RNC
+
+- PostgreSQL: coluna tsvector com pesos por campo, mantida por trigger, + índice GIN
+- SQLite: tabela virtual FTS5 com conteúdo externo (rnc) mantida por triggers
+
+Em ambos os casos o índice é atualizado pelo próprio banco a cada escrita,
+inclusive as que não passam pelo RNCRepository (cargas em lote).
+
+No PostgreSQL a migração roda online: a coluna é adicionada anulável (só altera o
+catálogo, sem reescrever a tabela), o trigger passa a preencher as linhas escritas a
+partir dali, as existentes são preenchidas em lotes curtos, cada um na sua transação,
+e o índice GIN é criado com CONCURRENTLY. Uma coluna GENERATED ... STORED reescreveria
+a tabela inteira sob ACCESS EXCLUSIVE, bloqueando leituras e escritas durante a migração.
+"""
+from sqlalchemy import Connection, text
+
+from app.migrations.operations import add_column, create_index
+
+VERSION = 3
+DESCRIPTION = "Busca textual (tsvector/GIN e FTS5) nos campos livres do RNC"
+TRANSACTIONAL = False
+
+#Campos indexados, na ordem das colunas da tabela FTS5
+SEARCH_FIELDS = ("title", "observations", "root_cause", "corrective_action", "rework_description", "actions_taken")
+
+#Linhas preenchidas por transação no backfill do PostgreSQL
+BACKFILL_BATCH_SIZE = 5000
+
+def _pg_search_vector(row: str = "") -> str:
+    """Expressão do tsvector ponderado; row é o prefixo das colunas (ex: "NEW.")"""
+    def fields(*names: str) -> str:
+        return " || ' ' || ".join(f"coalesce({row}{name}, '')" for name in names)
+    return (
+        f"setweight(to_tsvector('portuguese', {fields('title')}), 'A') || "
+        f"setweight(to_tsvector('portuguese', {fields('root_cause', 'corrective_action')}), 'B') || "
+        f"setweight(to_tsvector('portuguese', {fields('observations', 'rework_description', 'actions_taken')}), 'C')"
+    )
+
+_PG_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION rnc_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {_pg_search_vector("NEW.")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+#Só recalcula quando um campo textual muda; transições de condição não tocam o vetor
+_PG_TRIGGER = (
+    f"CREATE TRIGGER rnc_search_vector_tg BEFORE INSERT OR UPDATE OF {', '.join(SEARCH_FIELDS)} ON rnc "
+    "FOR EACH ROW EXECUTE FUNCTION rnc_search_vector_update()"
+)
+
+_PG_BACKFILL = f"""
+UPDATE rnc SET search_vector = {_pg_search_vector()}
+WHERE id IN (SELECT id FROM rnc WHERE id > :after AND search_vector IS NULL ORDER BY id LIMIT :batch)
+RETURNING id
+"""
+
+def _upgrade_postgresql(connection: Connection) -> None:
+    add_column(connection, "rnc", "search_vector", "tsvector")
+    connection.execute(text(_PG_TRIGGER_FUNCTION))
+    exists = connection.execute(text(
+        "SELECT 1 FROM pg_trigger WHERE tgname = 'rnc_search_vector_tg' AND tgrelid = 'rnc'::regclass"
+    )).first()
+    if not exists:
+        connection.execute(text(_PG_TRIGGER))
+
+    #Conexão em autocommit: cada lote é uma transação curta e segura poucos bloqueios de linha
+    after = 0
+    while True:
+        ids = connection.execute(text(_PG_BACKFILL), {"after": after, "batch": BACKFILL_BATCH_SIZE}).scalars().all()
+        if not ids:
+            break
+        after = max(ids)
+
+    create_index(connection, "ix_rnc_search_vector", "rnc", "USING GIN (search_vector)")
+
+def _upgrade_sqlite(connection: Connection) -> None:
+    columns = ", ".join(SEARCH_FIELDS)
+    new_values = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+    old_values = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS rnc_fts USING fts5({columns}, "
+        "content='rnc', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS rnc_fts_ai AFTER INSERT ON rnc BEGIN "
+        f"INSERT INTO rnc_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS rnc_fts_ad AFTER DELETE ON rnc BEGIN "
+        f"INSERT INTO rnc_fts(rnc_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    #Só reindexa quando um campo textual muda; transições de condição não tocam o índice
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS rnc_fts_au AFTER UPDATE OF {columns} ON rnc BEGIN "
+        f"INSERT INTO rnc_fts(rnc_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO rnc_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text("INSERT INTO rnc_fts(rnc_fts) VALUES ('rebuild')"))
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        _upgrade_postgresql(connection)
+    else:
+        _upgrade_sqlite(connection)
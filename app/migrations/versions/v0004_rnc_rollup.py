@@ -0,0 +1,30 @@
+"""
+Agregados diários de RNC (rnc_rollup) para tendências e MTTR
+
+A tabela é criada aqui com o mesmo formato do modelo RNCRollup e preenchida a partir
+dos RNCs existentes; depois disso o RNCRepository a mantém a cada transição.
+"""
+from sqlalchemy import Connection, text
+
+from app.repository.rollup_repository import rebuild_rollups
+
+VERSION = 4
+DESCRIPTION = "Tabela rnc_rollup (agregados diários de RNC)"
+TRANSACTIONAL = True
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS rnc_rollup (
+    day DATE NOT NULL,
+    client VARCHAR NOT NULL,
+    critical_level VARCHAR NOT NULL,
+    condition VARCHAR NOT NULL,
+    opened INTEGER NOT NULL,
+    closed INTEGER NOT NULL,
+    resolution_days FLOAT NOT NULL,
+    PRIMARY KEY (day, client, critical_level, condition)
+)
+"""
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(text(_CREATE_TABLE))
+    rebuild_rollups(connection)
@@ -0,0 +1,28 @@
+"""
+Tabela refresh_token (rotação de refresh tokens com detecção de reuso)
+
+Tokens emitidos antes desta versão não têm jti e deixam de ser aceitos pelo /refresh,
+o que exige um novo login.
+"""
+from sqlalchemy import Connection, text
+
+VERSION = 5
+DESCRIPTION = "Tabela refresh_token (rotação de refresh tokens)"
+TRANSACTIONAL = True
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS refresh_token (
+    jti VARCHAR(32) NOT NULL PRIMARY KEY,
+    family_id VARCHAR(32) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES "user" (id),
+    issued_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    used_at TIMESTAMP,
+    revoked_at TIMESTAMP
+)
+"""
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(text(_CREATE_TABLE))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_refresh_token_family_id ON refresh_token (family_id)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_refresh_token_user_id ON refresh_token (user_id)"))
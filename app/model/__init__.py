@@ -2,10 +2,14 @@
 from .user_model import User, UserRole
 from .part_model import Part
 from .rnc_model import RNC, RNCStatus, RNCCondition, RNCCriticalLevel
+from .rollup_model import RNCRollup
+from .refresh_token_model import RefreshToken
 
 # Opcional: define o que é exportado quando se usa "from app.models import *"
 __all__ = [
     "Part",
     "User", "UserRole",
-    "RNC", "RNCStatus", "RNCCondition", "RNCCriticalLevel"
+    "RNC", "RNCStatus", "RNCCondition", "RNCCriticalLevel",
+    "RNCRollup",
+    "RefreshToken"
 ]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+from typing import Optional
+
+class RefreshToken(SQLModel, table=True):
+    """
+    Refresh token emitido (identificado pelo jti do JWT)
+
+    Cada login inicia uma família; cada /refresh consome o token apresentado (used_at) e
+    emite o próximo da mesma família. Apresentar um token já consumido indica que ele vazou
+    e revoga a família inteira (revoked_at), exceto dentro da janela de tolerância
+    (REFRESH_TOKEN_REUSE_GRACE_SECONDS) após o consumo: ali o reuso vem de requisições
+    simultâneas do próprio cliente e só é recusado.
+    """
+    __tablename__ = "refresh_token"
+
+    jti: str = Field(primary_key=True, max_length=32, description="Identificador único do token (claim jti)")
+    family_id: str = Field(index=True, max_length=32, description="Família de rotação, criada no login (claim fam)")
+    user_id: int = Field(foreign_key="user.id", index=True)
+    issued_at: datetime
+    expires_at: datetime
+    used_at: Optional[datetime] = Field(default=None, description="Quando o token foi trocado por um novo")
+    revoked_at: Optional[datetime] = Field(default=None, description="Quando a família do token foi revogada")
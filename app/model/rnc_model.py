@@ -1,4 +1,5 @@
 from sqlmodel import Field, SQLModel, Relationship, Session, select, func, Column, Text
+from sqlalchemy import Index
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -18,6 +19,7 @@ class RNCCondition(str, Enum):
     AGUARDANDO_VERIFICACAO = "aguardando_verificacao"
     APROVADO = "aprovado"
     REFUGO = "refugo"
+    CONCLUIDO = "concluido"
 
 class RNCCriticalLevel(str, Enum):
     """Nível de criticidade do RNC"""
@@ -41,7 +43,7 @@ class RNC(SQLModel, table=True):
     observations: Optional[str] = Field(default=None, sa_column=Column(Text), description="Observações iniciais")
     
     #Informações da Peça
-    part_id: int = Field(foreign_key="part.id", description="ID da peça relacionada")
+    part_id: int = Field(foreign_key="part.id", index=True, description="ID da peça relacionada")
     part_code: str = Field(index=True, unique=True, max_length=150, description="Código da peça")
 
     #Data e timestamps
@@ -49,6 +51,7 @@ class RNC(SQLModel, table=True):
     analysis_date: Optional[datetime] = Field(default=None, description="Data/hora da análise da qualidade")
     rework_date: Optional[datetime] = Field(default=None, description="Data/hora do retrabalho")
     closing_date: Optional[datetime] = Field(default=None, description="Data/hora de fechamento")
+    closing_notes: Optional[str] = Field(default=None, sa_column=Column(Text), description="Notas do fechamento manual")
 
     #Análise da qualidade
     root_cause: Optional[str] = Field(default=None, sa_column=Column(Text), description="Causa raiz identificada pela qualidade")
@@ -72,8 +75,8 @@ class RNC(SQLModel, table=True):
     open_by_id: int = Field(foreign_key="user.id", description="ID do usuário que abriu o RNC")
     analysis_user_id: Optional[int] = Field(default=None, foreign_key="user.id", description="ID do usuário da área da qualidade")
     rework_user_id: Optional[int] = Field(default=None, foreign_key="user.id", description="ID do usuário da área de retrabalho")
-    current_responsible_id: Optional[int] = Field(default=None, foreign_key="user.id", description="ID do responsável atual")
-    closed_by_id: Optional[int] = Field(default=None, foreign_key="user.id", description="ID do usuário que fechou o RNC")
+    current_responsible_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True, description="ID do responsável atual")
+    closed_by_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True, description="ID do usuário que fechou o RNC")
 
     #Relationships
     part: Part = Relationship(back_populates="rnc", sa_relationship_kwargs={"lazy": "selectin"})
@@ -149,10 +152,32 @@ class RNC(SQLModel, table=True):
         """
         if not self.closing_date:
             return None
-        
-        delta = self.closing_date - self.date_of_occurrence
+
+        #Datas recém-atribuídas têm fuso (UTC); as lidas do banco não
+        delta = self.closing_date.replace(tzinfo=None) - self.date_of_occurrence.replace(tzinfo=None)
         return round(delta.total_seconds() / 86400, 2)
     
     def __repr__(self) -> str:
         """Representação string do RNC"""
         return f"<RNC(num_rnc={self.num_rnc}, title='{self.title}', status='{self.status}')>"
+
+
+#Índices compostos e parciais derivados das consultas do RNCRepository
+#Mantenha em sincronia com app/migrations/versions (bancos já existentes recebem os índices via migração)
+Index("ix_rnc_open_by_id_date_of_occurrence", RNC.open_by_id, RNC.date_of_occurrence.desc())
+Index("ix_rnc_rework_user_id_rework_date", RNC.rework_user_id, RNC.rework_date.desc())
+Index("ix_rnc_analysis_user_id_analysis_date", RNC.analysis_user_id, RNC.analysis_date.desc())
+Index("ix_rnc_status_condition", RNC.status, RNC.condition)
+
+#Índices parciais apenas no PostgreSQL: o SQLite não os utiliza com parâmetros vinculados (condition = ?)
+_OPEN_PREDICATE = RNC.status == RNCStatus.ABERTO.value
+Index("ix_rnc_open_date_of_occurrence", RNC.date_of_occurrence, postgresql_where=_OPEN_PREDICATE).ddl_if(dialect="postgresql")
+
+def _pending_index(condition: RNCCondition) -> Index:
+    """Índice parcial por condição pendente, usado pelas filas de análise/retrabalho"""
+    predicate = RNC.condition == condition.value
+    return Index(f"ix_rnc_pending_{condition.value}", RNC.date_of_occurrence, postgresql_where=predicate).ddl_if(dialect="postgresql")
+
+_pending_index(RNCCondition.EM_ANALISE)
+_pending_index(RNCCondition.AGUARDANDO_RETRABALHO)
+_pending_index(RNCCondition.AGUARDANDO_VERIFICACAO)
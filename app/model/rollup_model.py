@@ -0,0 +1,20 @@
+from sqlmodel import Field, SQLModel
+from datetime import date
+
+class RNCRollup(SQLModel, table=True):
+    """
+    Agregado diário de RNCs por cliente, criticidade e condição
+
+    Mantido pelo RNCRollupRepository a cada transição, na mesma transação da escrita do RNC.
+    - opened: RNCs que ocorreram no dia e estão hoje nesta condição
+    - closed / resolution_days: RNCs fechados no dia nesta condição e a soma dos seus tempos de resolução
+    """
+    __tablename__ = "rnc_rollup"
+
+    day: date = Field(primary_key=True, description="Dia (UTC) da ocorrência ou do fechamento")
+    client: str = Field(default="", primary_key=True, description="Cliente da peça (vazio quando não informado)")
+    critical_level: str = Field(primary_key=True, description="Nível de criticidade")
+    condition: str = Field(primary_key=True, description="Condição do RNC")
+    opened: int = Field(default=0, description="RNCs abertos no dia que estão nesta condição")
+    closed: int = Field(default=0, description="RNCs fechados no dia nesta condição")
+    resolution_days: float = Field(default=0.0, description="Soma dos tempos de resolução (dias) dos RNCs fechados no dia")
@@ -1,7 +1,6 @@
 from typing import List, Optional, TYPE_CHECKING
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
-import bcrypt
 
 if TYPE_CHECKING:
     from .rnc_model import RNC
@@ -26,6 +25,7 @@ class User(SQLModel, table=True):
     rncs_closed: List["RNC"] = Relationship(back_populates="closed_by", sa_relationship_kwargs={"foreign_keys": "RNC.closed_by_id"})
 
     def set_password(self, password: str):
+        import bcrypt
 
         password_bytes = password.encode('utf-8')[:72]
         if len(password_bytes) > 72:
@@ -35,6 +35,8 @@ class User(SQLModel, table=True):
         self.password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
     
     def check_password(self, password: str) -> bool:
+        import bcrypt
+
         try:
             password_bytes = password.encode('utf-8')
             if len(password_bytes) > 72:
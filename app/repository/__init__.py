@@ -2,11 +2,13 @@ from .user_repository import UserRepository
 from .rnc_repository import RNCRepository
 from .auth_repository import AuthRepository
 from .part_repository import PartRepository
+from .rollup_repository import RNCRollupRepository
 
 
 __all__ = [
     "UserRepository",
     "RNCRepository",
     "PartRepository",
+    "RNCRollupRepository",
     "AuthRepository"
 ]
\ No newline at end of file
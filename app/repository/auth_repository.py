@@ -1,6 +1,10 @@
 from sqlmodel import Session, select
+from sqlalchemy import update, delete
+from datetime import datetime, timezone
 from app import model
+from app.core.sql_profiler import profiled_repository
 
+@profiled_repository
 class AuthRepository:
 
     def __init__(self, db: Session):
@@ -8,4 +12,56 @@ class AuthRepository:
 
     def authenticate(self, email: str) -> model.User | None:
         return self.db.exec(select(model.User).where(model.User.email == email)).first()
-    
+
+    def get_user(self, user_id: int) -> model.User | None:
+        return self.db.get(model.User, user_id)
+
+    def add_refresh_token(self, jti: str, family_id: str, user_id: int, expires_at: datetime) -> None:
+        """
+        Registra um refresh token emitido e faz commit
+
+        O commit inclui as alterações pendentes da mesma sessão (o consumo do token anterior
+        na rotação, a limpeza dos vencidos no login), então tudo é gravado junto.
+        """
+        self.db.add(model.RefreshToken(
+            jti=jti, family_id=family_id, user_id=user_id,
+            issued_at=datetime.now(timezone.utc), expires_at=expires_at
+        ))
+        self.db.commit()
+
+    def get_refresh_token(self, jti: str) -> model.RefreshToken | None:
+        return self.db.get(model.RefreshToken, jti)
+
+    def consume_refresh_token(self, jti: str, used_at: datetime) -> bool:
+        """
+        Marca o token como trocado, se ainda não foi consumido nem revogado
+
+        A verificação e a marcação são o mesmo UPDATE condicional, então duas trocas
+        simultâneas do mesmo token nunca passam as duas. Não faz commit.
+
+        Returns:
+            True se este chamador consumiu o token
+        """
+        result = self.db.execute(
+            update(model.RefreshToken)
+            .where(model.RefreshToken.jti == jti, model.RefreshToken.used_at.is_(None), model.RefreshToken.revoked_at.is_(None))
+            .values(used_at=used_at)
+        )
+        return result.rowcount == 1
+
+    def revoke_family(self, family_id: str) -> int:
+        """Revoga todos os tokens da família e faz commit; retorna quantos foram revogados"""
+        result = self.db.execute(
+            update(model.RefreshToken)
+            .where(model.RefreshToken.family_id == family_id, model.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def delete_expired_refresh_tokens(self, user_id: int) -> None:
+        """Remove os tokens vencidos do usuário (sem commit)"""
+        self.db.execute(
+            delete(model.RefreshToken)
+            .where(model.RefreshToken.user_id == user_id, model.RefreshToken.expires_at < datetime.now(timezone.utc))
+        )
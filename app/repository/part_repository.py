@@ -1,7 +1,11 @@
 from sqlmodel import Session, select
 from datetime import datetime
+from typing import Optional
 from app import schema, model
+from app.core.part_cache import part_cache
+from app.core.sql_profiler import profiled_repository
 
+@profiled_repository
 class PartRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -9,4 +13,18 @@ class PartRepository:
     def get_by_code(self, part_code: str) -> model.Part:
         """Busca uma peça pelo código"""
         statement = select(model.Part).where(model.Part.part_code == part_code)
-        return self.db.exec(statement).first()
\ No newline at end of file
+        return self.db.exec(statement).first()
+
+    def get_cached_by_code(self, part_code: str) -> Optional[schema.PartRead]:
+        """
+        Busca uma peça pelo código passando pelo cache do catálogo
+
+        Returns:
+            Snapshot da peça (somente leitura) ou None
+        """
+        return part_cache.get_or_load(part_code, self.get_by_code)
+
+    def list_active(self, limit: int) -> list[model.Part]:
+        """Lista as peças ativas, usada para pré-carregar o cache"""
+        statement = select(model.Part).where(model.Part.active == True).order_by(model.Part.id.desc()).limit(limit)
+        return self.db.exec(statement).all()
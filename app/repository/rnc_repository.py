@@ -1,9 +1,50 @@
 from sqlmodel import Session, select, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, literal_column, table, column, update
+from sqlalchemy.orm import aliased, selectinload
 from datetime import datetime, timezone
 from app import schema, model
 from typing import Optional
+import re
 
+from app.core.sql_profiler import profiled_repository
+from app.database import replica_read
+from app.core.conditional import collection_versions
+from app.core.response_cache import response_cache
+from app.core.open_rnc_index import open_rnc_index
+from app.repository.part_repository import PartRepository
+from app.repository.rollup_repository import RNCRollupRepository
+
+#Nome da coleção nos contadores de versão (ETag das rotas de leitura de RNC)
+RNC_COLLECTION = "rnc"
+
+#Tags do cache de respostas das listagens de RNC
+TAG_ALL = "rnc:all"
+TAG_PENDING_ANALYSIS = "rnc:pending_analysis"
+TAG_PENDING_REWORK = "rnc:pending_rework"
+
+#Listagens que cada transição do ciclo de vida pode alterar
+TRANSITION_TAGS = {
+    "create": (TAG_ALL, TAG_PENDING_ANALYSIS),    #entra em em_analise
+    "analysis": (TAG_ALL, TAG_PENDING_ANALYSIS, TAG_PENDING_REWORK),    #vai para aguardando_retrabalho ou fecha
+    "rework": (TAG_ALL, TAG_PENDING_REWORK, TAG_PENDING_ANALYSIS),    #sai do retrabalho e volta para verificação
+    "close": (TAG_ALL, TAG_PENDING_ANALYSIS, TAG_PENDING_REWORK),
+    "claim": (TAG_ALL, TAG_PENDING_ANALYSIS, TAG_PENDING_REWORK),    #muda current_responsible_id das listagens pendentes
+}
+
+#Filas de trabalho: condições pendentes de cada fila (as mesmas de list_by_rework_status e list_by_analysis_status)
+WORK_QUEUES = {
+    "rework": (model.RNCCondition.AGUARDANDO_RETRABALHO.value,),
+    "analysis": (model.RNCCondition.EM_ANALISE.value, model.RNCCondition.AGUARDANDO_VERIFICACAO.value),
+}
+
+#Pesos do bm25 (FTS5) na ordem das colunas de rnc_fts: title, observations, root_cause,
+#corrective_action, rework_description, actions_taken. Mesma prioridade dos pesos A/B/C do tsvector
+_FTS5_WEIGHTS = (10.0, 2.0, 5.0, 5.0, 2.0, 2.0)
+_SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+#Tabela virtual FTS5 (SQLite) criada pela migração 3; não faz parte dos modelos
+_rnc_fts = table("rnc_fts", column("rowid"))
+
+@profiled_repository
 class RNCRepository:
     """Repositório para operações de RNC (Registro de Não Conformidade)"""
     def __init__(self, db: Session):
@@ -13,6 +54,12 @@ class RNCRepository:
         """Retorna a data/hora atual em UTC"""
         return datetime.now(timezone.utc)
     
+    def _after_write(self, transition: str, db_rnc: model.RNC) -> None:
+        """Invalida ETags e respostas em cache e atualiza o índice de abertos após uma transição já commitada"""
+        collection_versions.bump(RNC_COLLECTION)
+        response_cache.invalidate(TRANSITION_TAGS[transition])
+        open_rnc_index.apply(db_rnc.part_code, db_rnc.num_rnc, db_rnc.status == model.RNCStatus.ABERTO.value)
+
     def _apply_eager_loading(self, statement):
         """Aplica eager loading padrão para relacionamentos do RNC"""
         return statement.options(
@@ -32,25 +79,48 @@ class RNCRepository:
         """
         statement = select(model.RNC).where(model.RNC.num_rnc == num_rnc)
         if lock:
-            statement = statement.with_for_update()
+            #Recarrega a linha bloqueada mesmo que o objeto já esteja na sessão (lido pelo serviço)
+            statement = statement.with_for_update().execution_options(populate_existing=True)
         return self.db.exec(statement).first()
 
+    def _check_responsible(self, db_rnc: model.RNC, user_id: int) -> None:
+        """Impede a transição de um RNC puxado da fila por outro usuário"""
+        if db_rnc.current_responsible_id is not None and db_rnc.current_responsible_id != user_id:
+            raise ValueError(f"RNC n° {db_rnc.num_rnc} está com outro responsável (usuário ID {db_rnc.current_responsible_id}).")
+
     def get_rnc_by_part_code(self, part_code: str) -> Optional[model.RNC]:
         """
         Retorna o RNC aberto associado a um código de peça
+
+        Peças sem RNC aberto (o caso comum na leitura de código de barras) são respondidas
+        pelo índice em memória, sem consulta, quando OPEN_RNC_INDEX_MODE=trust.
         
         Args:
             part_code: Código da peça
         Returns: 
             RNC encontrado ou None
         """
+        if open_rnc_index.stale():
+            open_rnc_index.load(self.open_part_codes)
+        if open_rnc_index.known_absent(part_code):
+            return None
+
+        version = open_rnc_index.version
         statement = select(model.RNC).where(
             model.RNC.part_code == part_code,
             model.RNC.status == model.RNCStatus.ABERTO.value
         )
         statement = self._apply_eager_loading(statement)
-        return self.db.exec(statement).first()
+        rnc = self.db.exec(statement).first()
+        open_rnc_index.check(part_code, rnc.num_rnc if rnc else None, version)
+        return rnc
+
+    def open_part_codes(self) -> list[tuple[str, int]]:
+        """Pares (part_code, num_rnc) de todos os RNCs abertos, lidos do primário (carga do índice)"""
+        statement = select(model.RNC.part_code, model.RNC.num_rnc).where(model.RNC.status == model.RNCStatus.ABERTO.value)
+        return self.db.execute(statement).all()
 
+    @replica_read
     def search_rnc_opened_by_user(self, user_id: int, limit: int = 100, offset: int = 0) -> list[model.RNC]:
         """
         Retorna todos os RNCs abertos por um usuário específico
@@ -71,6 +141,7 @@ class RNCRepository:
         statement = self._apply_eager_loading(statement)
         return self.db.exec(statement).all()
     
+    @replica_read
     def search_rnc_rework_by_user(self, user_id: int, limit: int = 100, offset: int = 0) -> list[model.RNC]:
         """
         Retorna todos os RNCs retrabalhados por um usuário específico
@@ -84,6 +155,7 @@ class RNCRepository:
         statement = self._apply_eager_loading(statement)
         return self.db.exec(statement).all()
 
+    @replica_read
     def search_rnc_by_analysis_user(self, user_id: int, limit: int = 100, offset: int = 0) -> list[model.RNC]:
         """
         Retorna todos os RNCs analisados por um usuário
@@ -98,6 +170,7 @@ class RNCRepository:
         return self.db.exec(statement).all()
 
     
+    @replica_read
     def list_all(self, status: Optional[str] = None, condition: Optional[str] = None, limit: int = 1000, offset: int = 0) -> list[model.RNC]:
         """
         Lista todos os RNCs com filtros opcionais
@@ -120,9 +193,143 @@ class RNCRepository:
 
         return self.db.exec(statement).all()
     
+    def open_rnc_rows(self) -> list:
+        """
+        Linhas dos RNCs abertos só com as colunas do RNCEvent (sem objetos do ORM)
+
+        Alimenta o snapshot inicial do WebSocket. Lê sempre do primário: o snapshot passa
+        a receber os eventos das transições logo em seguida, e uma réplica atrasada faria
+        ele perder transições já commitadas.
+        """
+        rnc = model.RNC
+        statement = select(
+            rnc.id, rnc.num_rnc, rnc.title, rnc.status, rnc.condition, rnc.part_code, rnc.observations,
+            rnc.critical_level, rnc.part_id, rnc.open_by_id, rnc.closed_by_id, rnc.date_of_occurrence, rnc.closing_date
+        ).where(rnc.status == model.RNCStatus.ABERTO.value).order_by(rnc.num_rnc)
+        return self.db.execute(statement).all()
+
+    @replica_read
+    def analytics_columns(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> dict[str, tuple]:
+        """
+        Colunas usadas pelas análises estatísticas, em listas por coluna (sem montar objetos RNC)
+
+        O tempo de resolução já vem calculado em dias pelo banco (mesma conta de
+        RNC.get_resolution_time_days), evitando converter milhões de datas no Python.
+        Args:
+            date_from: Data de ocorrência mínima
+            date_to: Data de ocorrência máxima
+        Returns:
+            Dicionário coluna -> sequência de valores, todas com o mesmo tamanho
+        """
+        rnc = model.RNC
+        if self.db.get_bind().dialect.name == "postgresql":
+            resolution_days = func.extract("epoch", rnc.closing_date - rnc.date_of_occurrence) / 86400
+        else:
+            resolution_days = func.julianday(rnc.closing_date) - func.julianday(rnc.date_of_occurrence)
+        columns = {
+            "resolution_days": resolution_days,
+            "critical_level": rnc.critical_level,
+            "estimated_rework_time": rnc.estimated_rework_time,
+            "time_spent": rnc.time_spent,
+            "part": model.Part.description,
+            "client": model.Part.client,
+            "root_cause": func.lower(func.trim(rnc.root_cause)),
+        }
+        statement = select(*(expression.label(name) for name, expression in columns.items())).join(model.Part, model.Part.id == rnc.part_id)
+        if date_from:
+            statement = statement.where(rnc.date_of_occurrence >= date_from)
+        if date_to:
+            statement = statement.where(rnc.date_of_occurrence <= date_to)
+        rows = self.db.execute(statement).all()
+        if not rows:
+            return {name: () for name in columns}
+        return dict(zip(columns, zip(*rows)))
+
+    @replica_read
+    def search_rncs(
+        self,
+        query: str,
+        status: Optional[str] = None,
+        condition: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> list[tuple[model.RNC, float]]:
+        """
+        Busca textual nos campos livres do RNC, ordenada por relevância
+
+        Usa o índice criado pela migração 3: tsvector + GIN no PostgreSQL e FTS5 no SQLite.
+
+        Args:
+            query: Texto buscado
+            status: Filtro por status
+            condition: Filtro por condição
+            date_from: Data de ocorrência mínima
+            date_to: Data de ocorrência máxima
+            limit: Limite de resultados
+            offset: Offset para paginação
+        Returns:
+            Lista de (RNC, relevância), da mais relevante para a menos relevante
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            statement = self._postgresql_search_statement(query)
+        else:
+            statement = self._sqlite_search_statement(query)
+            if statement is None:
+                return []
+
+        if status:
+            statement = statement.where(model.RNC.status == status)
+        if condition:
+            statement = statement.where(model.RNC.condition == condition)
+        if date_from:
+            statement = statement.where(model.RNC.date_of_occurrence >= date_from)
+        if date_to:
+            statement = statement.where(model.RNC.date_of_occurrence <= date_to)
+
+        ranked = self.db.exec(statement.limit(limit).offset(offset)).all()
+        if not ranked:
+            return []
+
+        #Carrega os RNCs encontrados de uma vez, preservando a ordem de relevância
+        loaded = self.db.exec(
+            self._apply_eager_loading(select(model.RNC).where(model.RNC.id.in_([rnc_id for rnc_id, _ in ranked])))
+        ).all()
+        by_id = {rnc.id: rnc for rnc in loaded}
+        return [(by_id[rnc_id], float(rank)) for rnc_id, rank in ranked if rnc_id in by_id]
+
+    def _postgresql_search_statement(self, query: str):
+        search_vector = literal_column("rnc.search_vector")
+        ts_query = func.websearch_to_tsquery("portuguese", query)
+        rank = func.ts_rank_cd(search_vector, ts_query).label("rank")
+        return (
+            select(model.RNC.id, rank)
+            .where(search_vector.op("@@")(ts_query))
+            .order_by(rank.desc(), model.RNC.id.desc())
+        )
+
+    def _sqlite_search_statement(self, query: str):
+        #Cada palavra vira um termo entre aspas com prefixo, evitando que a sintaxe do FTS5 vaze para o usuário
+        tokens = _SEARCH_TOKEN.findall(query)
+        if not tokens:
+            return None
+        match = " ".join(f'"{token}"*' for token in tokens)
+        fts = literal_column(_rnc_fts.name)
+        #bm25 é menor para os mais relevantes; o sinal é invertido para expor "maior é melhor"
+        score = func.bm25(fts, *_FTS5_WEIGHTS)
+        return (
+            select(model.RNC.id, (-score).label("rank"))
+            .select_from(model.RNC)
+            .join(_rnc_fts, _rnc_fts.c.rowid == model.RNC.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(score, model.RNC.id.desc())
+        )
+
+    @replica_read
     def list_by_rework_status(self, pending: bool) -> list[model.RNC]:
         """
-        Lista RNCs por status de retrabalho
+        Lista RNCs por status de retrabalho, do mais antigo para o mais recente
 
         pending=True: RNCs que precisam ser retrabalhados
         pending=False: RNCs que já foram retrabalhados
@@ -135,12 +342,14 @@ class RNCRepository:
             statement = select(model.RNC).where(
                 model.RNC.condition == model.RNCCondition.AGUARDANDO_VERIFICACAO.value
             )
+        statement = statement.order_by(model.RNC.date_of_occurrence)
         statement = self._apply_eager_loading(statement)
         return self.db.exec(statement).all()
     
+    @replica_read
     def list_by_analysis_status(self, pending: bool) -> list[model.RNC]:
         """
-        Lista RNCs por status de análise
+        Lista RNCs por status de análise, do mais antigo para o mais recente
 
         pending=True: RNCs que precisam ser analisados
         pending=False: RNCs que já foram analisados
@@ -154,9 +363,86 @@ class RNCRepository:
             statement = select(model.RNC).where(
                 model.RNC.condition != "em_analise"
             )
+        statement = statement.order_by(model.RNC.date_of_occurrence)
         statement = self._apply_eager_loading(statement)
         return self.db.exec(statement).all()
     
+    def get_claimed(self, queue: str, user_id: int) -> Optional[model.RNC]:
+        """RNC da fila que já está com o usuário, se houver"""
+        statement = select(model.RNC).where(
+            model.RNC.current_responsible_id == user_id,
+            model.RNC.condition.in_(WORK_QUEUES[queue])
+        ).order_by(model.RNC.date_of_occurrence).limit(1)
+        statement = self._apply_eager_loading(statement)
+        return self.db.exec(statement).first()
+
+    def claim_next(self, queue: str, user_id: int) -> Optional[model.RNC]:
+        """
+        Atribui ao usuário o RNC livre mais antigo da fila, de forma atômica
+
+        Um único UPDATE escolhe e marca o RNC (current_responsible_id). No PostgreSQL a
+        subconsulta usa FOR UPDATE SKIP LOCKED: requisições simultâneas pulam a linha que
+        outra está marcando e pegam a próxima, sem esperar nem disputar a mesma. No SQLite
+        o UPDATE inteiro roda sob o lock de escrita do banco, o que já serializa as disputas.
+
+        Args:
+            queue: Fila (chave de WORK_QUEUES)
+            user_id: Usuário que puxa o RNC
+        Returns:
+            RNC atribuído ou None se a fila não tem RNC livre
+        """
+        pending = aliased(model.RNC)
+        candidate = (
+            select(pending.id)
+            .where(pending.condition.in_(WORK_QUEUES[queue]), pending.current_responsible_id.is_(None))
+            .order_by(pending.date_of_occurrence, pending.id)
+            .limit(1)
+        )
+        if self.db.get_bind().dialect.name == "postgresql":
+            candidate = candidate.with_for_update(skip_locked=True)
+        statement = (
+            update(model.RNC)
+            .where(model.RNC.id == candidate.scalar_subquery(), model.RNC.current_responsible_id.is_(None))
+            .values(current_responsible_id=user_id)
+            .returning(model.RNC.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed_id = self.db.execute(statement).scalar()
+        self.db.commit()
+        if claimed_id is None:
+            return None
+
+        statement = self._apply_eager_loading(select(model.RNC).where(model.RNC.id == claimed_id))
+        db_rnc = self.db.exec(statement.execution_options(populate_existing=True)).first()
+        self._after_write("claim", db_rnc)
+        return db_rnc
+
+    def release(self, num_rnc: int, user_id: int, force: bool = False) -> model.RNC:
+        """
+        Devolve à fila um RNC puxado pelo usuário
+
+        Args:
+            num_rnc: Número do RNC
+            user_id: Usuário que está devolvendo
+            force: Devolve mesmo que esteja com outro usuário (administrador)
+        Returns:
+            RNC atualizado
+        Raises:
+            ValueError: Se o RNC não for encontrado ou estiver com outro usuário
+        """
+        db_rnc = self.get_by_num(num_rnc, lock=True)
+        if not db_rnc:
+            raise ValueError(f"RNC n° {num_rnc} não encontrado.")
+        if db_rnc.current_responsible_id is None:
+            return db_rnc
+        if not force:
+            self._check_responsible(db_rnc, user_id)
+        db_rnc.current_responsible_id = None
+        self.db.commit()
+        self._after_write("claim", db_rnc)
+        self.db.refresh(db_rnc)
+        return db_rnc
+
     def create_rnc(self, rnc_data: schema.RNCCreate, open_by_id: int) -> model.RNC:
         """
         Cria um novo RNC no banco com validações otimizadas
@@ -167,8 +453,18 @@ class RNCRepository:
         Returns:
             RNC criado
         Raises:
-            ValueError: Se já existir um RNC aberto para a peça
+            ValueError: Se a peça não existir, estiver inativa, não corresponder ao part_id
+                ou já existir um RNC aberto para ela
         """
+        #Validação pelo cache do catálogo: normalmente sem consulta extra ao banco
+        part = PartRepository(self.db).get_cached_by_code(rnc_data.part_code)
+        if not part:
+            raise ValueError(f"Peça com código '{rnc_data.part_code}' não encontrada.")
+        if part.id != rnc_data.part_id:
+            raise ValueError(f"O código '{rnc_data.part_code}' não pertence à peça ID {rnc_data.part_id}.")
+        if not part.active:
+            raise ValueError(f"A peça '{rnc_data.part_code}' está inativa.")
+
         existing = self.get_rnc_by_part_code(rnc_data.part_code)
         if existing:
             raise ValueError(f"A peça (ID {rnc_data.part_id}) já está associada ao RNC ativo n° {existing.num_rnc}.")
@@ -188,7 +484,9 @@ class RNCRepository:
         )
 
         self.db.add(db_rnc)
+        RNCRollupRepository(self.db).record_transition(db_rnc, part.client, previous_condition=None)
         self.db.commit()
+        self._after_write("create", db_rnc)
         self.db.refresh(db_rnc)
         return db_rnc
     
@@ -208,6 +506,8 @@ class RNCRepository:
         db_rnc = self.get_by_num(num_rnc, lock=True)
         if not db_rnc:
             raise ValueError(f"RNC n° {num_rnc} não encontrado.")
+        self._check_responsible(db_rnc, quality_user.id)
+        previous_condition = db_rnc.condition
         update_data = analysis_data.model_dump(exclude_unset=True)
 
         for field, value in update_data.items():
@@ -215,6 +515,8 @@ class RNCRepository:
         db_rnc.analysis_user_id = quality_user.id
         db_rnc.analysis_by = quality_user
         db_rnc.analysis_date = self._get_current_utc_datetime()
+        #Sai da fila de análise; o RNC volta livre para a próxima fila (ou fecha)
+        db_rnc.current_responsible_id = None
         
         if analysis_data.close_rnc:
             if analysis_data.refused:
@@ -230,7 +532,9 @@ class RNCRepository:
         else:
             db_rnc.condition = model.RNCCondition.AGUARDANDO_RETRABALHO.value
 
+        RNCRollupRepository(self.db).record_transition(db_rnc, db_rnc.part.client, previous_condition)
         self.db.commit()
+        self._after_write("analysis", db_rnc)
         self.db.refresh(db_rnc)
         return db_rnc
     
@@ -247,9 +551,11 @@ class RNCRepository:
         Raises:
             ValueError: Se o RNC não for encontrado
         """
-        db_rnc = self.get_by_num(num_rnc)
+        db_rnc = self.get_by_num(num_rnc, lock=True)
         if not db_rnc:
             raise ValueError(f"RNC n° {num_rnc} não encontrado")
+        self._check_responsible(db_rnc, technician_user.id)
+        previous_condition = db_rnc.condition
         update_data = rework_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_rnc, field, value)
@@ -257,8 +563,11 @@ class RNCRepository:
         db_rnc.rework_by = technician_user
         db_rnc.rework_date = self._get_current_utc_datetime()
         db_rnc.condition = model.RNCCondition.AGUARDANDO_VERIFICACAO.value
+        db_rnc.current_responsible_id = None
 
+        RNCRollupRepository(self.db).record_transition(db_rnc, db_rnc.part.client, previous_condition)
         self.db.commit()
+        self._after_write("rework", db_rnc)
         self.db.refresh(db_rnc)
         return db_rnc
     
@@ -278,13 +587,17 @@ class RNCRepository:
         db_rnc = self.get_by_num(num_rnc, lock=True)
         if not db_rnc:
             raise ValueError(f"RNC n° {num_rnc} não encontrado.")
+        previous_condition = db_rnc.condition
         db_rnc.status = model.RNCStatus.FECHADO.value
         db_rnc.closed_by_id = closing_user.id
         db_rnc.closing_date = self._get_current_utc_datetime()
         db_rnc.condition = model.RNCCondition.CONCLUIDO.value
+        db_rnc.current_responsible_id = None
 
         if closing_notes:
             db_rnc.closing_notes = closing_notes
+        RNCRollupRepository(self.db).record_transition(db_rnc, db_rnc.part.client, previous_condition)
         self.db.commit()
+        self._after_write("close", db_rnc)
         self.db.refresh(db_rnc)
         return db_rnc
\ No newline at end of file
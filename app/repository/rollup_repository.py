@@ -0,0 +1,134 @@
+from sqlmodel import Session, select, func
+from sqlalchemy import Connection, text, null
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date
+from typing import Optional
+from app import model
+from app.core.sql_profiler import profiled_repository
+from app.database import replica_read
+
+#Dimensões de agrupamento aceitas pelas consultas de tendência
+ROLLUP_DIMENSIONS = ("client", "critical_level", "condition")
+
+_REBUILD_SQL = """
+INSERT INTO rnc_rollup (day, client, critical_level, condition, opened, closed, resolution_days)
+SELECT day, client, critical_level, condition, SUM(opened), SUM(closed), SUM(resolution_days)
+FROM (
+    SELECT {occurrence_day} AS day, COALESCE(p.client, '') AS client, r.critical_level, r.condition,
+           1 AS opened, 0 AS closed, 0.0 AS resolution_days
+    FROM rnc r JOIN part p ON p.id = r.part_id
+    UNION ALL
+    SELECT {closing_day}, COALESCE(p.client, ''), r.critical_level, r.condition,
+           0, 1, {resolution_days}
+    FROM rnc r JOIN part p ON p.id = r.part_id
+    WHERE r.status = 'fechado' AND r.closing_date IS NOT NULL
+) AS events
+GROUP BY day, client, critical_level, condition
+"""
+
+def rebuild_rollups(connection: Connection) -> None:
+    """
+    Recalcula a tabela rnc_rollup inteira a partir da tabela rnc
+
+    Usada pela migração que cria a tabela e após cargas em lote que não passam pelo
+    RNCRepository. O arredondamento segue RNC.get_resolution_time_days (2 casas).
+    """
+    if connection.dialect.name == "postgresql":
+        sql = _REBUILD_SQL.format(
+            occurrence_day="CAST(r.date_of_occurrence AS DATE)",
+            closing_day="CAST(r.closing_date AS DATE)",
+            resolution_days="ROUND(CAST(EXTRACT(EPOCH FROM r.closing_date - r.date_of_occurrence) / 86400 AS NUMERIC), 2)",
+        )
+    else:
+        sql = _REBUILD_SQL.format(
+            occurrence_day="date(r.date_of_occurrence)",
+            closing_day="date(r.closing_date)",
+            resolution_days="ROUND(julianday(r.closing_date) - julianday(r.date_of_occurrence), 2)",
+        )
+    connection.execute(text("DELETE FROM rnc_rollup"))
+    connection.execute(text(sql))
+
+@profiled_repository
+class RNCRollupRepository:
+    """Repositório dos agregados diários de RNC (tendências e MTTR)"""
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _increment(self, day: date, client: Optional[str], critical_level: str, condition: str, opened: int = 0, closed: int = 0, resolution_days: float = 0.0) -> None:
+        """Soma os deltas na linha do agregado, criando-a se necessário (upsert atômico)"""
+        table = model.RNCRollup.__table__
+        dialect_insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        statement = dialect_insert(table).values(
+            day=day, client=client or "", critical_level=critical_level, condition=condition,
+            opened=opened, closed=closed, resolution_days=resolution_days
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.client, table.c.critical_level, table.c.condition],
+            set_={
+                "opened": table.c.opened + statement.excluded.opened,
+                "closed": table.c.closed + statement.excluded.closed,
+                "resolution_days": table.c.resolution_days + statement.excluded.resolution_days,
+            }
+        )
+        self.db.execute(statement)
+
+    def record_transition(self, rnc: model.RNC, client: Optional[str], previous_condition: Optional[str]) -> None:
+        """
+        Aplica nos agregados a transição de um RNC, antes do commit da própria transição
+
+        Args:
+            rnc: RNC já com a nova condição (e datas) atribuídas
+            client: Cliente da peça do RNC
+            previous_condition: Condição anterior, ou None quando o RNC acabou de ser criado
+        """
+        if previous_condition == rnc.condition:
+            return
+        occurrence_day = rnc.date_of_occurrence.date()
+        if previous_condition is not None:
+            self._increment(occurrence_day, client, rnc.critical_level, previous_condition, opened=-1)
+        self._increment(occurrence_day, client, rnc.critical_level, rnc.condition, opened=1)
+
+        if rnc.is_closed() and rnc.closing_date:
+            self._increment(
+                rnc.closing_date.date(), client, rnc.critical_level, rnc.condition,
+                closed=1, resolution_days=rnc.get_resolution_time_days() or 0.0
+            )
+
+    @replica_read
+    def daily_totals(
+        self,
+        group_by: Optional[str],
+        date_from: Optional[date],
+        date_to: Optional[date],
+        client: Optional[str] = None,
+        critical_level: Optional[str] = None,
+        condition: Optional[str] = None
+    ) -> list[tuple]:
+        """
+        Soma os agregados por dia (e pela dimensão escolhida) no intervalo informado
+
+        Returns:
+            Tuplas (dia, valor da dimensão ou None, abertos, fechados, soma dos tempos de resolução)
+        """
+        rollup = model.RNCRollup
+        dimension = getattr(rollup, group_by) if group_by else None
+        statement = select(
+            rollup.day,
+            dimension if dimension is not None else null(),
+            func.sum(rollup.opened),
+            func.sum(rollup.closed),
+            func.sum(rollup.resolution_days)
+        )
+        if date_from:
+            statement = statement.where(rollup.day >= date_from)
+        if date_to:
+            statement = statement.where(rollup.day <= date_to)
+        if client is not None:
+            statement = statement.where(rollup.client == client)
+        if critical_level:
+            statement = statement.where(rollup.critical_level == critical_level)
+        if condition:
+            statement = statement.where(rollup.condition == condition)
+        group_columns = [rollup.day] + ([dimension] if dimension is not None else [])
+        statement = statement.group_by(*group_columns).order_by(rollup.day)
+        return self.db.exec(statement).all()
@@ -1,7 +1,10 @@
 from sqlmodel import Session, select
+from sqlalchemy import delete
 from app import model, schema
+from app.core.sql_profiler import profiled_repository
 
 
+@profiled_repository
 class UserRepository:
     """Camada de acesso e manipulação de dados de usuário"""
 
@@ -38,6 +41,8 @@ class UserRepository:
         user = self.get_by_id(user_id)
         if not user:
             return False
+        #Refresh tokens referenciam o usuário; sem eles as sessões abertas também deixam de valer
+        self.db.execute(delete(model.RefreshToken).where(model.RefreshToken.user_id == user_id))
         self.db.delete(user)
         self.db.commit()
         return True
\ No newline at end of file
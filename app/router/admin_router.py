@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+
+from app.core.dependencies import require_admin
+from app.core import sql_profiler
+from app.core.part_cache import part_cache
+from app.core.open_rnc_index import open_rnc_index
+from app.core.response_cache import response_cache
+from app.core.rate_limit import rate_limiter, load_monitor
+from app.core.idempotency import idempotency_store
+from app.core.token_revocation import refresh_token_cache
+from app.websocket.manager import manager
+from app.websocket.tickets import ticket_store
+
+router = APIRouter()
+
+@router.get('/sql/slow', status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def get_slowest_statements(limit: int = Query(20, ge=1, le=500), order_by: str = Query("total")):
+    """Lista os formatos de SQL mais caros registrados pelo profiler (requer SQL_PROFILING)"""
+    if sql_profiler.profiler is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SQL profiling desabilitado (SQL_PROFILING=false)")
+    try:
+        return {
+            "threshold_ms": sql_profiler.profiler.slow_threshold * 1000,
+            "statements": sql_profiler.profiler.top(limit, order_by)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.delete('/sql/slow', status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
+async def reset_sql_profile():
+    """Zera as estatísticas acumuladas do profiler"""
+    if sql_profiler.profiler is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SQL profiling desabilitado (SQL_PROFILING=false)")
+    sql_profiler.profiler.reset()
+
+
+@router.get('/cache', status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """Tamanho e taxa de acerto dos caches do catálogo de peças, das listagens de RNC, do índice de abertos e dos refresh tokens"""
+    return {
+        "parts": part_cache.stats(),
+        "open_rnc_index": open_rnc_index.stats(),
+        "responses": response_cache.stats(),
+        "refresh_tokens": refresh_token_cache.stats()
+    }
+
+@router.delete('/cache', status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
+async def clear_caches():
+    """Esvazia os caches; as próximas leituras voltam ao banco"""
+    part_cache.clear()
+    response_cache.clear()
+    open_rnc_index.clear()
+
+@router.get('/load', status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def get_load_stats():
+    """Sinais de sobrecarga do processo e contadores do rate limit"""
+    return {
+        "load": load_monitor.stats(),
+        "rate_limit": rate_limiter.stats()
+    }
+
+@router.get('/idempotency', status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def get_idempotency_stats():
+    """Chaves guardadas e repetições atendidas pelo armazenamento de Idempotency-Key"""
+    return idempotency_store.stats()
+
+@router.get('/websocket', status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def get_websocket_stats():
+    """Conexões WebSocket e SSE abertas, admissão de handshakes, snapshot inicial e contadores dos tickets"""
+    return {
+        "connections": len(manager.active_connections),
+        "sse": manager.sse.stats(),
+        "handshakes": manager.admission.stats(),
+        "snapshot": manager.snapshot.stats(),
+        "tickets": ticket_store.stats()
+    }
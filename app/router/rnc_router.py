@@ -1,33 +1,50 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, Header
 from sqlmodel import Session
 from typing import Annotated, Optional
+from datetime import datetime, date
 
 from app import repository, schema, model, service
 from app.core.dependencies import require_role, get_current_user
+from app.core.conditional import conditional_get
+from app.core.response_cache import cached_json_response
+from app.core.idempotency import idempotent_json_response
+from app.repository.rnc_repository import RNC_COLLECTION, TAG_ALL, TAG_PENDING_ANALYSIS, TAG_PENDING_REWORK
 from app.database import get_db
 
 router = APIRouter()
 
 @router.post('/create_rnc', response_model=schema.RNCReadSimple, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(model.UserRole.OPERADOR))])
-async def creating_rnc(rnc_data: schema.RNCCreate, db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)]):
+async def creating_rnc(
+    rnc_data: schema.RNCCreate,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[model.User, Depends(get_current_user)],
+    idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key", description="Chave para repetir a requisição sem criar outro RNC")] = None
+):
     repo = repository.RNCRepository(db)
     rnc_service = service.RNCService(repo)
-    try:
+
+    async def create():
         rnc = await rnc_service.create(rnc_data, current_user)
         return schema.RNCReadSimple.model_validate(rnc)
+
+    try:
+        return await idempotent_json_response(idempotency_key, "POST /create_rnc", current_user.id, rnc_data, status.HTTP_201_CREATED, create)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
     
 
-@router.get('/list_rncs', response_model=schema.RNCListResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.TECNICO, model.UserRole.ENGENHARIA))])
-async def get_all_rncs(db: Annotated[Session, Depends(get_db)], status: Optional[str] = Query(None), condition: Optional[str] = Query(None)):
+@router.get('/list_rncs', response_model=schema.RNCListResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.TECNICO, model.UserRole.ENGENHARIA)), Depends(conditional_get(RNC_COLLECTION))])
+async def get_all_rncs(db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)], response: Response, status_filter: Optional[str] = Query(None, alias="status"), condition: Optional[str] = Query(None)):
     """Lista todos os rncs que foram finalizados"""
     repo = repository.RNCRepository(db)
     rnc_service = service.RNCService(repo)
-    try:
-        rncs = rnc_service.get_filtered_rncs(status=status, condition=condition)
+
+    def build() -> schema.RNCListResponse:
+        rncs = rnc_service.get_filtered_rncs(status=status_filter, condition=condition)
         return schema.RNCListResponse(
             items=rncs,
             total=len(rncs),
@@ -35,31 +52,59 @@ async def get_all_rncs(db: Annotated[Session, Depends(get_db)], status: Optional
             page_size=len(rncs),
             total_pages=1
         )
+    try:
+        return cached_json_response("list_rncs", current_user.role, {"status": status_filter, "condition": condition}, [TAG_ALL], build, response)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e :
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
 
-@router.get('/list/to_be_reworked', response_model=schema.RNCListResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.TECNICO))])
-async def get_rncs_to_be_reworkeds(db: Annotated[Session, Depends(get_db)]):
+@router.get('/search', response_model=schema.RNCSearchResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.TECNICO, model.UserRole.ENGENHARIA))])
+async def search_rncs(
+    db: Annotated[Session, Depends(get_db)],
+    q: str = Query(..., min_length=2, max_length=200, description="Texto buscado em título, observações, causa raiz, ação corretiva e retrabalho"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    condition: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Data de ocorrência mínima"),
+    date_to: Optional[datetime] = Query(None, description="Data de ocorrência máxima"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """Busca textual nos RNCs, ordenada por relevância"""
+    repo = repository.RNCRepository(db)
+    rnc_service = service.RNCService(repo)
+    try:
+        return rnc_service.search_rncs(q, status_filter, condition, date_from, date_to, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.get('/list/to_be_reworked', response_model=schema.RNCListResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.TECNICO)), Depends(conditional_get(RNC_COLLECTION))])
+async def get_rncs_to_be_reworkeds(db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)], response: Response):
     """Lista todos os rncs que precisam ser retrabalhados"""
     repo = repository.RNCRepository(db)
     rnc_service = service.RNCService(repo)
     try:
-        rncs_to_be_reworkeds = rnc_service.get_rncs_pending_rework()
-        return schema.RNCListResponse(
-            items=rncs_to_be_reworkeds.items,
-            total=len(rncs_to_be_reworkeds.items),
-            page=1,
-            page_size=len(rncs_to_be_reworkeds.items),
-            total_pages=1
-        )
+        return cached_json_response("to_be_reworked", current_user.role, {}, [TAG_PENDING_REWORK], rnc_service.get_rncs_pending_rework, response)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.get('/list/to_be_analyzed', response_model=schema.RNCListResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA)), Depends(conditional_get(RNC_COLLECTION))])
+async def get_rncs_to_be_analyzed(db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)], response: Response):
+    """Lista os RNCs aguardando análise ou verificação da qualidade, do mais antigo para o mais recente"""
+    repo = repository.RNCRepository(db)
+    rnc_service = service.RNCService(repo)
+    try:
+        return cached_json_response("to_be_analyzed", current_user.role, {}, [TAG_PENDING_ANALYSIS], rnc_service.get_rncs_pending_analysis, response)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
 
-@router.get('/partCode/{partCode}', response_model=schema.RNCReadWithPart, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.TECNICO, model.UserRole.ENGENHARIA))])
+@router.get('/partCode/{partCode}', response_model=schema.RNCReadWithPart, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.TECNICO, model.UserRole.ENGENHARIA)), Depends(conditional_get(RNC_COLLECTION))])
 async def get_rnc_by_part_code(partCode: str, db: Annotated[Session, Depends(get_db)]):
     """Busca um RNC pelo código da peça"""
     repo = repository.RNCRepository(db)
@@ -111,7 +156,50 @@ async def get_rncs_rework_by_user(db: Annotated[Session, Depends(get_db)], curre
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
 
-@router.get('/statistics/', response_model=schema.RNCStatistics, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN))])
+@router.get('/analytics/trends', response_model=schema.RNCTrendsResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA)), Depends(conditional_get(RNC_COLLECTION))])
+async def get_trends(
+    db: Annotated[Session, Depends(get_db)],
+    granularity: str = Query("month", description="Período de agregação: day, week ou month"),
+    group_by: Optional[str] = Query(None, description="Uma série por valor de: client, critical_level ou condition"),
+    date_from: Optional[date] = Query(None, description="Primeiro dia do intervalo"),
+    date_to: Optional[date] = Query(None, description="Último dia do intervalo"),
+    client: Optional[str] = Query(None, description="Cliente da peça"),
+    critical_level: Optional[str] = Query(None),
+    condition: Optional[str] = Query(None)
+):
+    """Tendências de abertura, fechamento e tempo médio de resolução (MTTR) dos RNCs"""
+    repo = repository.RNCRepository(db)
+    rnc_service = service.RNCService(repo)
+    try:
+        return rnc_service.get_trends(granularity, group_by, date_from, date_to, client, critical_level, condition)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.get('/analytics/distributions', response_model=schema.RNCDistributionsResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA)), Depends(conditional_get(RNC_COLLECTION))])
+def get_distributions(
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[model.User, Depends(get_current_user)],
+    response: Response,
+    date_from: Optional[datetime] = Query(None, description="Data de ocorrência mínima"),
+    date_to: Optional[datetime] = Query(None, description="Data de ocorrência máxima"),
+    top: int = Query(20, ge=1, le=200, description="Categorias listadas em cada Pareto")
+):
+    """Percentis do tempo de resolução, erro da estimativa de retrabalho e Pareto de defeitos"""
+    #Rota síncrona: a leitura das colunas e o cálculo com NumPy rodam no threadpool, fora do event loop
+    analytics_service = service.RNCAnalyticsService(repository.RNCRepository(db))
+
+    def build() -> schema.RNCDistributionsResponse:
+        return analytics_service.get_distributions(date_from, date_to, top)
+    try:
+        return cached_json_response("analytics_distributions", current_user.role, {"date_from": date_from, "date_to": date_to, "top": top}, [TAG_ALL], build, response)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.get('/statistics/', response_model=schema.RNCStatistics, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN)), Depends(conditional_get(RNC_COLLECTION))])
 async def get_statistics(db: Annotated[Session, Depends(get_db)]):
     """Busca estatísticas a respeito dos RNCs"""
     repo = repository.RNCRepository(db)
@@ -125,13 +213,52 @@ async def get_statistics(db: Annotated[Session, Depends(get_db)]):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
 
 @router.patch('/analysis/{num_rnc}', response_model=schema.RNCRead, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA))])
-async def register_analysis(num_rnc: int, analysis_data: schema.QualityAnalysis, db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)]):
+async def register_analysis(
+    num_rnc: int,
+    analysis_data: schema.QualityAnalysis,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[model.User, Depends(get_current_user)],
+    idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key", description="Chave para repetir a requisição sem reaplicar a análise")] = None
+):
     """Rota para registrar análise da qualidade"""
     repo = repository.RNCRepository(db)
     rnc_service = service.RNCService(repo)
-    try:
+
+    async def analyze():
         rnc_update = await rnc_service.register_quality_analysis(num_rnc, analysis_data, current_user)
-        return rnc_update
+        return schema.RNCRead.model_validate(rnc_update)
+
+    try:
+        return await idempotent_json_response(idempotency_key, f"PATCH /analysis/{num_rnc}", current_user.id, analysis_data, status.HTTP_200_OK, analyze)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.post('/queue/{queue}/claim', response_model=schema.RNCRead, status_code=status.HTTP_200_OK, responses={204: {"description": "Fila vazia"}}, dependencies=[Depends(require_role(model.UserRole.TECNICO, model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA))])
+async def claim_next_rnc(queue: str, db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)]):
+    """Puxa para o usuário o RNC livre mais antigo da fila (rework: técnicos; analysis: qualidade e engenharia)"""
+    repo = repository.RNCRepository(db)
+    rnc_service = service.RNCService(repo)
+    try:
+        rnc = await rnc_service.claim_next(queue, current_user)
+        if rnc is None:
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
+        return rnc
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+
+@router.post('/queue/release/{num_rnc}', response_model=schema.RNCRead, status_code=status.HTTP_200_OK, dependencies=[Depends(require_role(model.UserRole.ADMIN, model.UserRole.TECNICO, model.UserRole.QUALIDADE, model.UserRole.ENGENHARIA))])
+async def release_rnc(num_rnc: int, db: Annotated[Session, Depends(get_db)], current_user: Annotated[model.User, Depends(get_current_user)]):
+    """Devolve à fila um RNC puxado pelo usuário"""
+    repo = repository.RNCRepository(db)
+    rnc_service = service.RNCService(repo)
+    try:
+        return await rnc_service.release(num_rnc, current_user)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
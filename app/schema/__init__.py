@@ -1,12 +1,13 @@
 from .user_schema import UserBase, UserCreate, UserRead, UserUpdate, UserLogin
-from .rnc_schema import RNCCreate, RNCRead, QualityAnalysis, TechnicianRework, RNCClose, RNCListResponse, RNCReadSimple, RNCReadWithPart, RNCStatistics
+from .rnc_schema import RNCCreate, RNCRead, QualityAnalysis, TechnicianRework, RNCClose, RNCListResponse, RNCReadSimple, RNCReadWithPart, RNCStatistics, RNCSearchHit, RNCSearchResponse, RNCTrendPoint, RNCTrendSeries, RNCTrendsResponse, RNCDistributionSummary, RNCReworkEstimateError, RNCParetoItem, RNCPareto, RNCDistributionsResponse
 from .part_schema import PartBase, PartCreate, PartRead
-from .token_schema import Token, TokenData
+from .token_schema import Token, TokenData, WebSocketTicketResponse
 
 # Opcional: define o que é exportado quando se usa "from app.schemas import *"
 __all__ = [
     "PartBase", "PartCreate", "PartRead",
     "UserBase", "UserCreate", "UserRead", "UserUpdate", "UserLogin",
-    "Token", "TokenData",
-    "RNCCreate", "RNCRead", "QualityAnalysis", "TechnicianRework", "RNCClose", "RNCListResponse", "RNCReadSimple", "RNCReadWithPart", "RNCStatistics"
+    "Token", "TokenData", "WebSocketTicketResponse",
+    "RNCCreate", "RNCRead", "QualityAnalysis", "TechnicianRework", "RNCClose", "RNCListResponse", "RNCReadSimple", "RNCReadWithPart", "RNCStatistics", "RNCSearchHit", "RNCSearchResponse", "RNCTrendPoint", "RNCTrendSeries", "RNCTrendsResponse",
+    "RNCDistributionSummary", "RNCReworkEstimateError", "RNCParetoItem", "RNCPareto", "RNCDistributionsResponse"
 ]
\ No newline at end of file
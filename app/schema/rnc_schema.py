@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional
 
 # Importamos os schemas dos quais ele depende
@@ -192,6 +192,86 @@ class RNCListResponse(BaseModel):
     page_size: int
     total_pages: int
 
+class RNCSearchHit(RNCReadSimple):
+    """Schema de um resultado da busca textual de RNCs"""
+    rank: float = Field(..., description="Relevância do resultado (maior é mais relevante)")
+
+class RNCSearchResponse(BaseModel):
+    """Schema de resposta da busca textual de RNCs"""
+    query: str
+    items: list[RNCSearchHit]
+    limit: int
+    offset: int
+
+class RNCTrendPoint(BaseModel):
+    """Schema de um período da série de tendência"""
+    period: date = Field(..., description="Início do período (dia, segunda-feira da semana ou primeiro dia do mês)")
+    opened: int = Field(..., description="RNCs abertos no período")
+    closed: int = Field(..., description="RNCs fechados no período")
+    mttr_days: Optional[float] = Field(None, description="Tempo médio de resolução (dias) dos RNCs fechados no período")
+
+class RNCTrendSeries(BaseModel):
+    """Schema de uma série de tendência (uma por valor da dimensão agrupada)"""
+    key: Optional[str] = Field(None, description="Valor da dimensão agrupada; None quando não há agrupamento")
+    opened: int
+    closed: int
+    mttr_days: Optional[float] = None
+    points: list[RNCTrendPoint]
+
+class RNCTrendsResponse(BaseModel):
+    """Schema de resposta das tendências de RNCs"""
+    granularity: str
+    group_by: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    opened: int
+    closed: int
+    mttr_days: Optional[float] = None
+    series: list[RNCTrendSeries]
+
+class RNCDistributionSummary(BaseModel):
+    """Schema de resumo de uma distribuição (percentis)"""
+    count: int
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+
+class RNCReworkEstimateError(BaseModel):
+    """Schema do erro entre o tempo de retrabalho estimado e o gasto (em minutos)"""
+    count: int = Field(..., description="RNCs com estimativa e tempo gasto informados")
+    mean_error: Optional[float] = Field(None, description="Erro médio (gasto - estimado); positivo indica subestimativa")
+    mean_absolute_error: Optional[float] = None
+    mean_absolute_percentage_error: Optional[float] = Field(None, description="Erro absoluto médio relativo à estimativa (0.25 = 25%)")
+    absolute_error: RNCDistributionSummary
+    overrun_share: Optional[float] = Field(None, description="Fração dos retrabalhos que passaram da estimativa")
+
+class RNCParetoItem(BaseModel):
+    """Schema de uma barra do gráfico de Pareto"""
+    label: str
+    count: int
+    share: float
+    cumulative_share: float
+
+class RNCPareto(BaseModel):
+    """Schema de um gráfico de Pareto (categorias mais frequentes primeiro)"""
+    total: int
+    categories: int = Field(..., description="Quantidade de categorias distintas")
+    vital_few: int = Field(..., description="Categorias que somam 80% das ocorrências")
+    items: list[RNCParetoItem]
+
+class RNCDistributionsResponse(BaseModel):
+    """Schema de resposta das distribuições estatísticas dos RNCs"""
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    total_rncs: int
+    resolution_days: RNCDistributionSummary
+    resolution_days_by_critical_level: dict[str, RNCDistributionSummary]
+    rework_estimate_error: RNCReworkEstimateError
+    pareto_by_part: RNCPareto = Field(..., description="Defeitos por tipo de peça (descrição da peça)")
+    pareto_by_client: RNCPareto
+    pareto_by_root_cause: RNCPareto
+
 class RNCStatistics(BaseModel):
     """Schema para estatísticas de RNCs"""
     total_rncs: int
@@ -12,4 +12,8 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
     role: str = None
-    user_id: int = None
\ No newline at end of file
+    user_id: int = None
+
+class WebSocketTicketResponse(BaseModel):
+    ticket: str
+    expires_in: float
@@ -2,10 +2,12 @@ from .auth_service import AuthService
 from .rnc_service import RNCService
 from .user_service import UserService
 from .part_service import PartService
+from .analytics_service import RNCAnalyticsService
 
 __all__ = [
     "AuthService",
     "RNCService",
     "UserService",
-    "PartService"
+    "PartService",
+    "RNCAnalyticsService"
 ]
\ No newline at end of file
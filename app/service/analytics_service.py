@@ -0,0 +1,133 @@
+from app import repository, schema
+from typing import Optional
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+#Percentis reportados nas distribuições
+PERCENTILES = (50, 90, 99)
+#Fração acumulada que define as categorias "vitais" do Pareto
+PARETO_CUTOFF = 0.8
+
+def _round(value) -> Optional[float]:
+    return None if value is None else round(float(value), 2)
+
+class RNCAnalyticsService:
+    """
+    Análises estatísticas dos RNCs calculadas de forma vetorizada (NumPy)
+
+    As colunas necessárias são lidas em lote pelo RNCRepository.analytics_columns, sem
+    montar objetos RNC, e convertidas em arrays; percentis, erros de estimativa e Pareto
+    são calculados sobre os arrays inteiros. O NumPy só é importado na primeira chamada,
+    para não pesar na inicialização do worker.
+    """
+    def __init__(self, repo: repository.RNCRepository):
+        self.repo = repo
+
+    def get_distributions(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, top: int = 20) -> schema.RNCDistributionsResponse:
+        """
+        Distribuições de tempo de resolução, erro de estimativa do retrabalho e Pareto de defeitos
+        Args:
+            date_from: Data de ocorrência mínima
+            date_to: Data de ocorrência máxima
+            top: Quantidade de categorias listadas em cada Pareto
+        Returns:
+            Distribuições calculadas sobre os RNCs do intervalo
+        Raises:
+            ValueError: Se o intervalo for inválido
+        """
+        import numpy as np
+
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("A data inicial deve ser anterior à data final")
+
+        columns = self.repo.analytics_columns(date_from, date_to)
+        #Mesmo arredondamento de RNC.get_resolution_time_days; RNCs abertos viram NaN
+        resolution = np.round(np.array(columns["resolution_days"], dtype=np.float64), 2)
+        closed = ~np.isnan(resolution)
+        critical_levels = np.array(columns["critical_level"], dtype=str)
+
+        by_level = {
+            str(level): self._summary(resolution[closed & (critical_levels == level)])
+            for level in np.unique(critical_levels[closed])
+        }
+        response = schema.RNCDistributionsResponse(
+            date_from=date_from,
+            date_to=date_to,
+            total_rncs=len(resolution),
+            resolution_days=self._summary(resolution[closed]),
+            resolution_days_by_critical_level=by_level,
+            rework_estimate_error=self._estimate_error(columns["estimated_rework_time"], columns["time_spent"]),
+            pareto_by_part=self._pareto(columns["part"], top),
+            pareto_by_client=self._pareto(columns["client"], top, missing="(sem cliente)"),
+            pareto_by_root_cause=self._pareto(columns["root_cause"], top),
+        )
+        logger.info("Distribuições calculadas sobre %s RNCs (%s fechados)", response.total_rncs, response.resolution_days.count)
+        return response
+
+    def _summary(self, values) -> schema.RNCDistributionSummary:
+        """Média e percentis de um array sem NaN"""
+        import numpy as np
+
+        if values.size == 0:
+            return schema.RNCDistributionSummary(count=0)
+        p50, p90, p99 = np.percentile(values, PERCENTILES)
+        return schema.RNCDistributionSummary(
+            count=int(values.size), mean=_round(values.mean()), p50=_round(p50), p90=_round(p90), p99=_round(p99)
+        )
+
+    def _estimate_error(self, estimated_column: tuple, spent_column: tuple) -> schema.RNCReworkEstimateError:
+        """Erro entre o tempo gasto e o estimado, apenas onde os dois foram informados"""
+        import numpy as np
+
+        estimated = np.array(estimated_column, dtype=np.float64)
+        spent = np.array(spent_column, dtype=np.float64)
+        valid = (estimated > 0) & (spent > 0)    #NaN (não informado) compara como False
+        if not valid.any():
+            return schema.RNCReworkEstimateError(count=0, absolute_error=schema.RNCDistributionSummary(count=0))
+
+        estimated, spent = estimated[valid], spent[valid]
+        error = spent - estimated
+        absolute = np.abs(error)
+        return schema.RNCReworkEstimateError(
+            count=int(valid.sum()),
+            mean_error=_round(error.mean()),
+            mean_absolute_error=_round(absolute.mean()),
+            mean_absolute_percentage_error=round(float((absolute / estimated).mean()), 4),
+            absolute_error=self._summary(absolute),
+            overrun_share=round(float((error > 0).mean()), 4),
+        )
+
+    def _pareto(self, labels: tuple, top: int, missing: Optional[str] = None) -> schema.RNCPareto:
+        """
+        Pareto de uma coluna categórica: contagem por categoria em ordem decrescente
+
+        Args:
+            labels: Valores da coluna
+            top: Quantidade de categorias retornadas
+            missing: Rótulo para valores vazios; sem ele os vazios são ignorados
+        """
+        import numpy as np
+
+        labels = [label if label else missing for label in labels] if missing else [label for label in labels if label]
+        if not labels:
+            return schema.RNCPareto(total=0, categories=0, vital_few=0, items=[])
+
+        categories, counts = np.unique(np.array(labels, dtype=str), return_counts=True)
+        order = np.argsort(counts, kind="stable")[::-1]
+        categories, counts = categories[order], counts[order]
+        total = int(counts.sum())
+        shares = counts / total
+        cumulative = np.cumsum(shares)
+        vital_few = int(np.searchsorted(cumulative, PARETO_CUTOFF) + 1)
+
+        return schema.RNCPareto(
+            total=total,
+            categories=int(categories.size),
+            vital_few=min(vital_few, int(categories.size)),
+            items=[
+                schema.RNCParetoItem(label=str(label), count=int(count), share=round(float(share), 4), cumulative_share=round(float(cumulative_share), 4))
+                for label, count, share, cumulative_share in zip(categories[:top], counts[:top], shares[:top], cumulative[:top])
+            ]
+        )
@@ -1,5 +1,14 @@
 from app.repository.auth_repository import AuthRepository
-from app import schema
+from app.core.security import create_access_token, create_refresh_token, verify_refresh_token
+from app.core.token_revocation import refresh_token_cache
+from app.core.config import settings
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
+from app import schema, model
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
 
@@ -12,4 +21,97 @@ class AuthService:
             return None
         elif not existing_user.check_password(data_login.password):
             return None
-        return existing_user
\ No newline at end of file
+        return existing_user
+
+    def issue_tokens(self, user: model.User, family_id: Optional[str] = None) -> tuple[str, str]:
+        """
+        Emite um access token e um refresh token registrado na tabela refresh_token
+        Args:
+            user: Usuário autenticado
+            family_id: Família de rotação; sem ela (login) uma nova família é iniciada
+        Returns:
+            (access_token, refresh_token)
+        """
+        token_data = {"sub": user.email, "role": user.role, "user_id": user.id}
+        access_token = create_access_token(data=token_data, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES))
+
+        if family_id is None:
+            family_id = uuid4().hex
+            self.repo.delete_expired_refresh_tokens(user.id)
+        jti = uuid4().hex
+        expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        refresh_token = create_refresh_token({**token_data, "jti": jti, "fam": family_id}, expires_delta=expires_delta)
+        self.repo.add_refresh_token(jti, family_id, user.id, datetime.now(timezone.utc) + expires_delta)
+        return access_token, refresh_token
+
+    def rotate_refresh_token(self, refresh_token: str) -> Optional[tuple[model.User, str, str]]:
+        """
+        Troca um refresh token válido por um novo par de tokens da mesma família
+
+        O token apresentado é consumido; se ele já tinha sido consumido (reuso, sinal de
+        vazamento), a família inteira é revogada e o usuário precisa fazer login de novo.
+        A exceção é um reuso dentro de REFRESH_TOKEN_REUSE_GRACE_SECONDS da troca: duas abas ou
+        retentativas paralelas enviam o mesmo cookie antes do Set-Cookie da primeira chegar, e
+        só a repetida recebe 401, sem derrubar o token que acabou de ser emitido.
+        A família também é revogada se o usuário não existir mais ou estiver inativo.
+        Returns:
+            (usuário, access_token, refresh_token), ou None se o token não puder ser trocado
+        """
+        payload = verify_refresh_token(refresh_token)
+        if not payload:
+            return None
+        jti, family_id = payload.get("jti"), payload.get("fam")
+        if not jti or not family_id:
+            logger.warning("Refresh token sem jti (emitido antes da rotação) recusado")
+            return None
+
+        #Reusos conhecidos pelo cache são recusados sem consultar o banco
+        if refresh_token_cache.is_revoked(family_id):
+            return None
+        used_at = refresh_token_cache.consumed_at(jti)
+        if used_at is not None:
+            self._reject_reuse(jti, family_id, used_at)
+            return None
+
+        user = self.repo.get_user(payload.get("user_id"))
+        if not user or not user.active:
+            self._revoke_family(family_id, "usuário inexistente ou inativo")
+            return None
+
+        now = datetime.now(timezone.utc)
+        if not self.repo.consume_refresh_token(jti, now):
+            stored = self.repo.get_refresh_token(jti)
+            if stored is None or stored.revoked_at is not None or stored.used_at is None:
+                self._revoke_family(family_id, "refresh token revogado ou desconhecido")
+            else:
+                self._reject_reuse(jti, family_id, stored.used_at)
+            return None
+
+        access_token, new_refresh_token = self.issue_tokens(user, family_id)
+        refresh_token_cache.mark_consumed(jti, now)
+        return user, access_token, new_refresh_token
+
+    def revoke_refresh_token(self, refresh_token: str) -> bool:
+        """Revoga a família do token (logout); retorna False se o token for inválido"""
+        payload = verify_refresh_token(refresh_token)
+        if not payload or not payload.get("fam"):
+            return False
+        self.repo.revoke_family(payload["fam"])
+        refresh_token_cache.revoke_family(payload["fam"])
+        return True
+
+    def _reject_reuse(self, jti: str, family_id: str, used_at: datetime) -> None:
+        """Recusa um token já consumido; revoga a família só se o consumo não foi há instantes"""
+        #O SQLite devolve datetimes sem fuso; os gravados aqui são sempre UTC
+        if used_at.tzinfo is None:
+            used_at = used_at.replace(tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - used_at).total_seconds()
+        if elapsed <= settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS:
+            logger.info("Refresh token %s reapresentado %.1fs após a troca (requisição simultânea): recusado sem revogar", jti, elapsed)
+            return
+        self._revoke_family(family_id, "reuso de refresh token já consumido")
+
+    def _revoke_family(self, family_id: str, reason: str) -> None:
+        revoked = self.repo.revoke_family(family_id)
+        refresh_token_cache.revoke_family(family_id)
+        logger.warning("🚨 Família de refresh tokens %s revogada (%s tokens): %s", family_id, revoked, reason)
@@ -6,7 +6,7 @@ class PartService:
 
     def get_part_by_code(self, part_code: str) -> schema.PartRead:
         """Busca uma peça pelo código"""
-        part = self.repo.get_by_code(part_code)
+        part = self.repo.get_cached_by_code(part_code)
         if not part:
             raise ValueError(f"Peça com código '{part_code}' não encontrada.")
-        return schema.PartRead.model_validate(part)
\ No newline at end of file
+        return part
\ No newline at end of file
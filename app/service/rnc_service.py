@@ -1,13 +1,29 @@
 from app import repository, schema, model
+from app.repository.rollup_repository import ROLLUP_DIMENSIONS
+from app.repository.rnc_repository import WORK_QUEUES
 from app.websocket.manager import manager
 from app.utils.serializable import serialize_rnc
 from typing import Optional
-from collections import Counter
+from datetime import datetime, date, timedelta
+from collections import Counter, defaultdict
 import logging
 
 logger = logging.getLogger(__name__)
 model_rnc = model.RNC
 
+#Início do período de cada granularidade das tendências
+TREND_GRANULARITIES = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+#Papéis que podem puxar RNCs de cada fila de trabalho
+QUEUE_ROLES = {
+    "rework": (model.UserRole.TECNICO.value,),
+    "analysis": (model.UserRole.QUALIDADE.value, model.UserRole.ENGENHARIA.value),
+}
+
 class RNCService:
     """
     Serviço para gerenciamento de RNCs (Registro de não conformidades)
@@ -38,11 +54,11 @@ class RNCService:
             new_rnc = self.repo.create_rnc(rnc_data, open_by_id=current_user.id)
 
             await manager.broadcast_all("rnc_created", serialize_rnc(new_rnc))
-            logger.info(f"RNC #{new_rnc.num_rnc} criado por usuário {current_user.id} para peça {rnc_data.part_code}")
+            logger.info("RNC #%s criado por usuário %s para peça %s", new_rnc.num_rnc, current_user.id, rnc_data.part_code)
 
             return new_rnc
         except ValueError as e:
-            logger.warning(f"Tentativa de criar RNC duplicado: {str(e)}")
+            logger.warning("Tentativa de criar RNC duplicado: %s", e)
             raise
     
     #CONSULTAS
@@ -56,7 +72,7 @@ class RNCService:
         """
         rnc = self.repo.get_by_num(num_rnc)
         if not rnc:
-            logger.warning(f"RNC #{num_rnc} não encontrado")
+            logger.warning("RNC #%s não encontrado", num_rnc)
         return rnc
 
     def get_rnc_by_part_code(self, partCode: str) -> model.RNC:
@@ -134,9 +150,55 @@ class RNCService:
         """
         self._validate_filters(status, condition)
         rncs = self.repo.list_all(status, condition, limit, offset)
-        logger.info(f"Listagem de RNCs: status={status}, condition={condition}, " f"encontrados={len(rncs)}")
+        logger.info("Listagem de RNCs: status=%s, condition=%s, encontrados=%s", status, condition, len(rncs))
         return rncs
 
+    def search_rncs(
+        self,
+        query: str,
+        status: Optional[str] = None,
+        condition: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> schema.RNCSearchResponse:
+        """
+        Busca textual nos campos livres dos RNCs
+        Args:
+            query: Texto buscado
+            status: Filtro por status (aberto/fechado)
+            condition: Filtro por condição
+            date_from: Data de ocorrência mínima
+            date_to: Data de ocorrência máxima
+            limit: Limite de resultados
+            offset: Offset para paginação
+        Returns:
+            Resultados ordenados por relevância
+        Raises:
+            ValueError: Se a busca ou os filtros forem inválidos
+        """
+        query = (query or "").strip()
+        if len(query) < 2:
+            raise ValueError("A busca deve ter ao menos 2 caracteres")
+        self._validate_filters(status, condition)
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("A data inicial deve ser anterior à data final")
+
+        status = status.lower() if status else None
+        condition = condition.lower() if condition else None
+        hits = self.repo.search_rncs(query, status, condition, date_from, date_to, limit, offset)
+        logger.info("Busca de RNCs: query=%r, status=%s, condition=%s, encontrados=%s", query, status, condition, len(hits))
+        return schema.RNCSearchResponse(
+            query=query,
+            items=[
+                schema.RNCSearchHit.model_validate({**schema.RNCReadSimple.model_validate(rnc).model_dump(), "rank": rank})
+                for rnc, rank in hits
+            ],
+            limit=limit,
+            offset=offset
+        )
+
     def get_rncs_pending_rework(self) -> schema.RNCListResponse:
         """
         Retorna RNCs que precisam ser retrabalhados
@@ -189,6 +251,57 @@ class RNCService:
             total_pages=1
         )
     
+    #FILAS DE TRABALHO
+    async def claim_next(self, queue: str, current_user: model.User) -> Optional[model.RNC]:
+        """
+        Puxa o próximo RNC livre da fila para o usuário
+
+        Se o usuário já tem um RNC dessa fila, ele é devolvido de novo (uma repetição da
+        requisição não puxa um segundo RNC).
+        Args:
+            queue: Fila de trabalho (rework ou analysis)
+            current_user: Usuário autenticado
+        Returns:
+            RNC atribuído ao usuário ou None se a fila estiver vazia
+        Raises:
+            ValueError: Se a fila for inválida ou o papel do usuário não atender a fila
+        """
+        if queue not in QUEUE_ROLES:
+            raise ValueError(f"Fila inválida. Valores válidos: {', '.join(QUEUE_ROLES)}")
+        if current_user.role not in QUEUE_ROLES[queue]:
+            raise ValueError(f"Usuário não tem permissão para a fila {queue}")
+
+        rnc = self.repo.get_claimed(queue, current_user.id)
+        if rnc:
+            return rnc
+        rnc = self.repo.claim_next(queue, current_user.id)
+        if not rnc:
+            logger.debug("Fila %s vazia para o usuário %s", queue, current_user.id)
+            return None
+        await self._broadcast_queue(queue, "rnc_claimed", rnc)
+        logger.info("RNC #%s puxado da fila %s pelo usuário %s", rnc.num_rnc, queue, current_user.id)
+        return rnc
+
+    async def release(self, num_rnc: int, current_user: model.User) -> model.RNC:
+        """
+        Devolve à fila um RNC puxado pelo usuário (o administrador pode devolver qualquer um)
+        Raises:
+            ValueError: Se o RNC não for encontrado ou estiver com outro usuário
+        """
+        force = current_user.role == model.UserRole.ADMIN.value
+        rnc = self.repo.release(num_rnc, current_user.id, force)
+        queue = next((name for name, conditions in WORK_QUEUES.items() if rnc.condition in conditions), None)
+        if queue:
+            await self._broadcast_queue(queue, "rnc_released", rnc)
+        logger.info("RNC #%s devolvido à fila pelo usuário %s", num_rnc, current_user.id)
+        return rnc
+
+    async def _broadcast_queue(self, queue: str, event: str, rnc: model.RNC) -> None:
+        """Avisa quem atende a fila (e os administradores) que o RNC foi puxado ou devolvido"""
+        payload = {"num_rnc": rnc.num_rnc, "queue": queue, "current_responsible_id": rnc.current_responsible_id}
+        for role in (*QUEUE_ROLES[queue], model.UserRole.ADMIN.value):
+            await manager.broadcast_group(role, event, payload)
+
     async def register_quality_analysis(self, num_rnc: int, analysis_data: schema.QualityAnalysis, quality_user: model.User) -> model.RNC:
         """
         Registra análise da qualidade no RNC
@@ -208,13 +321,13 @@ class RNCService:
             updated_rnc = self.repo.register_quality_analysis(num_rnc, analysis_data, quality_user)
             if updated_rnc.is_closed():
                 await manager.broadcast_all("rnc_closed", serialize_rnc(updated_rnc))
-                logger.info(f"RNC #{num_rnc} fechado após análise.")
+                logger.info("RNC #%s fechado após análise.", num_rnc)
             else:
                 await manager.broadcast_all("rnc_analysis_completed", serialize_rnc(updated_rnc))
-                logger.info(f"Análise registrada no RNC #{num_rnc} por usuário {quality_user.id}")
+                logger.info("Análise registrada no RNC #%s por usuário %s", num_rnc, quality_user.id)
             return updated_rnc
         except Exception as e:
-            logger.error(f"Erro ao registrar análise no RNC #{num_rnc}: {str(e)}")
+            logger.error("Erro ao registrar análise no RNC #%s: %s", num_rnc, e)
             raise
     
     async def register_technician_rework(self, num_rnc: int, rework_data: schema.TechnicianRework, technician_user: model.User) -> model.RNC:
@@ -242,10 +355,10 @@ class RNCService:
         try:
             updated_rnc = self.repo.register_technician_rework(num_rnc, rework_data, technician_user)
             await manager.broadcast_all("rnc_rework_completed", serialize_rnc(updated_rnc))
-            logger.info(f"Retrabalho registrado com sucesso no RNC #{num_rnc}, aguardando nova análise.")
+            logger.info("Retrabalho registrado com sucesso no RNC #%s, aguardando nova análise.", num_rnc)
             return updated_rnc
         except Exception as e:
-            logger.error(f"Erro ao registrar retrabalho no RNC #{num_rnc}: {str(e)}")
+            logger.error("Erro ao registrar retrabalho no RNC #%s: %s", num_rnc, e)
             raise
     
     async def close_rnc(self, num_rnc: int, close_data: schema.RNCClose, closing_user: model.User) -> model.RNC:
@@ -271,10 +384,10 @@ class RNCService:
         try:
             closed_rnc = self.repo.close_rnc(num_rnc, closing_user, close_data.closing_notes)
             await manager.broadcast_all("rnc_closed", serialize_rnc(closed_rnc))
-            logger.info(f"RNC #{num_rnc} fechado manualmente por usuário {closing_user.id}")
+            logger.info("RNC #%s fechado manualmente por usuário %s", num_rnc, closing_user.id)
             return closed_rnc
         except Exception as e:
-            logger.error(f"Erro ao fechar RNC #{num_rnc}: {str(e)}")
+            logger.error("Erro ao fechar RNC #%s: %s", num_rnc, e)
             raise
 
     def get_statistics(self) -> schema.RNCStatistics:
@@ -326,6 +439,87 @@ class RNCService:
             by_condition=by_condition
         )
 
+    def get_trends(
+        self,
+        granularity: str = "month",
+        group_by: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        client: Optional[str] = None,
+        critical_level: Optional[str] = None,
+        condition: Optional[str] = None
+    ) -> schema.RNCTrendsResponse:
+        """
+        Tendências de abertura, fechamento e MTTR a partir dos agregados diários (rnc_rollup)
+
+        Abertos contam pela data de ocorrência e fechados pela data de fechamento; o MTTR de
+        cada período é a média de RNC.get_resolution_time_days dos RNCs fechados nele.
+        Args:
+            granularity: day, week ou month
+            group_by: Dimensão das séries (client, critical_level, condition) ou None
+            date_from: Primeiro dia do intervalo
+            date_to: Último dia do intervalo
+            client: Filtro por cliente da peça
+            critical_level: Filtro por nível de criticidade
+            condition: Filtro por condição
+        Returns:
+            Uma série por valor da dimensão, com os totais do intervalo
+        Raises:
+            ValueError: Se a granularidade, a dimensão ou os filtros forem inválidos
+        """
+        if granularity not in TREND_GRANULARITIES:
+            raise ValueError(f"Granularidade inválida. Valores válidos: {', '.join(TREND_GRANULARITIES)}")
+        if group_by and group_by not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"Agrupamento inválido. Valores válidos: {', '.join(ROLLUP_DIMENSIONS)}")
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("A data inicial deve ser anterior à data final")
+        self._validate_filters(None, condition)
+        if critical_level:
+            self._validate_critical_level(critical_level)
+
+        rows = repository.RNCRollupRepository(self.repo.db).daily_totals(
+            group_by, date_from, date_to, client,
+            critical_level.upper() if critical_level else None,
+            condition.lower() if condition else None
+        )
+        period_of = TREND_GRANULARITIES[granularity]
+        #série -> período -> [abertos, fechados, soma dos tempos de resolução]
+        buckets: dict[Optional[str], dict[date, list]] = defaultdict(lambda: defaultdict(lambda: [0, 0, 0.0]))
+        for day, key, opened, closed, resolution_days in rows:
+            if not opened and not closed:
+                continue    #linhas zeradas por transições (o RNC mudou de condição)
+            bucket = buckets[key][period_of(day)]
+            bucket[0] += opened or 0
+            bucket[1] += closed or 0
+            bucket[2] += resolution_days or 0.0
+
+        def mttr(closed: int, resolution_days: float) -> Optional[float]:
+            return round(resolution_days / closed, 2) if closed else None
+
+        series = []
+        for key, periods in sorted(buckets.items(), key=lambda item: (item[0] is None, item[0] or "")):
+            points = [
+                schema.RNCTrendPoint(period=period, opened=opened, closed=closed, mttr_days=mttr(closed, resolution_days))
+                for period, (opened, closed, resolution_days) in sorted(periods.items())
+            ]
+            opened = sum(point.opened for point in points)
+            closed = sum(point.closed for point in points)
+            resolution_days = sum(values[2] for values in periods.values())
+            series.append(schema.RNCTrendSeries(key=key, opened=opened, closed=closed, mttr_days=mttr(closed, resolution_days), points=points))
+
+        total_closed = sum(item.closed for item in series)
+        total_resolution = sum(values[2] for periods in buckets.values() for values in periods.values())
+        return schema.RNCTrendsResponse(
+            granularity=granularity,
+            group_by=group_by,
+            date_from=date_from,
+            date_to=date_to,
+            opened=sum(item.opened for item in series),
+            closed=total_closed,
+            mttr_days=mttr(total_closed, total_resolution),
+            series=series
+        )
+
     # async def update_rnc(self, num_rnc: int, rnc_data: schema.RNCUpdate, current_user: model.User) -> model_rnc:
     #     """Atualiza um RNC"""
     #     rnc = self.repo.get_by_num(num_rnc)
@@ -355,7 +549,7 @@ class RNCService:
     def _validate_filters(self, status, condition):
         if status and status.lower() not in ["aberto", "fechado"]:
             raise ValueError("Status inválido")
-        if condition and condition.lower() not in ["em_analise", "aprovado", "refugo", "retrabalho"]:
+        if condition and condition.lower() not in [c.value for c in model.RNCCondition]:
             raise ValueError("Condição inválida")
         
     def _validate_critical_level(self, critical_level: str) -> None:
@@ -1,19 +1,54 @@
+from dataclasses import dataclass, fields
+from typing import Optional
 from app import model
 
-def serialize_rnc(rnc: model.RNC):
-    return {
-        "id": rnc.id,
-        "num_rnc": rnc.num_rnc,
-        "title": rnc.title,
-        "status": rnc.status,
-        "condition": rnc.condition,
-        "part_code": rnc.part_code,
-        "observations": rnc.observations,
-        "critical_level": rnc.critical_level,
-        "part_id": rnc.part_id,
-        "open_by_id": rnc.open_by_id,
-        "closed_by_id": rnc.closed_by_id,
-        "date_of_occurrence": rnc.date_of_occurrence.isoformat() if rnc.date_of_occurrence else None,
-        "closing_date": rnc.closing_date.isoformat() if rnc.closing_date else None,
-        "close_rnc": rnc.is_closed()
-    }
+@dataclass(frozen=True, slots=True)
+class RNCEvent:
+    """
+    Payload imutável dos eventos de RNC enviados pelo WebSocket
+
+    Guarda só os valores da linha já commitada (datas já em ISO 8601), sem o estado de
+    instrumentação do ORM, e ocupa bem menos memória que um dict por evento.
+    """
+    id: int
+    num_rnc: int
+    title: str
+    status: str
+    condition: str
+    part_code: str
+    observations: Optional[str]
+    critical_level: str
+    part_id: int
+    open_by_id: int
+    closed_by_id: Optional[int]
+    date_of_occurrence: Optional[str]
+    closing_date: Optional[str]
+    close_rnc: bool
+
+    @classmethod
+    def from_rnc(cls, rnc: model.RNC) -> "RNCEvent":
+        return cls(
+            id=rnc.id,
+            num_rnc=rnc.num_rnc,
+            title=rnc.title,
+            status=rnc.status,
+            condition=rnc.condition,
+            part_code=rnc.part_code,
+            observations=rnc.observations,
+            critical_level=rnc.critical_level,
+            part_id=rnc.part_id,
+            open_by_id=rnc.open_by_id,
+            closed_by_id=rnc.closed_by_id,
+            date_of_occurrence=rnc.date_of_occurrence.isoformat() if rnc.date_of_occurrence else None,
+            closing_date=rnc.closing_date.isoformat() if rnc.closing_date else None,
+            close_rnc=rnc.status == model.RNCStatus.FECHADO.value
+        )
+
+    def as_dict(self) -> dict:
+        """Dict no formato JSON dos eventos (mesmas chaves de antes)"""
+        return {name: getattr(self, name) for name in _RNC_EVENT_FIELDS}
+
+_RNC_EVENT_FIELDS = tuple(field.name for field in fields(RNCEvent))
+
+def serialize_rnc(rnc: model.RNC) -> RNCEvent:
+    return RNCEvent.from_rnc(rnc)
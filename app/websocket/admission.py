@@ -0,0 +1,103 @@
+from contextlib import asynccontextmanager
+from collections import deque
+from time import monotonic
+import asyncio
+import random
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.rate_limit import load_monitor
+
+#Janela usada para calcular a taxa recente de handshakes
+RATE_WINDOW_SECONDS = 10.0
+
+class HandshakeRejected(Exception):
+    """Handshake recusado pela admissão; o cliente deve tentar de novo após retry_after segundos"""
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Handshake recusado ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class HandshakeAdmission:
+    """
+    Controle de admissão dos handshakes de WebSocket
+
+    No máximo max_concurrent handshakes rodam ao mesmo tempo; os excedentes esperam em uma
+    fila de até queue_size posições por no máximo max_wait segundos. Com a fila cheia, a
+    espera esgotada ou o processo sobrecarregado (LoadMonitor), o handshake é recusado com
+    uma sugestão de backoff que cresce com a ocupação da fila e leva jitter, para que os
+    clientes de uma tempestade de reconexões não voltem todos no mesmo instante.
+    """
+    def __init__(self, max_concurrent: int, queue_size: int, max_wait: float, backoff: float):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._admitted: deque[float] = deque()
+
+    def retry_after(self) -> float:
+        """Backoff sugerido: base x (1 + ocupação da fila), com jitter de ±50%"""
+        pressure = registry.ws_handshakes_queued / self.queue_size if self.queue_size else 1.0
+        return self.backoff * (1 + pressure) * random.uniform(0.5, 1.5)
+
+    def _reject(self, reason: str, waited: float) -> HandshakeRejected:
+        registry.observe_ws_handshake(f"rejected_{reason}", waited)
+        return HandshakeRejected(reason, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        """Ocupa uma vaga de handshake durante o bloco; levanta HandshakeRejected se não houver"""
+        if load_monitor.overload_reason():
+            raise self._reject("overload", 0.0)
+        #Só conta como fila o que excede as vagas livres
+        free = self.max_concurrent - registry.ws_handshakes_in_progress
+        if registry.ws_handshakes_queued - free >= self.queue_size:
+            raise self._reject("queue_full", 0.0)
+
+        started = monotonic()
+        registry.ws_handshakes_queued += 1
+        #asyncio.timeout em vez de wait_for: no 3.11 o wait_for pode esgotar o prazo depois que a
+        #tarefa interna já obteve a vaga, que então nunca é devolvida
+        acquired = False
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await self._semaphore.acquire()
+                acquired = True
+        except TimeoutError:
+            if acquired:
+                self._semaphore.release()
+            raise self._reject("timeout", monotonic() - started) from None
+        finally:
+            registry.ws_handshakes_queued -= 1
+
+        now = monotonic()
+        registry.observe_ws_handshake("admitted", now - started)
+        self._admitted.append(now)
+        self._trim(now)
+        registry.ws_handshakes_in_progress += 1
+        try:
+            yield
+        finally:
+            registry.ws_handshakes_in_progress -= 1
+            self._semaphore.release()
+
+    def _trim(self, now: float) -> None:
+        limit = now - RATE_WINDOW_SECONDS
+        while self._admitted and self._admitted[0] < limit:
+            self._admitted.popleft()
+
+    def handshake_rate(self) -> float:
+        """Handshakes admitidos por segundo na janela recente"""
+        self._trim(monotonic())
+        return len(self._admitted) / RATE_WINDOW_SECONDS
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_progress": registry.ws_handshakes_in_progress,
+            "queued": registry.ws_handshakes_queued,
+            "queue_size": self.queue_size,
+            "handshakes_per_second": round(self.handshake_rate(), 2),
+            "outcomes": dict(registry.ws_handshakes),
+        }
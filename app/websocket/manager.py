@@ -1,12 +1,33 @@
-from typing import Dict, Set
-from jose import jwt, JWTError
-from fastapi import WebSocket
+from typing import Callable, Dict, Optional, Set, Union
+from fastapi import WebSocket, status
+from dataclasses import dataclass
+from time import time
 import logging
 import json
+from app.utils.serializable import RNCEvent
 from app.core.config import settings
+from app.core.metrics import registry
+from .admission import HandshakeAdmission, HandshakeRejected
+from .snapshot import OpenRNCSnapshot
+from .sse import SSEHub, SSESubscriber, sse_frame
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True, slots=True)
+class ConnectionInfo:
+    """Metadados de uma conexão WebSocket (um por socket)"""
+    user_id: int
+    role: str
+    connected_at: float
+
+def _message(event: str, payload: Union[RNCEvent, dict], seq: Optional[int] = None) -> str:
+    if isinstance(payload, RNCEvent):
+        payload = payload.as_dict()
+    message = {"type": event, "payload": payload}
+    if seq is not None:
+        message["seq"] = seq
+    return json.dumps(message)
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
@@ -18,85 +39,128 @@ class ConnectionManager:
             "tecnico": set()
         }
         self.user_map: Dict[int, WebSocket] = {}
-        self.ws_to_user: Dict[WebSocket, int] = {}
+        self.ws_to_user: Dict[WebSocket, ConnectionInfo] = {}
+        self.admission = HandshakeAdmission(
+            settings.WS_MAX_CONCURRENT_HANDSHAKES,
+            settings.WS_HANDSHAKE_QUEUE_SIZE,
+            settings.WS_HANDSHAKE_MAX_WAIT_SECONDS,
+            settings.WS_RECONNECT_BACKOFF_SECONDS
+        )
+        self.snapshot = OpenRNCSnapshot(settings.WS_SNAPSHOT_LIMIT, settings.WS_SNAPSHOT_MAX_AGE_SECONDS)
+        self.sse = SSEHub(settings.SSE_REPLAY_SIZE, settings.SSE_QUEUE_SIZE)
     
-    async def connect(self, websocket: WebSocket, token: str):
-
-        logger.warning(f"[DEBUG] Token recebido no WebSocket: {token}")
-        user_data = self._decode_token(token)
-        
-        if not user_data:
-            raise RuntimeError("Token inválido")
-
-        if "user_id" not in user_data or "role" not in user_data:
-            raise RuntimeError("Token não cotém campos obrigatórios (id, role)")
-        user_id = user_data["user_id"]
-        role = user_data["role"]
-
-        if role not in self.groups:
-            raise RuntimeError(f"Role inválido: {role}")
-        
-        await websocket.accept()
-
-        self.active_connections.add(websocket)
-        self.groups[role].add(websocket)
-        self.user_map[user_id] = websocket
-        self.ws_to_user[websocket] = { "user_id": user_id, "role": role }
-
-        logger.info(f"User {user_id} ({role}) conectado via WebSocket")
-        return user_data
-    
-    def _decode_token(self, token: str):
+    async def connect(self, websocket: WebSocket, authenticate: Callable[[], Optional[tuple[int, str]]]) -> ConnectionInfo:
+        """
+        Admite, autentica e registra uma conexão no grupo do papel do usuário
+
+        A autenticação (authenticate, que consome o ticket) só roda depois da admissão, para
+        que um cliente recusado na tempestade de reconexões não perca o ticket. Recusado, o
+        cliente recebe um evento "retry" com o backoff sugerido e a conexão é fechada com
+        1013 (Try Again Later); o fechamento é feito após o accept porque o navegador não
+        expõe o status HTTP de um handshake negado.
+
+        Raises:
+            HandshakeRejected: Se a admissão recusar o handshake (conexão já fechada)
+            RuntimeError: Se a autenticação falhar (conexão ainda não aceita)
+        """
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-
-            logger.debug(f"Token decodificado: user_id={payload.get('user_id')}, role={payload.get('role')}")
-            return payload
-        except JWTError as e:
-            logger.error(f"Erro ao decodificar token: {type(e).__name__}: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro inesperado ao decodificar token: {e}")
-            return None
+            async with self.admission.slot():
+                identity = authenticate()
+                if identity is None:
+                    raise RuntimeError("Ticket ausente, inválido ou expirado")
+                user_id, role = identity
+                if role not in self.groups:
+                    raise RuntimeError(f"Role inválido: {role}")
+
+                await websocket.accept()
+                if settings.WS_SNAPSHOT_ENABLED:
+                    await self.snapshot.ensure_loaded()
+
+                #Registro e snapshot sem await entre eles: todo evento fica ou no snapshot ou nos deltas
+                info = ConnectionInfo(user_id, role, time())
+                self.active_connections.add(websocket)
+                self.groups[role].add(websocket)
+                self.user_map[user_id] = websocket
+                self.ws_to_user[websocket] = info
+                registry.ws_connections = len(self.active_connections)
+                if settings.WS_SNAPSHOT_ENABLED:
+                    await websocket.send_text(self.snapshot.message(role, user_id))
+        except HandshakeRejected as e:
+            logger.warning("Handshake de WebSocket recusado (%s), backoff sugerido de %.1fs", e.reason, e.retry_after)
+            await self._send_retry(websocket, e)
+            raise
+
+        logger.info("User %s (%s) conectado via WebSocket", user_id, role)
+        return info
+
+    async def _send_retry(self, websocket: WebSocket, rejection: HandshakeRejected) -> None:
+        retry_after_ms = int(rejection.retry_after * 1000)
+        await websocket.accept()
+        await websocket.send_text(_message("retry", {"reason": rejection.reason, "retry_after_ms": retry_after_ms}))
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=f"retry_after_ms={retry_after_ms}")
     
-    async def broadcast_all(self, event: str, payload: dict):
-        message = json.dumps({"type": event, "payload": payload})
+    async def subscribe_events(self, user_id: int, role: str, events: Optional[frozenset[str]], last_event_id: Optional[str]) -> tuple[SSESubscriber, list[str]]:
+        """
+        Registra um assinante de Server-Sent Events com o mesmo roteamento dos WebSockets
+
+        Returns:
+            O assinante e os quadros iniciais: os eventos perdidos desde last_event_id ou,
+            se a retomada não for possível, o snapshot dos RNCs abertos do papel
+        """
+        if role not in self.groups:
+            raise RuntimeError(f"Role inválido: {role}")
+        if settings.WS_SNAPSHOT_ENABLED and self.sse.replay(last_event_id, events) is None:
+            await self.snapshot.ensure_loaded()
+
+        #Quadros iniciais e registro sem await entre eles, como no connect
+        frames = self.sse.replay(last_event_id, events)
+        if frames is None:
+            frames = []
+            if settings.WS_SNAPSHOT_ENABLED:
+                frames.append(sse_frame("snapshot", self.snapshot.message(role, user_id), self.sse.event_id(self.snapshot.seq)))
+        return self.sse.subscribe(user_id, role, events), frames
+
+    async def broadcast_all(self, event: str, payload: Union[RNCEvent, dict]):
+        seq = self.snapshot.apply(payload) if isinstance(payload, RNCEvent) else None
+        message = _message(event, payload, seq)
+        self.sse.publish(event, message, seq)
         disconnected = []
 
-        logger.info(f"Broadcasting '{event}' para {len(self.active_connections)}")
+        logger.info("Broadcasting '%s' para %s", event, len(self.active_connections))
 
         for ws in list(self.active_connections):
             try:
                 await ws.send_text(message)
             except Exception as e:
-                user_data = self.ws_to_user.get(ws, {})
-                user_id = user_data.get("user_id", "unknown")
-                logger.warning(f"Falha ao enviar para user {user_id}: {e}")
+                info = self.ws_to_user.get(ws)
+                user_id = info.user_id if info else "unknown"
+                logger.warning("Falha ao enviar para user %s: %s", user_id, e)
                 disconnected.append(ws)
-            for ws in disconnected:
-                self.disconnect(ws)
+        for ws in disconnected:
+            self.disconnect(ws)
     
-    async def broadcast_group(self, role: str, event: str, payload: dict):
-        message = json.dumps({"type": event, "payload": payload})
+    async def broadcast_group(self, role: str, event: str, payload: Union[RNCEvent, dict]):
+        message = _message(event, payload)
+        self.sse.publish(event, message, role=role)
         disconnected = []
 
         connections = self.groups.get(role, set())
-        logger.info(f"Broadcasting '{event}' para grupo '{role}' ({len(connections)}) conexões")
+        logger.info("Broadcasting '%s' para grupo '%s' (%s) conexões", event, role, len(connections))
 
         for ws in list(self.groups.get(role, [])):
             try:
                 await ws.send_text(message)
             except Exception as e:
-                user_data = self.ws_to_user.get(ws, {})
-                user_id = user_data.get("user_id", "unknown")
-                logger.warning(f"Falha ao enviar para user {user_id}: {e}")
+                info = self.ws_to_user.get(ws)
+                user_id = info.user_id if info else "unknown"
+                logger.warning("Falha ao enviar para user %s: %s", user_id, e)
                 disconnected.append(ws)
         for ws in disconnected:
             self.disconnect(ws)
 
     def disconnect(self, websocket: WebSocket):
-        user_data = self.ws_to_user.get(websocket, {})
-        user_id = user_data.get('user_id', 'unknown')
+        info = self.ws_to_user.get(websocket)
+        user_id = info.user_id if info else 'unknown'
 
         self.active_connections.discard(websocket)
 
@@ -107,7 +171,8 @@ class ConnectionManager:
             del self.ws_to_user[websocket]
         if user_id != 'unknown' and user_id in self.user_map:
             del self.user_map[user_id]
+        registry.ws_connections = len(self.active_connections)
 
-        logger.info(f"User {user_id} desconectado")
+        logger.info("User %s desconectado", user_id)
 
 manager = ConnectionManager()
\ No newline at end of file
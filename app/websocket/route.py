@@ -1,7 +1,17 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
-from .manager import manager
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
+from typing import Annotated, Optional
+import asyncio
 import logging
-import traceback
+
+from app.core.dependencies import get_current_user
+from app.core.security import verify_token
+from app.core.config import settings
+from app import model, schema
+from .manager import manager
+from .tickets import ticket_store
+from .admission import HandshakeRejected
 
 logger = logging.getLogger(__name__)
 
@@ -14,57 +24,133 @@ ALLOWED_ORIGINS = [
 
 router = APIRouter()
 
+@router.post('/ticket', response_model=schema.WebSocketTicketResponse, status_code=status.HTTP_201_CREATED)
+async def create_ticket(current_user: Annotated[model.User, Depends(get_current_user)]):
+    """
+    Troca o access token (Authorization: Bearer) por um ticket de uso único para o WebSocket
+
+    O cliente conecta em seguida em /ws/rncs?ticket=<ticket>; o ticket vale por
+    WS_TICKET_TTL_SECONDS e só para uma conexão.
+    """
+    ticket = ticket_store.issue(current_user.id, current_user.role)
+    return {"ticket": ticket, "expires_in": ticket_store.ttl}
+
+def _token_identity(token: str) -> Optional[tuple[int, str]]:
+    payload = verify_token(token)
+    if payload and payload.get("user_id") is not None and payload.get("role"):
+        return payload["user_id"], payload["role"]
+    return None
+
+def _authenticate(connection: HTTPConnection) -> Optional[tuple[int, str]]:
+    """Identidade da conexão pelo ticket (O(1), sem JWT) ou, se permitido, pelo token legado"""
+    ticket = connection.query_params.get("ticket")
+    if ticket:
+        entry = ticket_store.redeem(ticket)
+        return (entry.user_id, entry.role) if entry else None
+
+    token = connection.query_params.get("token")
+    if token and settings.WS_QUERY_TOKEN_ENABLED:
+        return _token_identity(token)
+    return None
+
+async def _event_stream(subscriber, frames: list[str]):
+    """Quadros iniciais e depois os da fila do assinante, com keepalive nos intervalos"""
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        for frame in frames:
+            yield frame
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                #Comentário SSE: mantém proxies abertos e faz o envio falhar se o cliente caiu
+                yield ": keepalive\n\n"
+                continue
+            if frame is None:
+                break
+            yield frame
+    finally:
+        manager.sse.unsubscribe(subscriber)
+
+@router.get('/rncs/events')
+async def sse_endpoint(
+    request: Request,
+    events: Optional[str] = Query(None, description="Tipos de evento desejados, separados por vírgula (padrão: todos)"),
+    last_event_id: Optional[str] = Query(None, description="Último id recebido, para clientes que reconectam com um novo ticket"),
+    last_event_id_header: Annotated[Optional[str], Header(alias="Last-Event-ID")] = None
+):
+    """
+    Os mesmos eventos de RNC do WebSocket /ws/rncs, via Server-Sent Events (text/event-stream)
+
+    Autenticação por ?ticket= (POST /ws/ticket), pelo cabeçalho Authorization: Bearer ou,
+    se permitido, pelo token legado em ?token=. O primeiro quadro é o snapshot dos RNCs
+    abertos do papel; os eventos de RNC levam id, e um cliente que reconecta com o
+    Last-Event-ID (cabeçalho ou ?last_event_id=) recebe só o que perdeu, ou o snapshot de
+    novo se o id não estiver mais no buffer. Como o ticket é de uso único, a reconexão
+    automática do EventSource falha com 401: o cliente deve pedir outro ticket e reconectar
+    passando ?last_event_id=.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        identity = _token_identity(token)
+    else:
+        identity = _authenticate(request)
+    if identity is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Ticket ou token inválido")
+
+    user_id, role = identity
+    wanted = frozenset(event.strip() for event in events.split(",") if event.strip()) if events else None
+    try:
+        subscriber, frames = await manager.subscribe_events(user_id, role, wanted, last_event_id_header or last_event_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    return StreamingResponse(
+        _event_stream(subscriber, frames),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.websocket('/rncs')
 async def websocket_endpoint(websocket: WebSocket):
     user_data = None
 
     try:
         origin = websocket.headers.get("origin")
-        logger.info(f"WebSocket - Origem: {origin}")
 
         if origin and origin not in ALLOWED_ORIGINS:
-            logger.warning(f"Origem não permitida: {origin}")
+            logger.warning("Origem não permitida: %s", origin)
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Origin not allowed")
             return
         
-        logger.info(f"Nova tentativa de conexão WebSocket de {websocket.client}")
-        logger.info(f"Cliente: {websocket.client}")
-        logger.info(f"Headers: {dict(websocket.headers)}")
-
-        token = websocket.query_params.get("token")
-        if not token:
-            logger.warning("WebSocket rejeitado: token ausente")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token missing")
-            return
-        
-        logger.info(f"Token recebido (primeiros 20 chars): {token[:20]}...")
-    
+        logger.debug("Nova tentativa de conexão WebSocket de %s (origem: %s)", websocket.client, origin)
+
         try:
-            user_data = await manager.connect(websocket, token=token)
-            logger.info(f"WebSocket conectado - User ID: {user_data.get('user_id')}, Role: {user_data.get('role')}")
+            user_data = await manager.connect(websocket, lambda: _authenticate(websocket))
+            logger.debug("WebSocket conectado - User ID: %s, Role: %s", user_data.user_id, user_data.role)
+        except HandshakeRejected:
+            return
         except RuntimeError as e:
-            logger.error(f"Erro de autenticação: {e}")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            logger.warning("WebSocket rejeitado: %s", e)
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid ticket")
             return
         except Exception as e:
-            logger.error(f"Erro inesperado na autenticação: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception("Erro inesperado na autenticação: %s", e)
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Auth error")
             return
 
         while True:
             try:
                 data = await websocket.receive_text()
-                logger.debug(f"Mensagem recebida do cliente {user_data.get('user_id')}: {data}")
+                logger.debug("Mensagem recebida do cliente %s: %s", user_data.user_id, data)
                 if data == "ping":
                     await websocket.send_text("pong")
             except WebSocketDisconnect:
-                logger.info(f"Cliente {user_data.get('user_id')} desconectou normalmente")
+                logger.debug("Cliente %s desconectou normalmente", user_data.user_id)
                 break
     except Exception as e:
-        logger.error(f"Erro no WebSocket: {type(e).__name__}: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Erro no WebSocket: %s: %s", type(e).__name__, e)
     finally:
         if user_data:
-            logger.info(f"Limpando conexão do user {user_data.get('user_id')}")
+            logger.debug("Limpando conexão do user %s", user_data.user_id)
         manager.disconnect(websocket)
\ No newline at end of file
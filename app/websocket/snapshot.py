@@ -0,0 +1,123 @@
+from typing import Callable, Optional
+from time import monotonic
+import asyncio
+import logging
+import json
+
+from app.core.config import settings
+from app.utils.serializable import RNCEvent
+from app import model
+
+logger = logging.getLogger(__name__)
+
+_ANALYSIS_PENDING = (model.RNCCondition.EM_ANALISE.value, model.RNCCondition.AGUARDANDO_VERIFICACAO.value)
+
+#RNCs abertos relevantes para cada papel: os mesmos das listagens que cada cliente carrega
+#(list_rncs, to_be_analyzed, to_be_reworked); o operador recebe os que ele abriu
+ROLE_FILTERS: dict[str, Optional[Callable[[RNCEvent], bool]]] = {
+    model.UserRole.ADMIN.value: None,
+    model.UserRole.QUALIDADE.value: lambda rnc: rnc.condition in _ANALYSIS_PENDING,
+    model.UserRole.ENGENHARIA.value: lambda rnc: rnc.condition in _ANALYSIS_PENDING,
+    model.UserRole.TECNICO.value: lambda rnc: rnc.condition == model.RNCCondition.AGUARDANDO_RETRABALHO.value,
+}
+
+def _load_open_rncs() -> list[RNCEvent]:
+    from sqlmodel import Session
+    from app.database import engine
+    from app.repository.rnc_repository import RNCRepository
+
+    with Session(engine) as session:
+        return [RNCEvent.from_rnc(row) for row in RNCRepository(session).open_rnc_rows()]
+
+class OpenRNCSnapshot:
+    """
+    Snapshot compartilhado dos RNCs abertos, enviado a cada WebSocket recém-conectado
+
+    É carregado do banco uma vez (e recarregado a cada max_age segundos, para corrigir
+    qualquer divergência) e mantido atual pelos próprios eventos de RNC: cada evento recebe
+    um número de sequência (seq) e atualiza ou remove o RNC. A mensagem de cada papel é
+    serializada uma vez por seq e reaproveitada por todos os clientes conectados em seguida,
+    então o custo da carga inicial não depende de quantos clientes conectam ao mesmo tempo.
+
+    O cliente aplica o snapshot e depois só os eventos com seq maior que o do snapshot.
+    """
+    def __init__(self, limit: int, max_age: float):
+        self.limit = limit
+        self.max_age = max_age
+        self.seq = 0
+        self.loads = 0
+        self._rncs: dict[int, RNCEvent] = {}
+        self._loaded_at: Optional[float] = None
+        self._loading: Optional[list[RNCEvent]] = None
+        self._messages: dict[str, tuple[int, str]] = {}
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or monotonic() - self._loaded_at > self.max_age
+
+    async def ensure_loaded(self) -> None:
+        """Carrega (ou recarrega, se velho) o snapshot; conexões simultâneas esperam uma única carga"""
+        if not self._stale():
+            return
+        async with self._lock:
+            if not self._stale():
+                return
+            #Eventos que chegarem durante a consulta são reaplicados sobre o resultado dela
+            self._loading = []
+            try:
+                rncs = await asyncio.to_thread(_load_open_rncs)
+                self._rncs = {rnc.num_rnc: rnc for rnc in rncs}
+                for rnc in self._loading:
+                    self._store(rnc)
+            finally:
+                self._loading = None
+            self._loaded_at = monotonic()
+            self._messages.clear()
+            self.loads += 1
+            logger.info("Snapshot de RNCs abertos carregado: %s RNCs (seq %s)", len(self._rncs), self.seq)
+
+    def _store(self, rnc: RNCEvent) -> None:
+        if rnc.close_rnc:
+            self._rncs.pop(rnc.num_rnc, None)
+        else:
+            self._rncs[rnc.num_rnc] = rnc
+
+    def apply(self, rnc: RNCEvent) -> int:
+        """Aplica um evento de RNC já commitado e retorna o seq atribuído a ele"""
+        self.seq += 1
+        if self._loading is not None:
+            self._loading.append(rnc)
+        self._store(rnc)
+        return self.seq
+
+    def message(self, role: str, user_id: int) -> str:
+        """Mensagem "snapshot" para o papel (e usuário, no caso do operador) no seq atual"""
+        if role == model.UserRole.OPERADOR.value:
+            return self._render(rnc for rnc in self._rncs.values() if rnc.open_by_id == user_id)
+
+        cached = self._messages.get(role)
+        if cached is not None and cached[0] == self.seq:
+            return cached[1]
+        role_filter = ROLE_FILTERS.get(role)
+        rncs = self._rncs.values() if role_filter is None else filter(role_filter, self._rncs.values())
+        message = self._render(rncs)
+        self._messages[role] = (self.seq, message)
+        return message
+
+    def _render(self, rncs) -> str:
+        items = sorted(rncs, key=lambda rnc: rnc.num_rnc)
+        payload = {
+            "items": [rnc.as_dict() for rnc in items[:self.limit]],
+            "total": len(items),
+            "truncated": len(items) > self.limit,
+        }
+        return json.dumps({"type": "snapshot", "seq": self.seq, "payload": payload})
+
+    def stats(self) -> dict:
+        return {
+            "open_rncs": len(self._rncs),
+            "seq": self.seq,
+            "loads": self.loads,
+            "age_seconds": round(monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "cached_messages": len(self._messages),
+        }
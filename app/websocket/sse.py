@@ -0,0 +1,114 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+from time import time
+import asyncio
+import secrets
+import logging
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SSESubscriber:
+    """Cliente de Server-Sent Events: identidade, eventos desejados e fila de quadros a enviar"""
+    user_id: int
+    role: str
+    events: Optional[frozenset[str]]
+    queue: asyncio.Queue
+    connected_at: float
+
+    def wants(self, event: str) -> bool:
+        return self.events is None or event in self.events
+
+def sse_frame(event: str, data: str, event_id: Optional[str] = None) -> str:
+    """Quadro no formato text/event-stream; data é JSON em uma única linha"""
+    frame = f"event: {event}\ndata: {data}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id else frame
+
+class SSEHub:
+    """
+    Assinantes de Server-Sent Events que recebem os mesmos eventos do ConnectionManager
+
+    Cada evento é formatado uma vez e colocado na fila de cada assinante; um assinante
+    lento cuja fila enche é desligado e volta pelo Last-Event-ID. Os eventos de RNC levam
+    o id "<boot>:<seq>" (seq do snapshot) e os últimos replay_size ficam guardados para a
+    retomada. O boot muda a cada processo, então um id de antes de um restart nunca é
+    confundido com um seq atual: nesse caso, ou se o id já saiu do buffer, o cliente
+    recebe o snapshot completo.
+    """
+    def __init__(self, replay_size: int, queue_size: int):
+        self.boot_id = secrets.token_hex(4)
+        self.queue_size = queue_size
+        self.subscribers: set[SSESubscriber] = set()
+        self.dropped = 0
+        #Seq do último evento de RNC publicado; o buffer precisa cobrir tudo depois do id do cliente
+        self.last_seq = 0
+        self._recent: deque[tuple[int, str, str]] = deque(maxlen=replay_size)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.boot_id}:{seq}"
+
+    def publish(self, event: str, message: str, seq: Optional[int] = None, role: Optional[str] = None) -> None:
+        """Entrega o evento aos assinantes (de todos os papéis, ou só de role)"""
+        frame = sse_frame(event, message, self.event_id(seq) if seq is not None else None)
+        if seq is not None:
+            self.last_seq = seq
+            self._recent.append((seq, event, frame))
+        for subscriber in list(self.subscribers):
+            if (role is None or subscriber.role == role) and subscriber.wants(event):
+                self._offer(subscriber, frame)
+
+    def _offer(self, subscriber: SSESubscriber, frame: str) -> None:
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            #Esvazia a fila e deixa só o sinal de fim: o stream termina e o cliente retoma pelo Last-Event-ID
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+            self.subscribers.discard(subscriber)
+            registry.sse_connections = len(self.subscribers)
+            self.dropped += 1
+            logger.warning("Assinante SSE do user %s desligado: fila cheia", subscriber.user_id)
+
+    def replay(self, last_event_id: Optional[str], events: Optional[frozenset[str]]) -> Optional[list[str]]:
+        """
+        Quadros posteriores a last_event_id
+
+        Returns:
+            Lista de quadros (vazia se não perdeu nada), ou None se a retomada não é possível
+            (sem id, id de outro processo ou eventos perdidos que já saíram do buffer, ou que
+            nunca entraram nele com SSE_REPLAY_SIZE=0) e o cliente precisa do snapshot
+        """
+        if not last_event_id:
+            return None
+        boot_id, _, seq = last_event_id.partition(":")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self.last_seq:
+            return None
+        if seq < self.last_seq and (not self._recent or self._recent[0][0] > seq + 1):
+            return None
+        return [frame for frame_seq, event, frame in self._recent if frame_seq > seq and (events is None or event in events)]
+
+    def subscribe(self, user_id: int, role: str, events: Optional[frozenset[str]]) -> SSESubscriber:
+        subscriber = SSESubscriber(user_id, role, events, asyncio.Queue(maxsize=self.queue_size), time())
+        self.subscribers.add(subscriber)
+        registry.sse_connections = len(self.subscribers)
+        logger.info("User %s (%s) assinou os eventos via SSE", user_id, role)
+        return subscriber
+
+    def unsubscribe(self, subscriber: SSESubscriber) -> None:
+        self.subscribers.discard(subscriber)
+        registry.sse_connections = len(self.subscribers)
+        logger.info("Assinante SSE do user %s desconectado", subscriber.user_id)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "replay_buffer": len(self._recent),
+            "dropped": self.dropped,
+        }
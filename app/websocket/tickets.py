@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from typing import Optional
+import secrets
+
+from app.core.config import settings
+from app.core.ttl_map import TTLMap
+
+@dataclass(frozen=True, slots=True)
+class WebSocketTicket:
+    """Identidade já validada que um ticket autoriza a conectar"""
+    user_id: int
+    role: str
+
+class TicketStore:
+    """
+    Tickets opacos de uso único para abrir o WebSocket, em um TTLMap
+
+    O ticket é emitido por uma rota HTTP autenticada (o JWT é validado uma vez, lá) e
+    trocado na conexão por um pop, sem decodificar JWT. Acima de max_size os tickets mais
+    antigos são descartados.
+
+    Os tickets vivem no processo, como o ConnectionManager: com vários workers o POST
+    /ws/ticket e o handshake precisam cair no mesmo worker (um único worker ou afinidade de
+    sessão no balanceador); caso contrário a conexão é recusada com ticket inválido.
+    """
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.issued = 0
+        self.redeemed = 0
+        self.rejected = 0
+        self._tickets: TTLMap[WebSocketTicket] = TTLMap(ttl_seconds, max_size)
+
+    def issue(self, user_id: int, role: str) -> str:
+        ticket = secrets.token_urlsafe(24)
+        self._tickets.put(ticket, WebSocketTicket(user_id, role))
+        self.issued += 1
+        return ticket
+
+    def redeem(self, ticket: str) -> Optional[WebSocketTicket]:
+        """Consome o ticket; None se não existir, já tiver sido usado ou estiver vencido"""
+        entry = self._tickets.pop(ticket)
+        if entry is None:
+            self.rejected += 1
+            return None
+        self.redeemed += 1
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._tickets),
+            "ttl_seconds": self.ttl,
+            "issued": self.issued,
+            "redeemed": self.redeemed,
+            "rejected": self.rejected,
+        }
+
+ticket_store = TicketStore(settings.WS_TICKET_TTL_SECONDS, settings.WS_TICKET_MAX_PENDING)
@@ -0,0 +1,125 @@
+"""
+Benchmark das análises estatísticas: objetos RNC no Python x colunas em arrays NumPy
+
+Compara, sobre a mesma base:
+- por objeto: carrega os RNCs pelo ORM e usa get_resolution_time_days, statistics.quantiles
+  e Counter, como o get_statistics faz hoje
+- vetorizado: RNCAnalyticsService.get_distributions (colunas em lote + NumPy)
+
+Sem --database-url cria uma base SQLite temporária com benchmarks.generate_data.
+
+Uso:
+    python -m benchmarks.analytics_benchmark --rncs 1000000
+    python -m benchmarks.analytics_benchmark --database-url postgresql://... --skip-per-object
+"""
+from collections import Counter
+from time import perf_counter
+import statistics
+import subprocess
+import tempfile
+import argparse
+import json
+import sys
+import os
+
+from benchmarks.common import ROOT, benchmark_env
+
+def _prepare_database(env: dict, rncs: int) -> None:
+    subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+    subprocess.run([sys.executable, "-m", "benchmarks.generate_data", "--rncs", str(rncs)], cwd=ROOT, env=env, check=True)
+
+def _per_object(engine, top: int) -> dict:
+    """Mesmas métricas calculadas objeto a objeto"""
+    from sqlmodel import Session, select
+    from sqlalchemy.orm import selectinload
+    from app import model
+
+    resolution, errors, parts, causes = [], [], Counter(), Counter()
+    with Session(engine) as session:
+        statement = select(model.RNC).options(selectinload(model.RNC.part)).execution_options(yield_per=10000)
+        for rnc in session.exec(statement):
+            days = rnc.get_resolution_time_days()
+            if days is not None:
+                resolution.append(days)
+            if rnc.estimated_rework_time and rnc.time_spent:
+                errors.append(abs(rnc.time_spent - rnc.estimated_rework_time))
+            parts[rnc.part.description] += 1
+            if rnc.root_cause:
+                causes[rnc.root_cause.strip().lower()] += 1
+            session.expunge(rnc)
+
+    cuts = statistics.quantiles(resolution, n=100, method="inclusive") if len(resolution) > 1 else [None] * 99
+    return {
+        "closed": len(resolution),
+        "p50": cuts[49], "p90": cuts[89], "p99": cuts[98],
+        "mean_absolute_error": statistics.fmean(errors) if errors else None,
+        "top_part": parts.most_common(1)[0] if parts else None,
+        "top_root_cause": causes.most_common(1)[0] if causes else None,
+        "pareto_parts": len(parts.most_common(top)),
+    }
+
+def _vectorized(engine, top: int) -> dict:
+    from sqlmodel import Session
+    from app import repository, service
+
+    with Session(engine) as session:
+        result = service.RNCAnalyticsService(repository.RNCRepository(session)).get_distributions(top=top)
+    return {
+        "closed": result.resolution_days.count,
+        "p50": result.resolution_days.p50, "p90": result.resolution_days.p90, "p99": result.resolution_days.p99,
+        "mean_absolute_error": result.rework_estimate_error.mean_absolute_error,
+        "top_part": (result.pareto_by_part.items[0].label, result.pareto_by_part.items[0].count) if result.pareto_by_part.items else None,
+        "top_root_cause": (result.pareto_by_root_cause.items[0].label, result.pareto_by_root_cause.items[0].count) if result.pareto_by_root_cause.items else None,
+        "pareto_parts": len(result.pareto_by_part.items),
+    }
+
+def _measure(function, engine, top: int, runs: int) -> tuple[list[float], dict]:
+    timings, result = [], None
+    for _ in range(runs):
+        started = perf_counter()
+        result = function(engine, top)
+        timings.append(perf_counter() - started)
+    return timings, result
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das análises estatísticas (por objeto x NumPy)")
+    parser.add_argument("--rncs", type=int, default=1_000_000, help="RNCs gerados na base temporária")
+    parser.add_argument("--database-url", help="Usa uma base já populada em vez de gerar uma temporária")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--skip-per-object", action="store_true", help="Mede só a versão vetorizada")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/analytics.db"
+        env = benchmark_env(database_url, LOG_LEVEL="WARNING")
+        if not args.database_url:
+            print(f"🏭 Gerando {args.rncs:,} RNCs em {database_url}...")
+            _prepare_database(env, args.rncs)
+        os.environ.update(env)
+
+        from app.database import engine
+
+        report = {"database": engine.dialect.name, "runs": args.runs}
+        timings, report["vectorized"] = _measure(_vectorized, engine, args.top, args.runs)
+        report["vectorized_seconds"] = statistics.median(timings)
+        if not args.skip_per_object:
+            timings, report["per_object"] = _measure(_per_object, engine, args.top, args.runs)
+            report["per_object_seconds"] = statistics.median(timings)
+            report["speedup"] = round(report["per_object_seconds"] / report["vectorized_seconds"], 1)
+        engine.dispose()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        return 0
+
+    print(f"\n📊 Análises estatísticas ({report['database']}, mediana de {args.runs} execuções)")
+    print(f"   vetorizado (NumPy): {report['vectorized_seconds']:.2f}s  {report['vectorized']}")
+    if "per_object" in report:
+        print(f"   por objeto (ORM):   {report['per_object_seconds']:.2f}s  {report['per_object']}")
+        print(f"   ⚡ {report['speedup']}x mais rápido")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Benchmark de carga da API de RNC e do fan-out do WebSocket
+
+Sobe o app real (uvicorn em um subprocesso, 127.0.0.1) sobre um banco SQLite temporário
+populado com usuários, peças e RNCs em todas as condições, e mede:
+
+- HTTP: consulta de peça, listagens, estatísticas, busca, abertura de RNC e transições
+  (análise -> retrabalho), com N requisições e C clientes concorrentes por cenário
+- WebSocket: abre milhares de clientes em /ws/rncs, abre RNCs e mede quanto tempo cada
+  cliente leva para receber o evento rnc_created (do envio do POST até o recebimento)
+
+Tudo roda localmente, sem rede externa. O resultado sai em JSON (stdout ou --output)
+para comparar execuções ao longo do tempo.
+
+Uso:
+    python -m benchmarks.api_benchmark --rncs 5000 --requests 500 --concurrency 20
+    python -m benchmarks.api_benchmark --ws-clients 2000 --ws-events 20 --output resultado.json
+    python -m benchmarks.api_benchmark --only ws --ws-clients 5000
+"""
+from datetime import datetime, timezone
+from time import perf_counter
+import subprocess
+import statistics
+import tempfile
+import platform
+import argparse
+import asyncio
+import socket
+import json
+import sys
+import os
+
+from benchmarks.common import ROOT, benchmark_env, seed_dataset, auth_headers, access_token, bench_email
+
+SCENARIOS = ("part_lookup", "list_rncs", "to_be_reworked", "statistics", "search", "create", "transitions", "ws")
+
+def _summary(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """Percentis em milissegundos e vazão de um cenário"""
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    ordered = sorted(latencies)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else [ordered[0]] * 99
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p90_ms": round(cuts[89] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+def _raise_file_limit() -> None:
+    """Milhares de WebSockets precisam de milhares de descritores (cliente e servidor herdam o limite)"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def _wait_ready(client, timeout: float = 30.0) -> None:
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("O servidor não ficou pronto a tempo")
+
+async def _run_http(client, requests: int, concurrency: int, make_request) -> dict:
+    """Executa `requests` chamadas com `concurrency` workers; make_request(i) devolve (método, url, kwargs)"""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            start = perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(perf_counter() - start)
+            else:
+                errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summary(latencies, errors, perf_counter() - start)
+
+def _create_payload(part: tuple) -> dict:
+    part_id, part_code = part
+    return {"part_id": part_id, "part_code": part_code, "title": f"RNC de benchmark {part_code}", "critical_level": "MEDIA", "observations": "Aberto pelo benchmark"}
+
+async def _run_transitions(client, headers: dict, parts: list, requests: int, concurrency: int) -> dict:
+    """Abre RNCs e os leva por análise e retrabalho, medindo cada transição separadamente"""
+    created: list[int] = []
+    for part in parts[:requests]:
+        response = await client.post("/api/rnc/create_rnc", json=_create_payload(part), headers=headers["operador"])
+        if response.status_code == 201:
+            created.append(response.json()["num_rnc"])
+
+    analysis = {
+        "root_cause": "Causa raiz identificada durante o benchmark de transições",
+        "corrective_action": "Refazer a operação",
+        "close_rnc": False,
+    }
+    rework = {"rework_description": "Retrabalho do benchmark", "actions_taken": "Operação refeita conforme a análise da qualidade"}
+    return {
+        "analysis": await _run_http(client, len(created), concurrency, lambda i: ("PATCH", f"/api/rnc/analysis/{created[i]}", {"json": analysis, "headers": headers["qualidade"]})),
+        "rework": await _run_http(client, len(created), concurrency, lambda i: ("PATCH", f"/api/rnc/rework/{created[i]}", {"json": rework, "headers": headers["tecnico"]})),
+    }
+
+async def _run_websocket(base_url: str, client, seed: dict, headers: dict, parts: list, clients: int, events: int, connect_concurrency: int) -> dict:
+    """Conecta `clients` WebSockets e mede a latência de entrega de `events` eventos rnc_created"""
+    import websockets
+
+    ws_url = base_url.replace("http://", "ws://") + "/ws/rncs"
+    roles = [role for role, ids in seed["users"].items() if ids]
+    received: dict[int, list[float]] = {}
+    connections = []
+    connect_errors = 0
+    semaphore = asyncio.Semaphore(connect_concurrency)
+
+    async def open_client(i: int):
+        nonlocal connect_errors
+        role = roles[i % len(roles)]
+        user_ids = seed["users"][role]
+        index = i % len(user_ids)
+        token = access_token(user_ids[index], role, bench_email(role, index))
+        async with semaphore:
+            try:
+                #Mesmo fluxo dos clientes: troca o access token por um ticket e conecta com ele
+                response = await client.post("/ws/ticket", headers={"Authorization": f"Bearer {token}"})
+                response.raise_for_status()
+                ticket = response.json()["ticket"]
+                connections.append(await websockets.connect(f"{ws_url}?ticket={ticket}", open_timeout=30, ping_interval=None, max_queue=None))
+            except Exception:
+                connect_errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(open_client(i) for i in range(clients)))
+    connect_seconds = perf_counter() - start
+
+    async def listen(ws):
+        try:
+            async for raw in ws:
+                now = perf_counter()
+                message = json.loads(raw)
+                if message.get("type") == "rnc_created":
+                    received.setdefault(message["payload"]["num_rnc"], []).append(now)
+        except Exception:
+            pass
+
+    listeners = [asyncio.create_task(listen(ws)) for ws in connections]
+    latencies: list[float] = []
+    missing = 0
+    post_latencies: list[float] = []
+    try:
+        for i in range(events):
+            sent = perf_counter()
+            response = await client.post("/api/rnc/create_rnc", json=_create_payload(parts[i]), headers=headers["operador"])
+            post_latencies.append(perf_counter() - sent)
+            if response.status_code != 201:
+                missing += len(connections)
+                continue
+            num_rnc = response.json()["num_rnc"]
+            deadline = perf_counter() + 30
+            while len(received.get(num_rnc, ())) < len(connections) and perf_counter() < deadline:
+                await asyncio.sleep(0.005)
+            arrivals = received.get(num_rnc, [])
+            latencies.extend(arrival - sent for arrival in arrivals)
+            missing += len(connections) - len(arrivals)
+    finally:
+        for ws in connections:
+            await ws.close()
+        for task in listeners:
+            task.cancel()
+
+    result = _summary(latencies, missing, 0)
+    result.pop("rps", None)
+    result["deliveries"] = result.pop("requests")
+    result["missing_deliveries"] = result.pop("errors")
+    return {
+        "clients": len(connections),
+        "connect_errors": connect_errors,
+        "connect_seconds": round(connect_seconds, 3),
+        "events": events,
+        "delivery": result,
+        "create_request": _summary(post_latencies, 0, 0),
+    }
+
+async def _run(args, env: dict, seed: dict) -> dict:
+    import httpx
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env
+    )
+    try:
+        users = seed["users"]
+        headers = {role: auth_headers(ids[0], role) for role, ids in users.items() if ids}
+        free_parts = list(seed["free_parts"])
+        n, c = args.requests, args.concurrency
+        selected = args.only or list(SCENARIOS)
+        results: dict = {}
+
+        limits = httpx.Limits(max_connections=c, max_keepalive_connections=c)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await _wait_ready(client)
+
+            def take_parts(count: int) -> list:
+                taken = free_parts[:count]
+                del free_parts[:count]
+                if len(taken) < count:
+                    raise RuntimeError("Peças livres insuficientes; aumente --parts")
+                return taken
+
+            if "part_lookup" in selected:
+                results["part_lookup"] = await _run_http(client, n, c, lambda i: ("GET", f"/api/part/code/BENCH-{i % args.parts:08d}", {"headers": headers["operador"]}))
+            if "list_rncs" in selected:
+                filters = ({}, {"condition": "em_analise"}, {"status": "fechado"})
+                results["list_rncs"] = await _run_http(client, n, c, lambda i: ("GET", "/api/rnc/list_rncs", {"headers": headers["admin"], "params": filters[i % len(filters)]}))
+            if "to_be_reworked" in selected:
+                results["to_be_reworked"] = await _run_http(client, n, c, lambda i: ("GET", "/api/rnc/list/to_be_reworked", {"headers": headers["tecnico"]}))
+            if "statistics" in selected:
+                results["statistics"] = await _run_http(client, max(1, n // 10), c, lambda i: ("GET", "/api/rnc/statistics/", {"headers": headers["admin"]}))
+            if "search" in selected:
+                terms = ("solda", "trinca", "ferramenta desgastada", "oxidação", "torque")
+                results["search"] = await _run_http(client, n, c, lambda i: ("GET", "/api/rnc/search", {"headers": headers["qualidade"], "params": {"q": terms[i % len(terms)]}}))
+            if "create" in selected:
+                parts = take_parts(n)
+                results["create"] = await _run_http(client, n, c, lambda i: ("POST", "/api/rnc/create_rnc", {"json": _create_payload(parts[i]), "headers": headers["operador"]}))
+            if "transitions" in selected:
+                results["transitions"] = await _run_transitions(client, headers, take_parts(n), n, c)
+            if "ws" in selected and args.ws_clients:
+                results["ws"] = await _run_websocket(base_url, client, seed, headers, take_parts(args.ws_events), args.ws_clients, args.ws_events, args.ws_connect_concurrency)
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API de RNC e do fan-out do WebSocket")
+    parser.add_argument("--users-per-role", type=int, default=10)
+    parser.add_argument("--parts", type=int, default=20000, help="Peças cadastradas (cada RNC usa uma; o restante fica livre para aberturas)")
+    parser.add_argument("--rncs", type=int, default=5000, help="RNCs pré-existentes, distribuídos por todas as condições")
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por cenário HTTP")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clientes HTTP concorrentes")
+    parser.add_argument("--ws-clients", type=int, default=1000, help="Clientes WebSocket conectados durante o cenário ws")
+    parser.add_argument("--ws-events", type=int, default=20, help="RNCs abertos (eventos transmitidos) no cenário ws")
+    parser.add_argument("--ws-connect-concurrency", type=int, default=200, help="Handshakes WebSocket simultâneos")
+    parser.add_argument("--only", choices=SCENARIOS, action="append", help="Roda apenas os cenários indicados")
+    parser.add_argument("--database-url", help="Banco já existente (padrão: SQLite temporário)")
+    parser.add_argument("--output", help="Arquivo onde gravar o JSON (padrão: stdout)")
+    args = parser.parse_args()
+
+    needed = args.rncs + 2 * args.requests + args.ws_events
+    if args.parts < needed:
+        parser.error(f"--parts precisa ser ao menos {needed} (rncs + peças livres para create/transitions/ws)")
+
+    _raise_file_limit()
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/api_benchmark.db"
+        env = benchmark_env(database_url, LOG_LEVEL="WARNING")
+        #O próprio driver popula o banco e gera tokens, então usa o mesmo ambiente do servidor
+        os.environ.update(env)
+        subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        from app.database import engine
+        start = perf_counter()
+        seed = seed_dataset(engine, args.users_per_role, args.parts, args.rncs)
+        seed_seconds = perf_counter() - start
+        engine.dispose()
+
+        results = asyncio.run(_run(args, env, seed))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "seed_seconds": round(seed_seconds, 3),
+        "dataset": {condition: len(nums) for condition, nums in seed["rncs_by_condition"].items()},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Utilitários compartilhados pelos benchmarks (ambiente isolado e dados mínimos)"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import os
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def benchmark_env(database_url: str, **overrides: str) -> dict:
+    """
+    Monta o ambiente de um processo de benchmark
+
+    Usa chaves fixas quando não definidas, para rodar sem .env e sem rede.
+    """
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark_secret_key_com_32_caracteres_ou_mais")
+    env.setdefault("REFRESH_SECRET_KEY", "benchmark_refresh_key_com_32_caracteres_ou_mais")
+    env["DATABASE_URL"] = database_url
+    env["ENVIRONMENT"] = "production"
+    env["AUTO_MIGRATE"] = "false"
+    #O benchmark mede o servidor saturado: sem rate limit nem descarte de carga
+    env["RATE_LIMIT_ENABLED"] = "false"
+    env["LOAD_SHED_LOOP_LAG_MS"] = "0"
+    env["LOAD_SHED_POOL_WAIT_MS"] = "0"
+    env.update(overrides)
+    return env
+
+def seed_minimal(engine, rncs: int = 20) -> dict:
+    """
+    Cria um usuário de cada papel, uma peça por RNC e RNCs abertos em análise
+
+    Returns:
+        Mapa papel -> id do usuário
+    """
+    from sqlmodel import Session
+    from app import model
+
+    now = datetime.now(timezone.utc)
+    users = {}
+    with Session(engine) as session:
+        for role in model.UserRole:
+            user = model.User(name=f"bench {role.value}", email=f"{role.value}@bench.example.com", role=role.value, password_hash="!")
+            session.add(user)
+            session.flush()
+            users[role.value] = user.id
+        for i in range(rncs):
+            part = model.Part(part_code=f"BENCH-{i:06d}", description="Peça de benchmark")
+            session.add(part)
+            session.flush()
+            session.add(model.RNC(
+                num_rnc=i + 1,
+                title=f"RNC de benchmark {i}",
+                status=model.RNCStatus.ABERTO.value,
+                condition=model.RNCCondition.EM_ANALISE.value,
+                critical_level=model.RNCCriticalLevel.MEDIA.value,
+                part_id=part.id,
+                part_code=part.part_code,
+                date_of_occurrence=now - timedelta(minutes=i),
+                open_by_id=users[model.UserRole.OPERADOR.value]
+            ))
+        session.commit()
+    return users
+
+def bench_email(role: str, index: int = 0) -> str:
+    """E-mail do usuário de benchmark: o primeiro de cada papel é {papel}@bench.example.com"""
+    return f"{role}@bench.example.com" if index == 0 else f"{role}{index}@bench.example.com"
+
+def access_token(user_id: int, role: str, email: str = None) -> str:
+    """Gera um access token direto, sem passar pelo bcrypt do /login"""
+    from app.core.security import create_access_token
+
+    return create_access_token({"sub": email or bench_email(role), "role": role, "user_id": user_id})
+
+def auth_headers(user_id: int, role: str, email: str = None) -> dict:
+    return {"Authorization": f"Bearer {access_token(user_id, role, email)}"}
+
+#Textos usados nos campos livres dos RNCs sintéticos
+_DEFECTS = ("trinca na solda", "rebarba excessiva", "falha de pintura", "oxidação superficial", "folga na montagem", "medida fora da tolerância", "porosidade no fundido", "torque abaixo do especificado")
+_CAUSES = ("temperatura incorreta no processo de soldagem", "ferramenta de corte desgastada", "dispositivo de fixação desalinhado", "lote de matéria-prima fora de especificação", "instrução de trabalho desatualizada")
+_ACTIONS = ("refazer a operação com parâmetros corretos", "substituir a ferramenta e reinspecionar o lote", "recalibrar o dispositivo", "segregar o lote e acionar o fornecedor")
+
+def _rnc_row(i: int, condition, part_id: int, part_code: str, users: dict, now: datetime) -> dict:
+    """Monta um RNC coerente com a condição: campos de análise, retrabalho e fechamento preenchidos conforme o fluxo"""
+    from app import model
+
+    C = model.RNCCondition
+    occurred = now - timedelta(hours=i % 8760, minutes=i % 60)
+    row = {
+        "num_rnc": i + 1,
+        "title": f"{_DEFECTS[i % len(_DEFECTS)].capitalize()} na peça {part_code}",
+        "status": model.RNCStatus.ABERTO.value,
+        "condition": condition.value,
+        "critical_level": ("BAIXA", "MEDIA", "ALTA", "CRITICA")[i % 4],
+        "observations": f"Detectado na inspeção do turno {i % 3 + 1}: {_DEFECTS[(i * 7) % len(_DEFECTS)]}",
+        "part_id": part_id,
+        "part_code": part_code,
+        "date_of_occurrence": occurred,
+        "open_by_id": users["operador"][i % len(users["operador"])],
+    }
+    if condition != C.EM_ANALISE:
+        row.update(
+            root_cause=_CAUSES[i % len(_CAUSES)],
+            corrective_action=_ACTIONS[i % len(_ACTIONS)],
+            analysis_user_id=users["qualidade"][i % len(users["qualidade"])],
+            analysis_date=occurred + timedelta(hours=4),
+        )
+    if condition in (C.AGUARDANDO_VERIFICACAO, C.CONCLUIDO):
+        row.update(
+            rework_description="Retrabalho conforme análise da qualidade",
+            actions_taken=_ACTIONS[(i + 1) % len(_ACTIONS)],
+            time_spent=15 + i % 120,
+            rework_user_id=users["tecnico"][i % len(users["tecnico"])],
+            rework_date=occurred + timedelta(hours=20),
+        )
+    if condition in (C.APROVADO, C.REFUGO, C.CONCLUIDO):
+        row.update(
+            status=model.RNCStatus.FECHADO.value,
+            closed_by_id=row["analysis_user_id"],
+            closing_date=occurred + timedelta(days=1 + i % 10),
+        )
+    return row
+
+def seed_dataset(engine, users_per_role: int = 10, parts: int = 2000, rncs: int = 1000, batch_size: int = 1000) -> dict:
+    """
+    Popula o banco com usuários de todos os papéis, peças e RNCs em todas as condições
+
+    Cada RNC usa uma peça própria (part_code é único em rnc); as peças restantes ficam
+    livres para abertura de novos RNCs durante o benchmark. Insere em lotes via Core.
+
+    Returns:
+        {"users": {papel: [ids]}, "free_parts": [(id, código)], "rncs_by_condition": {condição: [num_rnc]}}
+    """
+    from sqlalchemy import insert, select
+    from sqlmodel import Session
+    from app import model
+
+    if parts < rncs:
+        raise ValueError("É preciso ao menos uma peça por RNC")
+
+    now = datetime.now(timezone.utc)
+    conditions = list(model.RNCCondition)
+    with Session(engine) as session:
+        session.execute(insert(model.User), [
+            {"name": f"bench {role.value} {i}", "email": bench_email(role.value, i), "role": role.value, "password_hash": "!", "active": True}
+            for role in model.UserRole for i in range(users_per_role)
+        ])
+        users: dict[str, list[int]] = {role.value: [] for role in model.UserRole}
+        for user_id, role in session.execute(select(model.User.id, model.User.role).where(model.User.email.like("%@bench.example.com")).order_by(model.User.id)):
+            users[role].append(user_id)
+
+        for start in range(0, parts, batch_size):
+            session.execute(insert(model.Part), [
+                {"part_code": f"BENCH-{i:08d}", "description": f"Peça de benchmark {i}", "active": True}
+                for i in range(start, min(start + batch_size, parts))
+            ])
+        part_rows = session.execute(select(model.Part.id, model.Part.part_code).where(model.Part.part_code.like("BENCH-%")).order_by(model.Part.id)).all()
+
+        rncs_by_condition: dict[str, list[int]] = {condition.value: [] for condition in conditions}
+        for start in range(0, rncs, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, rncs)):
+                condition = conditions[i % len(conditions)]
+                part_id, part_code = part_rows[i]
+                rows.append(_rnc_row(i, condition, part_id, part_code, users, now))
+                rncs_by_condition[condition.value].append(i + 1)
+            session.execute(insert(model.RNC), rows)
+        session.commit()
+
+    return {"users": users, "free_parts": [tuple(row) for row in part_rows[rncs:]], "rncs_by_condition": rncs_by_condition}
@@ -0,0 +1,351 @@
+"""
+Gerador de massa de dados sintética para testes de desempenho
+
+Carrega usuários, peças e milhões de RNCs com distribuições próximas às de produção:
+
+- Famílias de peças com popularidade Zipf (poucas famílias concentram a maioria dos RNCs).
+  Como part_code é único em rnc, cada RNC recebe sua própria peça ({família}-{série}),
+  e a assimetria aparece no prefixo do código, na descrição e no cliente.
+- Ocorrências concentradas em dias úteis e no horário de turno, ao longo de --days dias.
+- Ciclo de vida coerente: date_of_occurrence < analysis_date < rework_date < closing_date,
+  com durações log-normais; RNCs antigos tendem a estar fechados e os recentes em aberto.
+- Chaves estrangeiras coerentes com o papel: abertura por operador, análise e fechamento
+  por qualidade/engenharia, retrabalho por técnico, e responsável atual conforme a condição.
+  A atividade por usuário também é assimétrica.
+
+A inserção é em lotes: COPY no PostgreSQL e executemany em transações grandes no SQLite.
+No SQLite os triggers da busca textual são removidos durante a carga e o índice FTS5 é
+reconstruído uma única vez no final.
+
+Uso:
+    python -m benchmarks.generate_data --rncs 5000000                   #usa DATABASE_URL
+    python -m benchmarks.generate_data --rncs 200000 --database-url sqlite:///./dev.db --password senha123
+"""
+from datetime import datetime, timedelta
+from itertools import accumulate
+from time import perf_counter
+import argparse
+import random
+import math
+import csv
+import io
+import sys
+
+CRITICAL_LEVELS = ("BAIXA", "MEDIA", "ALTA", "CRITICA")
+CRITICAL_WEIGHTS = (35, 40, 20, 5)
+CLIENTS = ("Metalúrgica Atlas", "Auto Peças Sul", "Indústria Vega", "Grupo Horizonte", "Máquinas Orion", "Fundição Serra", "Agro Forte", "Naval Delta")
+DEFECTS = (
+    "trinca na solda", "rebarba excessiva", "falha de pintura", "oxidação superficial", "folga na montagem",
+    "medida fora da tolerância", "porosidade no fundido", "torque abaixo do especificado", "risco na superfície usinada",
+    "empenamento após tratamento térmico", "furo deslocado", "vazamento no teste de estanqueidade",
+)
+CAUSES = (
+    "temperatura incorreta no processo de soldagem", "ferramenta de corte desgastada", "dispositivo de fixação desalinhado",
+    "lote de matéria-prima fora de especificação", "instrução de trabalho desatualizada", "parâmetro de máquina alterado sem registro",
+    "falha de manuseio na movimentação interna", "calibração do instrumento vencida",
+)
+ACTIONS = (
+    "refazer a operação com os parâmetros corretos", "substituir a ferramenta e reinspecionar o lote", "recalibrar o dispositivo de fixação",
+    "segregar o lote e acionar o fornecedor", "atualizar a instrução de trabalho e treinar o turno", "retrabalhar por esmerilhamento e nova pintura",
+)
+MATERIALS = ("solda MIG ER70S-6", "tinta epóxi", "lixa grana 120", "parafusos M8 classe 8.8", "vedante anaeróbico", None)
+
+RNC_COLUMNS = (
+    "num_rnc", "title", "status", "condition", "critical_level", "observations", "part_id", "part_code",
+    "date_of_occurrence", "analysis_date", "rework_date", "closing_date", "closing_notes",
+    "root_cause", "corrective_action", "preventive_action", "analysis_observations", "estimated_rework_time",
+    "requires_external_support", "quality_verified", "close_rnc", "refused",
+    "rework_description", "actions_taken", "materials_used", "time_spent", "rework_observations",
+    "open_by_id", "analysis_user_id", "rework_user_id", "current_responsible_id", "closed_by_id",
+)
+PART_COLUMNS = ("id", "part_code", "description", "client", "active")
+USER_COLUMNS = ("name", "email", "password_hash", "role", "active")
+
+#Durações (horas) log-normais: mediana e dispersão de cada etapa do fluxo
+ANALYSIS_DELAY = (6.0, 0.9)
+REWORK_DELAY = (26.0, 0.8)
+VERIFICATION_DELAY = (5.0, 0.9)
+#Idade (dias) a partir da qual metade dos RNCs já está fechada
+HALF_CLOSED_AGE_DAYS = 12.0
+
+def _zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+class DataGenerator:
+    """Gera as linhas de peças e RNCs; todo o sorteio usa um random.Random com semente fixa"""
+    def __init__(self, users: dict[str, list[int]], families: int, days: int, seed: int, now: datetime):
+        self.rng = random.Random(seed)
+        self.now = now
+        self.days = days
+        self.families = [f"{chr(65 + i % 26)}{chr(65 + (i // 26) % 26)}{i:04d}" for i in range(families)]
+        self.family_cum = list(accumulate(_zipf_weights(families, 1.1)))
+        self.family_client = {family: CLIENTS[i % len(CLIENTS)] for i, family in enumerate(self.families)}
+        self.family_serial = dict.fromkeys(self.families, 0)
+        self.critical_cum = list(accumulate(CRITICAL_WEIGHTS))
+        #Usuários: alguns muito mais ativos que outros (Zipf), sempre respeitando o papel
+        self.pools = {}
+        for name, roles in {"open": ("operador",), "analysis": ("qualidade", "engenharia"), "rework": ("tecnico",)}.items():
+            ids = [user_id for role in roles for user_id in users.get(role, [])]
+            if not ids:
+                raise ValueError(f"Nenhum usuário com papel {'/'.join(roles)}")
+            self.rng.shuffle(ids)
+            self.pools[name] = (ids, list(accumulate(_zipf_weights(len(ids), 0.8))))
+
+    def _pick_user(self, pool: str) -> int:
+        ids, cum = self.pools[pool]
+        return self.rng.choices(ids, cum_weights=cum)[0]
+
+    def _occurrence(self) -> datetime:
+        """Dia útil com 85% de chance, dentro do horário dos três turnos, mais recente é mais provável"""
+        age_days = min(self.days - 1, int(self.rng.expovariate(3.0 / self.days)))
+        day = self.now - timedelta(days=age_days)
+        if day.weekday() >= 5 and self.rng.random() < 0.85:
+            day -= timedelta(days=day.weekday() - 4)
+        minute = int(self.rng.triangular(6 * 60, 23 * 60, 14 * 60))
+        return day.replace(hour=minute // 60, minute=minute % 60, second=self.rng.randrange(60), microsecond=0)
+
+    def _delay(self, params: tuple[float, float]) -> timedelta:
+        median, sigma = params
+        return timedelta(hours=max(0.05, self.rng.lognormvariate(math.log(median), sigma)))
+
+    def _final_state(self, age_days: float) -> str:
+        rng = self.rng
+        if rng.random() < age_days / (age_days + HALF_CLOSED_AGE_DAYS):
+            return rng.choices(("aprovado", "concluido", "refugo"), weights=(60, 25, 15))[0]
+        return rng.choices(("em_analise", "aguardando_retrabalho", "aguardando_verificacao"), weights=(45, 35, 20))[0]
+
+    def part(self, part_id: int) -> tuple:
+        family = self.rng.choices(self.families, cum_weights=self.family_cum)[0]
+        self.family_serial[family] += 1
+        code = f"{family}-{self.family_serial[family]:07d}"
+        return (part_id, code, f"Componente da linha {family}", self.family_client[family], True)
+
+    def rnc(self, num_rnc: int, part: tuple) -> tuple:
+        rng = self.rng
+        part_id, part_code = part[0], part[1]
+        occurred = self._occurrence()
+        condition = self._final_state((self.now - occurred).total_seconds() / 86400)
+        defect = rng.choice(DEFECTS)
+        open_by = self._pick_user("open")
+
+        analysis_date = rework_date = closing_date = None
+        root_cause = corrective_action = preventive_action = analysis_observations = None
+        estimated = None
+        rework_description = actions_taken = materials = rework_observations = closing_notes = None
+        time_spent = None
+        analysis_user = rework_user = closed_by = responsible = None
+        quality_verified = None
+        refused = close_rnc = False
+        status = "aberto"
+
+        if condition != "em_analise":
+            analysis_date = occurred + self._delay(ANALYSIS_DELAY)
+            analysis_user = self._pick_user("analysis")
+            root_cause = rng.choice(CAUSES)
+            corrective_action = rng.choice(ACTIONS)
+            preventive_action = rng.choice(ACTIONS) if rng.random() < 0.6 else None
+            analysis_observations = f"Verificar outras peças da linha {part_code.split('-')[0]}" if rng.random() < 0.3 else None
+            estimated = rng.choice((15, 30, 45, 60, 90, 120, 240))
+        if condition in ("aguardando_verificacao", "aprovado", "concluido"):
+            rework_date = analysis_date + self._delay(REWORK_DELAY)
+            rework_user = self._pick_user("rework")
+            rework_description = f"Retrabalho de {defect} conforme análise da qualidade"
+            actions_taken = corrective_action.capitalize()
+            materials = rng.choice(MATERIALS)
+            time_spent = max(5, int(rng.gauss(estimated, estimated * 0.3)))
+            rework_observations = "Peça testada após o retrabalho" if rng.random() < 0.5 else None
+        if condition in ("aprovado", "concluido", "refugo"):
+            status = "fechado"
+            closed_by = analysis_user
+            close_rnc = True
+            if condition == "refugo":
+                refused = True
+                closing_date = analysis_date
+            else:
+                closing_date = rework_date + self._delay(VERIFICATION_DELAY)
+                quality_verified = True
+            if condition == "concluido":
+                closing_notes = "RNC encerrado manualmente após verificação do retrabalho"
+        #Etapas sorteadas "no futuro" viram um RNC recente ainda em análise
+        if max(filter(None, (analysis_date, rework_date, closing_date)), default=occurred) > self.now:
+            return self._recent_open_rnc(num_rnc, part, occurred, defect, open_by)
+        if condition in ("em_analise", "aguardando_verificacao"):
+            responsible = analysis_user or self._pick_user("analysis")
+        elif condition == "aguardando_retrabalho":
+            responsible = self._pick_user("rework")
+
+        return (
+            num_rnc, f"{defect.capitalize()} em {part_code}", status, condition,
+            rng.choices(CRITICAL_LEVELS, cum_weights=self.critical_cum)[0],
+            f"Detectado na inspeção do turno {rng.randint(1, 3)}: {defect}", part_id, part_code,
+            occurred, analysis_date, rework_date, closing_date, closing_notes,
+            root_cause, corrective_action, preventive_action, analysis_observations, estimated,
+            rng.random() < 0.05, quality_verified, close_rnc, refused,
+            rework_description, actions_taken, materials, time_spent, rework_observations,
+            open_by, analysis_user, rework_user, responsible, closed_by,
+        )
+
+    def _recent_open_rnc(self, num_rnc: int, part: tuple, occurred: datetime, defect: str, open_by: int) -> tuple:
+        """RNC recente ainda em análise (usado quando o sorteio passaria de 'agora')"""
+        analyst = self._pick_user("analysis")
+        return (
+            num_rnc, f"{defect.capitalize()} em {part[1]}", "aberto", "em_analise",
+            self.rng.choices(CRITICAL_LEVELS, cum_weights=self.critical_cum)[0],
+            f"Detectado na inspeção: {defect}", part[0], part[1],
+            occurred, None, None, None, None,
+            None, None, None, None, None,
+            False, None, False, False,
+            None, None, None, None, None,
+            open_by, None, None, analyst, None,
+        )
+
+def _format_value(value, dialect: str):
+    if isinstance(value, datetime) and dialect == "sqlite":
+        #Mesmo formato gravado pelo tipo DateTime do SQLAlchemy no SQLite
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+def _insert_batch(raw_connection, dialect: str, table: str, columns: tuple, rows: list[tuple]) -> None:
+    cursor = raw_connection.cursor()
+    try:
+        if dialect == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(["\\N" if value is None else value for value in row])
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buffer)
+        else:
+            placeholders = ", ".join("?" * len(columns))
+            cursor.executemany(
+                f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})',
+                [tuple(_format_value(value, dialect) for value in row) for row in rows]
+            )
+    finally:
+        cursor.close()
+
+def _create_users(engine, per_role: dict[str, int], password_hash: str) -> dict[str, list[int]]:
+    from sqlalchemy import insert, select
+    from sqlmodel import Session
+    from app import model
+
+    with Session(engine) as session:
+        existing = set(session.execute(select(model.User.email).where(model.User.email.like("%@synthetic.example.com"))).scalars())
+        rows = [
+            {"name": f"{role} sintético {i}", "email": f"{role}{i}@synthetic.example.com", "password_hash": password_hash, "role": role, "active": True}
+            for role, count in per_role.items() for i in range(count)
+            if f"{role}{i}@synthetic.example.com" not in existing
+        ]
+        if rows:
+            session.execute(insert(model.User), rows)
+        users = {role: [] for role in per_role}
+        for user_id, role in session.execute(select(model.User.id, model.User.role).where(model.User.email.like("%@synthetic.example.com"))):
+            users.setdefault(role, []).append(user_id)
+        session.commit()
+    return users
+
+def _drop_sqlite_fts_triggers(raw_connection) -> None:
+    """Evita atualizar o FTS5 linha a linha; a migração 3 recria os triggers e reconstrói o índice no final"""
+    cursor = raw_connection.cursor()
+    try:
+        for trigger in ("rnc_fts_ai", "rnc_fts_ad", "rnc_fts_au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    finally:
+        cursor.close()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Gera RNCs sintéticos em massa para testes de desempenho")
+    parser.add_argument("--rncs", type=int, required=True, help="Quantidade de RNCs (e de peças) a gerar")
+    parser.add_argument("--database-url", help="Banco de destino (padrão: DATABASE_URL do .env)")
+    parser.add_argument("--operadores", type=int, default=200)
+    parser.add_argument("--qualidade", type=int, default=30)
+    parser.add_argument("--engenharia", type=int, default=15)
+    parser.add_argument("--tecnicos", type=int, default=80)
+    parser.add_argument("--families", type=int, default=400, help="Famílias de peças (popularidade Zipf)")
+    parser.add_argument("--days", type=int, default=730, help="Janela de datas de ocorrência, em dias até hoje")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", help="Senha dos usuários sintéticos (sem ela eles não conseguem fazer login)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        import os
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func, select, text
+    from sqlmodel import Session
+    from app.database import engine
+    from app.migrations import check_schema_version
+    from app.repository.rollup_repository import rebuild_rollups
+    from app import model
+
+    check_schema_version(engine)
+    dialect = engine.dialect.name
+
+    password_hash = "!"
+    if args.password:
+        user = model.User(name="", email="", role="", password_hash="")
+        user.set_password(args.password)
+        password_hash = user.password_hash
+
+    started = perf_counter()
+    users = _create_users(engine, {
+        "operador": args.operadores, "qualidade": args.qualidade, "engenharia": args.engenharia, "tecnico": args.tecnicos,
+    }, password_hash)
+    print(f"👥 Usuários sintéticos: {sum(len(ids) for ids in users.values())}")
+
+    with Session(engine) as session:
+        next_part_id = (session.scalar(select(func.max(model.Part.id))) or 0) + 1
+        next_num = (session.scalar(select(func.max(model.RNC.num_rnc))) or 0) + 1
+
+    generator = DataGenerator(users, args.families, args.days, args.seed, datetime.utcnow().replace(microsecond=0))
+    raw_connection = engine.raw_connection()
+    try:
+        if dialect == "sqlite":
+            cursor = raw_connection.cursor()
+            cursor.execute("PRAGMA synchronous = OFF")
+            cursor.close()
+            _drop_sqlite_fts_triggers(raw_connection)
+
+        loaded = 0
+        while loaded < args.rncs:
+            size = min(args.batch_size, args.rncs - loaded)
+            parts = [generator.part(next_part_id + loaded + i) for i in range(size)]
+            rncs = [generator.rnc(next_num + loaded + i, part) for i, part in enumerate(parts)]
+            _insert_batch(raw_connection, dialect, "part", PART_COLUMNS, parts)
+            _insert_batch(raw_connection, dialect, "rnc", RNC_COLUMNS, rncs)
+            raw_connection.commit()
+            loaded += size
+            elapsed = perf_counter() - started
+            print(f"   📥 {loaded:,}/{args.rncs:,} RNCs ({loaded / elapsed:,.0f}/s)", flush=True)
+
+        if dialect == "postgresql":
+            cursor = raw_connection.cursor()
+            cursor.execute("SELECT setval(pg_get_serial_sequence('part', 'id'), (SELECT max(id) FROM part))")
+            cursor.close()
+            raw_connection.commit()
+    finally:
+        raw_connection.close()
+
+    if dialect == "sqlite":
+        from app.migrations.versions import v0003_rnc_full_text_search
+
+        print("🔎 Reconstruindo o índice de busca textual...")
+        with engine.connect() as connection:
+            if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'rnc_fts'")).first():
+                v0003_rnc_full_text_search.upgrade(connection)
+                connection.commit()
+
+    print("📈 Recalculando os agregados diários (rnc_rollup)...")
+    with engine.begin() as connection:
+        rebuild_rollups(connection)
+
+    print("📊 Atualizando estatísticas do planejador...")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+    print(f"✅ {args.rncs:,} RNCs gerados em {perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
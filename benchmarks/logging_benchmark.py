@@ -0,0 +1,88 @@
+"""
+Benchmark de vazão de requisições com o logging ligado e desligado
+
+Cada configuração roda em um processo próprio (o logging é configurado no import
+de `server`), com um banco SQLite temporário e os logs indo para um pipe, como em
+um container. Mede requisições/s em /api/rnc/list_rncs e /api/part/code/{code}.
+
+Uso:
+    python -m benchmarks.logging_benchmark --requests 2000
+"""
+import subprocess
+import tempfile
+import argparse
+import json
+import sys
+
+from benchmarks.common import ROOT, benchmark_env
+
+CONFIGURATIONS = {
+    "off": {"LOG_LEVEL": "CRITICAL"},
+    "info": {"LOG_LEVEL": "INFO"},
+    "info_json": {"LOG_LEVEL": "INFO", "LOG_JSON": "true"},
+    "debug": {"LOG_LEVEL": "DEBUG"},
+    "debug_sampled": {"LOG_LEVEL": "DEBUG", "LOG_DEBUG_SAMPLE_RATE": "0.01"},
+    "debug_sql": {"LOG_LEVEL": "DEBUG", "LOG_SQL": "true"},
+}
+
+def _child(requests: int) -> None:
+    from fastapi.testclient import TestClient
+    from time import perf_counter
+
+    import server
+    from app.database import engine
+    from app.migrations import apply_migrations
+    from benchmarks.common import seed_minimal, auth_headers
+
+    apply_migrations(engine)
+    users = seed_minimal(engine)
+    admin = auth_headers(users["admin"], "admin")
+    operador = auth_headers(users["operador"], "operador")
+
+    with TestClient(server.app) as client:
+        for _ in range(50):
+            client.get("/api/rnc/list_rncs", headers=admin)
+
+        start = perf_counter()
+        for i in range(requests):
+            if i % 2:
+                client.get("/api/rnc/list_rncs", headers=admin)
+            else:
+                client.get("/api/part/code/BENCH-000001", headers=operador)
+        elapsed = perf_counter() - start
+
+    print("RESULT " + json.dumps({"requests": requests, "seconds": round(elapsed, 4), "rps": round(requests / elapsed, 1)}), flush=True)
+
+def _run_configuration(name: str, overrides: dict, requests: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = benchmark_env(f"sqlite:///{tmp}/logging.db", **overrides)
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.logging_benchmark", "--child", "--requests", str(requests)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        )
+    for line in completed.stdout.splitlines():
+        if line.startswith("RESULT "):
+            result = json.loads(line[len("RESULT "):])
+            result["configuration"] = name
+            result["log_bytes"] = len(completed.stdout)
+            return result
+    raise RuntimeError(f"Configuração '{name}' não produziu resultado:\n{completed.stderr[-2000:]}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vazão de requisições com diferentes configurações de logging")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--only", choices=sorted(CONFIGURATIONS), action="append", help="Roda apenas as configurações indicadas")
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.requests)
+        return 0
+
+    names = args.only or list(CONFIGURATIONS)
+    results = [_run_configuration(name, CONFIGURATIONS[name], args.requests) for name in names]
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
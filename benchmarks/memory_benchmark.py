@@ -0,0 +1,126 @@
+"""
+Benchmark de memória dos metadados de conexão e dos payloads de evento do WebSocket
+
+Mede com tracemalloc a memória retida por:
+- N conexões: dict {"user_id", "role"} (formato antigo) x ConnectionInfo
+- M eventos: dict montado a partir do RNC (formato antigo) x RNCEvent
+- RNCs hidratados pelo ORM x RNCEvent, para dimensionar o custo do estado de instrumentação
+
+Não precisa de banco: os RNCs são montados em memória como se tivessem sido lidos.
+
+Uso:
+    python -m benchmarks.memory_benchmark --connections 10000 --events 100000
+"""
+from datetime import datetime, timedelta, timezone
+from time import perf_counter, time
+import tracemalloc
+import argparse
+import json
+import sys
+import os
+
+from benchmarks.common import benchmark_env
+
+def _legacy_serialize(rnc) -> dict:
+    """serialize_rnc antes dos payloads imutáveis (referência para a comparação)"""
+    return {
+        "id": rnc.id,
+        "num_rnc": rnc.num_rnc,
+        "title": rnc.title,
+        "status": rnc.status,
+        "condition": rnc.condition,
+        "part_code": rnc.part_code,
+        "observations": rnc.observations,
+        "critical_level": rnc.critical_level,
+        "part_id": rnc.part_id,
+        "open_by_id": rnc.open_by_id,
+        "closed_by_id": rnc.closed_by_id,
+        "date_of_occurrence": rnc.date_of_occurrence.isoformat() if rnc.date_of_occurrence else None,
+        "closing_date": rnc.closing_date.isoformat() if rnc.closing_date else None,
+        "close_rnc": rnc.is_closed()
+    }
+
+def _retained(build) -> tuple[int, float, object]:
+    """Bytes retidos pelo resultado de build() e o tempo para montá-lo"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = perf_counter()
+    result = build()
+    elapsed = perf_counter() - started
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return retained, elapsed, result
+
+def _sample_rncs(count: int) -> list:
+    from sqlalchemy.orm import make_transient_to_detached
+    from app import model
+
+    now = datetime.now(timezone.utc)
+    rncs = []
+    for i in range(count):
+        rnc = model.RNC(
+            id=i + 1, num_rnc=i + 1, title=f"Trinca na solda da peça {i}", status="fechado" if i % 3 else "aberto",
+            condition="aprovado" if i % 3 else "em_analise", critical_level="MEDIA", observations="Detectado na inspeção do turno 2",
+            part_id=i + 1, part_code=f"AA0000-{i:07d}", open_by_id=1, closed_by_id=2 if i % 3 else None,
+            date_of_occurrence=now - timedelta(days=2), closing_date=now if i % 3 else None,
+            root_cause="ferramenta de corte desgastada", corrective_action="substituir a ferramenta",
+        )
+        make_transient_to_detached(rnc)    #como uma linha lida do banco e desanexada da sessão
+        rncs.append(rnc)
+    return rncs
+
+def _row(name: str, items: int, legacy: tuple, current: tuple) -> dict:
+    return {
+        "scenario": name,
+        "items": items,
+        "legacy_bytes_per_item": round(legacy[0] / items, 1),
+        "current_bytes_per_item": round(current[0] / items, 1),
+        "legacy_total_mb": round(legacy[0] / 1e6, 2),
+        "current_total_mb": round(current[0] / 1e6, 2),
+        "reduction": round(1 - current[0] / legacy[0], 3) if legacy[0] else None,
+        "legacy_build_seconds": round(legacy[1], 3),
+        "current_build_seconds": round(current[1], 3),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de memória de conexões e eventos do WebSocket")
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--distinct-rncs", type=int, default=1_000, help="RNCs distintos que geram os eventos")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    os.environ.update(benchmark_env(os.environ.get("DATABASE_URL", "sqlite://"), LOG_LEVEL="WARNING"))
+    from app.websocket.manager import ConnectionInfo
+    from app.utils.serializable import RNCEvent
+
+    roles = ("admin", "qualidade", "engenharia", "operador", "tecnico")
+    sockets = [object() for _ in range(args.connections)]
+    legacy = _retained(lambda: {ws: {"user_id": i, "role": roles[i % 5]} for i, ws in enumerate(sockets)})
+    current = _retained(lambda: {ws: ConnectionInfo(i, roles[i % 5], time()) for i, ws in enumerate(sockets)})
+    report = [_row("conexões (metadados)", args.connections, legacy, current)]
+    del legacy, current
+
+    rncs = _sample_rncs(args.distinct_rncs)
+    legacy = _retained(lambda: [_legacy_serialize(rncs[i % len(rncs)]) for i in range(args.events)])
+    current = _retained(lambda: [RNCEvent.from_rnc(rncs[i % len(rncs)]) for i in range(args.events)])
+    report.append(_row("eventos (payload)", args.events, legacy, current))
+    del legacy, current, rncs
+
+    hydrated = _retained(lambda: _sample_rncs(args.distinct_rncs))
+    events = _retained(lambda: [RNCEvent.from_rnc(rnc) for rnc in hydrated[2]])
+    report.append(_row("RNC do ORM x evento", args.distinct_rncs, hydrated[:2], events[:2]))
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print("\n🧠 Memória retida (tracemalloc)")
+    print(f"   {'cenário':<24}{'itens':>9}{'antes B/item':>15}{'agora B/item':>15}{'redução':>10}")
+    for row in report:
+        print(f"   {row['scenario']:<24}{row['items']:>9,}{row['legacy_bytes_per_item']:>15,.1f}{row['current_bytes_per_item']:>15,.1f}{row['reduction']:>10.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Benchmark do custo por conexão de Server-Sent Events x WebSocket
+
+Para cada transporte sobe um servidor novo (uvicorn em um subprocesso, 127.0.0.1) sobre o
+mesmo banco SQLite temporário, conecta N clientes (cada um com o seu ticket), espera o
+snapshot inicial de todos e mede no processo do servidor:
+
+- memória: VmRSS antes e depois das conexões, por conexão
+- CPU: tempo de CPU (user + sys) para aceitar as conexões, com elas ociosas e para
+  entregar os eventos
+- entrega: latência do POST /api/rnc/create_rnc até cada cliente receber o rnc_created
+
+A memória e a CPU vêm de /proc/<pid>, então essas medidas só saem no Linux.
+
+Uso:
+    python -m benchmarks.sse_benchmark --clients 2000 --events 20
+    python -m benchmarks.sse_benchmark --only sse --clients 5000 --output sse.json
+"""
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+import subprocess
+import platform
+import tempfile
+import argparse
+import asyncio
+import json
+import sys
+import os
+
+from benchmarks.common import ROOT, benchmark_env, seed_dataset, auth_headers, access_token, bench_email
+from benchmarks.api_benchmark import _summary, _raise_file_limit, _free_port, _git_revision, _wait_ready, _create_payload
+
+TRANSPORTS = ("ws", "sse")
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """utime + stime do processo (campos 14 e 15 de /proc/<pid>/stat)"""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            #O nome do processo pode ter espaços: os campos começam depois do último ")"
+            fields = file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _delta(after, before, scale: float = 1.0, digits: int = 3):
+    return round((after - before) * scale, digits) if after is not None and before is not None else None
+
+class _Deliveries:
+    """Instantes de chegada de cada rnc_created e clientes que já receberam o snapshot"""
+    def __init__(self):
+        self.ready = 0
+        self.arrivals: dict[int, list[float]] = {}
+
+    def on_message(self, event: str, data: str) -> None:
+        now = perf_counter()
+        if event == "snapshot":
+            self.ready += 1
+        elif event == "rnc_created":
+            self.arrivals.setdefault(json.loads(data)["payload"]["num_rnc"], []).append(now)
+
+async def _ws_client(base_url: str, ticket: str, deliveries: _Deliveries, opened: list) -> None:
+    import websockets
+
+    ws = await websockets.connect(f"{base_url.replace('http://', 'ws://')}/ws/rncs?ticket={ticket}", open_timeout=60, ping_interval=None, max_queue=None)
+    opened.append(ws)
+    try:
+        async for raw in ws:
+            message = json.loads(raw)
+            deliveries.on_message(message.get("type"), raw)
+    except Exception:
+        pass
+
+async def _sse_client(stream_client, ticket: str, deliveries: _Deliveries, opened: list) -> None:
+    async with stream_client.stream("GET", "/ws/rncs/events", params={"ticket": ticket}) as response:
+        response.raise_for_status()
+        opened.append(response)
+        event, data = "message", []
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line:
+                if data:
+                    deliveries.on_message(event, "\n".join(data))
+                event, data = "message", []
+
+async def _run_transport(transport: str, args, env: dict, seed: dict, parts: list) -> dict:
+    import httpx
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env
+    )
+    pid = server.pid
+    users = seed["users"]
+    roles = [role for role, ids in users.items() if ids]
+    operador = auth_headers(users["operador"][0], "operador")
+    deliveries = _Deliveries()
+    opened: list = []
+    tasks: list[asyncio.Task] = []
+    try:
+        limits = httpx.Limits(max_connections=args.connect_concurrency, max_keepalive_connections=args.connect_concurrency)
+        stream_limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=0)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+                httpx.AsyncClient(base_url=base_url, limits=stream_limits, timeout=httpx.Timeout(60, read=None)) as stream_client:
+            await _wait_ready(client)
+            #Aquece as rotas (imports tardios) antes da medida de base
+            await client.get("/api/rnc/list_rncs", headers=operador)
+            await asyncio.sleep(1)
+            rss_before, cpu_before = _rss_bytes(pid), _cpu_seconds(pid)
+
+            async def ticket(i: int) -> str:
+                role = roles[i % len(roles)]
+                index = i % len(users[role])
+                token = access_token(users[role][index], role, bench_email(role, index))
+                response = await client.post("/ws/ticket", headers={"Authorization": f"Bearer {token}"})
+                response.raise_for_status()
+                return response.json()["ticket"]
+
+            tickets = await asyncio.gather(*(ticket(i) for i in range(args.clients)))
+            cpu_tickets = _cpu_seconds(pid)
+
+            semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+            async def connect(ticket_value: str):
+                async with semaphore:
+                    if transport == "ws":
+                        task = asyncio.create_task(_ws_client(base_url, ticket_value, deliveries, opened))
+                    else:
+                        task = asyncio.create_task(_sse_client(stream_client, ticket_value, deliveries, opened))
+                    tasks.append(task)
+                    #A vaga só é liberada quando o cliente recebeu o snapshot (ou falhou)
+                    target = len(tasks)
+                    while deliveries.ready < target and not task.done() and perf_counter() < deadline:
+                        await asyncio.sleep(0.005)
+
+            start = perf_counter()
+            deadline = start + args.timeout
+            await asyncio.gather(*(connect(t) for t in tickets))
+            while deliveries.ready < args.clients and perf_counter() < deadline and not all(task.done() for task in tasks):
+                await asyncio.sleep(0.01)
+            connect_seconds = perf_counter() - start
+            connected = deliveries.ready
+
+            await asyncio.sleep(1)
+            rss_connected, cpu_connected = _rss_bytes(pid), _cpu_seconds(pid)
+            await asyncio.sleep(args.idle_seconds)
+            cpu_idle = _cpu_seconds(pid)
+
+            latencies: list[float] = []
+            missing = 0
+            for i in range(args.events):
+                sent = perf_counter()
+                response = await client.post("/api/rnc/create_rnc", json=_create_payload(parts[i]), headers=operador)
+                if response.status_code != 201:
+                    missing += connected
+                    continue
+                num_rnc = response.json()["num_rnc"]
+                wait_until = perf_counter() + 30
+                while len(deliveries.arrivals.get(num_rnc, ())) < connected and perf_counter() < wait_until:
+                    await asyncio.sleep(0.005)
+                arrivals = deliveries.arrivals.get(num_rnc, [])
+                latencies.extend(arrival - sent for arrival in arrivals)
+                missing += connected - len(arrivals)
+            cpu_events = _cpu_seconds(pid)
+    finally:
+        for task in tasks:
+            task.cancel()
+        for connection in opened:
+            try:
+                await connection.aclose() if transport == "sse" else await connection.close()
+            except Exception:
+                pass
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    delivery = _summary(latencies, missing, 0)
+    delivery.pop("rps", None)
+    delivery["deliveries"] = delivery.pop("requests")
+    delivery["missing_deliveries"] = delivery.pop("errors")
+    per_connection = max(connected, 1)
+    rss_delta = _delta(rss_connected, rss_before, 1, 0)
+    return {
+        "clients": connected,
+        "connect_errors": args.clients - connected,
+        "connect_seconds": round(connect_seconds, 3),
+        "rss_before_mib": _delta(rss_before, 0, 1 / 2**20, 1),
+        "rss_connected_mib": _delta(rss_connected, 0, 1 / 2**20, 1),
+        "rss_per_connection_kib": round(rss_delta / 1024 / per_connection, 2) if rss_delta is not None else None,
+        "cpu_tickets_s": _delta(cpu_tickets, cpu_before),
+        "cpu_connect_ms_per_connection": _delta(cpu_connected, cpu_tickets, 1000 / per_connection),
+        "cpu_idle_percent": _delta(cpu_idle, cpu_connected, 100 / args.idle_seconds, 2),
+        "cpu_events_ms_per_delivery": _delta(cpu_events, cpu_idle, 1000 / max(per_connection * args.events, 1)),
+        "events": args.events,
+        "delivery": delivery,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Custo por conexão de Server-Sent Events x WebSocket")
+    parser.add_argument("--users-per-role", type=int, default=10)
+    parser.add_argument("--rncs", type=int, default=1000, help="RNCs pré-existentes (definem o tamanho do snapshot inicial)")
+    parser.add_argument("--clients", type=int, default=1000, help="Clientes conectados em cada transporte")
+    parser.add_argument("--events", type=int, default=20, help="RNCs abertos (eventos transmitidos) por transporte")
+    parser.add_argument("--idle-seconds", type=float, default=5.0, help="Tempo com as conexões ociosas para medir a CPU de manutenção")
+    parser.add_argument("--connect-concurrency", type=int, default=100, help="Conexões abertas simultaneamente")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Tempo máximo para conectar todos os clientes")
+    parser.add_argument("--only", choices=TRANSPORTS, action="append", help="Mede apenas os transportes indicados")
+    parser.add_argument("--output", help="Arquivo onde gravar o JSON (padrão: stdout)")
+    args = parser.parse_args()
+
+    _raise_file_limit()
+    transports = args.only or list(TRANSPORTS)
+    with tempfile.TemporaryDirectory() as tmp:
+        #Admissão sem limite de fila: mede o custo das conexões, não a recusa de handshakes
+        env = benchmark_env(
+            f"sqlite:///{tmp}/sse_benchmark.db", LOG_LEVEL="WARNING",
+            WS_HANDSHAKE_QUEUE_SIZE=str(args.clients), WS_HANDSHAKE_MAX_WAIT_SECONDS="60"
+        )
+        os.environ.update(env)
+        subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        from app.database import engine
+        seed = seed_dataset(engine, args.users_per_role, args.rncs + args.events * len(transports), args.rncs)
+        engine.dispose()
+
+        free_parts = list(seed["free_parts"])
+        results = {}
+        for i, transport in enumerate(transports):
+            parts = free_parts[i * args.events:(i + 1) * args.events]
+            results[transport] = asyncio.run(_run_transport(transport, args, env, seed, parts))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
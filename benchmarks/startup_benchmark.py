@@ -0,0 +1,86 @@
+"""
+Benchmark de inicialização do worker
+
+Sobe N processos novos que importam `server` e executam o lifespan completo,
+medindo o tempo entre o spawn e o worker ficar pronto. Falha (exit 1) se a
+mediana passar do limite, para servir de guarda contra regressões.
+
+Uso:
+    python -m benchmarks.startup_benchmark --runs 10 --max-seconds 1.0
+    python -m benchmarks.startup_benchmark --profile    #mostra o perfil por import/etapa da primeira execução
+"""
+from time import perf_counter
+import statistics
+import subprocess
+import tempfile
+import argparse
+import json
+import sys
+
+from benchmarks.common import ROOT, benchmark_env
+
+CHILD = """
+import asyncio, time
+start = time.perf_counter()
+import server
+
+async def main():
+    async with server.app.router.lifespan_context(server.app):
+        print(f"READY {time.perf_counter() - start:.6f}", flush=True)
+
+asyncio.run(main())
+"""
+
+def _prepare_database(env: dict) -> None:
+    subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+def _run_once(env: dict, show_output: bool) -> tuple[float, float]:
+    """Retorna (tempo de parede até pronto, tempo dentro do processo até pronto)"""
+    started = perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", CHILD], cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    in_process = None
+    for line in process.stdout:
+        if show_output:
+            print(line, end="")
+        if line.startswith("READY "):
+            wall = perf_counter() - started
+            in_process = float(line.split()[1])
+            break
+    process.wait()
+    if in_process is None:
+        raise RuntimeError("O worker não ficou pronto; rode com --profile para ver a saída")
+    return wall, in_process
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do worker")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="Limite para a mediana do tempo até pronto")
+    parser.add_argument("--profile", action="store_true", help="Ativa STARTUP_PROFILE e mostra o perfil da primeira execução")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = benchmark_env(f"sqlite:///{tmp}/startup.db", STARTUP_PROFILE="1" if args.profile else "0")
+        _prepare_database(env)
+        #Primeira execução descartada: compila os .pyc e aquece o cache de disco
+        _run_once(env, show_output=args.profile)
+        results = [_run_once(env, show_output=False) for _ in range(args.runs)]
+
+    wall = [r[0] for r in results]
+    in_process = [r[1] for r in results]
+    summary = {
+        "runs": args.runs,
+        "wall_median_s": round(statistics.median(wall), 4),
+        "wall_max_s": round(max(wall), 4),
+        "in_process_median_s": round(statistics.median(in_process), 4),
+        "max_seconds": args.max_seconds,
+    }
+    print(json.dumps(summary, indent=2))
+
+    if summary["wall_median_s"] > args.max_seconds:
+        print(f"❌ Mediana de {summary['wall_median_s']}s acima do limite de {args.max_seconds}s")
+        return 1
+    print("✅ Inicialização dentro do limite")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,106 @@
-from fastapi.middleware.cors import CORSMiddleware
-from app.core.security import create_access_token
-from app.core.logging_config import setup_logging
+from app.core.startup_profile import profiler
 from contextlib import asynccontextmanager
-from app.core.config import settings
 from datetime import timedelta
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from fastapi.exceptions import HTTPException
-import os
+import importlib
+import asyncio
 
-from app.database import create_db_and_tables
-from app.router import user_router, auth_router, rnc_router, part_router
-from app.websocket.route import router as websocket_router
+with profiler.step("import fastapi"):
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, PlainTextResponse, Response
+    from fastapi.exceptions import HTTPException
 
-setup_logging()
+with profiler.step("import app.core.config"):
+    from app.core.config import settings
+    from app.core.logging_config import setup_logging
+    from app.core.metrics import MetricsMiddleware, instrument_engine, registry as metrics_registry
+    from app.core.sql_profiler import install_sql_profiler
+    from app.core.conditional import NotModified
+    from app.core.rate_limit import RateLimitMiddleware, load_monitor
+
+with profiler.step("import app.database + app.migrations"):
+    from app.database import engine, replica_engines
+    from app.migrations import apply_migrations, check_schema_version
+
+with profiler.step("import routers"):
+    from app.router import user_router, auth_router, rnc_router, part_router, admin_router
+    from app.websocket.route import router as websocket_router
+    from app.core.part_cache import part_cache
+    from app.core.open_rnc_index import open_rnc_index
+    from app.repository import PartRepository, RNCRepository
+    from sqlmodel import Session
+
+setup_logging(settings)
+
+#Módulos pesados adiados para fora do boot; aquecidos em segundo plano quando o worker já está pronto
+DEFERRED_IMPORTS = ("jose.jwt", "bcrypt")
+
+def _jwt_self_test():
+    """Autoteste de criação de token, executado apenas fora de produção"""
+    from app.core.security import create_access_token
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    print("🚀 Iniciando a API RNC Digital System...")
-    
-    # Debug das configurações
-    print(f"🔑 SECRET_KEY configurada: {len(settings.SECRET_KEY) > 20}")
-    print(f"⚙️ ALGORITHM: {settings.ALGORITHM}")
-    print(f"⏰ Token expira em: {settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES} minutos")
-    
-    # Teste SIMPLES de criação de token
     try:
         print("🧪 Testando criação de token...")
-        test_data = {"sub": "test@example.com", "user_id": 1}
-        test_token = create_access_token(test_data, timedelta(minutes=1))
+        create_access_token({"sub": "test@example.com", "user_id": 1}, timedelta(minutes=1))
         print(f"✅ Teste de token: SUCESSO!")
     except Exception as e:
         print(f"❌ Teste de token: FALHA - {e}")
-        # Força uma SECRET_KEY para desenvolvimento
-        os.environ["SECRET_KEY"] = "chave_de_desenvolvimento_32_caracteres_123!!"
-        print("🔄 Tentando com SECRET_KEY forçada...")
-        try:
-            test_data = {"sub": "test@example.com", "user_id": 1}
-            test_token = create_access_token(test_data, timedelta(minutes=1))
-            print(f"✅ Teste com fallback: SUCESSO!")
-        except Exception as e2:
-            print(f"💥 Falha crítica: {e2}")
-
-    # Cria tabelas do banco
-    print("📦 Criando tabelas no banco de dados...")
-    create_db_and_tables()
-    print("✅ Tabelas criadas com sucesso!")
-    
+
+def _warm_part_cache() -> int:
+    """Pré-carrega as peças ativas no cache do catálogo"""
+    with Session(engine) as session:
+        return part_cache.warm(PartRepository(session).list_active(part_cache.max_size))
+
+def _load_open_rnc_index() -> int:
+    """Carrega o índice part_code -> num_rnc dos RNCs abertos"""
+    with Session(engine) as session:
+        return open_rnc_index.load(RNCRepository(session).open_part_codes)
+
+async def _warm_deferred_imports():
+    for module_name in DEFERRED_IMPORTS:
+        await asyncio.to_thread(importlib.import_module, module_name)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🚀 Iniciando a API RNC Digital System...")
+
+    if not settings.is_production:
+        # Debug das configurações
+        print(f"🔑 SECRET_KEY configurada: {len(settings.SECRET_KEY) > 20}")
+        print(f"⚙️ ALGORITHM: {settings.ALGORITHM}")
+        print(f"⏰ Token expira em: {settings.ACCESS_TOKEN_EXPIRE_IN_MINUTES} minutos")
+        with profiler.step("lifespan: autoteste JWT"):
+            _jwt_self_test()
+
+    # Verificação rápida da versão do schema (migrações rodam via: python -m app.migrations upgrade)
+    with profiler.step("lifespan: versão do schema"):
+        if settings.AUTO_MIGRATE:
+            applied = apply_migrations(engine)
+            if applied:
+                print(f"📐 Migrações aplicadas: {applied}")
+        version = check_schema_version(engine)
+    print(f"📦 Schema do banco na versão {version}")
+    if replica_engines:
+        print(f"📚 Réplicas de leitura: {len(replica_engines)} ({settings.REPLICA_SELECTION})")
+
+    if settings.PART_CACHE_WARM and part_cache.enabled:
+        with profiler.step("lifespan: cache de peças"):
+            loaded = _warm_part_cache()
+        print(f"🗂️ Cache de peças pré-carregado: {loaded} peças")
+
+    if open_rnc_index.enabled:
+        with profiler.step("lifespan: índice de RNCs abertos"):
+            indexed = _load_open_rnc_index()
+        print(f"🏷️ Índice de RNCs abertos por peça ({open_rnc_index.mode}): {indexed} peças")
+
+    profiler.report()
+    warmup = asyncio.create_task(_warm_deferred_imports())
+    load_monitor.start()
+
     yield
-    
+
+    warmup.cancel()
+    await load_monitor.stop()
     print("👋 Encerrando API...")
 
 app = FastAPI(
@@ -58,6 +110,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+#Adicionado antes do CORS para que as respostas 429 também recebam os cabeçalhos de CORS
+app.add_middleware(RateLimitMiddleware)
+for db_engine in (engine, *replica_engines):
+    load_monitor.instrument_engine(db_engine)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -72,6 +129,13 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+if settings.METRICS_ENABLED:
+    for db_engine in (engine, *replica_engines):
+        instrument_engine(db_engine)
+    app.add_middleware(MetricsMiddleware)
+for db_engine in (engine, *replica_engines):
+    install_sql_profiler(db_engine)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
@@ -79,13 +143,18 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"error": exc.detail}
     )
 
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers=exc.headers)
 
-app.include_router(auth_router.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(user_router.router, prefix="/api/user", tags=["Users"])
-app.include_router(rnc_router.router, prefix="/api/rnc", tags=["RNC"])
-app.include_router(part_router.router, prefix="/api/part", tags=["Parts"])
+with profiler.step("registro das rotas"):
+    app.include_router(auth_router.router, prefix="/api/auth", tags=["Authentication"])
+    app.include_router(user_router.router, prefix="/api/user", tags=["Users"])
+    app.include_router(rnc_router.router, prefix="/api/rnc", tags=["RNC"])
+    app.include_router(part_router.router, prefix="/api/part", tags=["Parts"])
+    app.include_router(admin_router.router, prefix="/api/admin", tags=["Admin"])
 
-app.include_router(websocket_router, prefix="/ws", tags=["WebSocket"])
+    app.include_router(websocket_router, prefix="/ws", tags=["WebSocket"])
 
 @app.get('/')
 async def root():
@@ -95,5 +164,8 @@ async def root():
 async def health_check():
     return { "status": "healthy", "message": "RNC is running" }
 
-
-
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")